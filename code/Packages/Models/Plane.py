@@ -1,11 +1,16 @@
-from Packages.connector import PlaneNotFound, DBPlane, APIConnection
+from Packages.connector import PlaneNotFound, APIConnectionError, DBPlane, APIConnection
 from Packages.local_db import LocalDB
 from backend.wtFetcher import TelemetryData
+from backend.telemetryHistory import TelemetryHistory
 from enum import Enum
+import threading
+import time
 
 
 conn = APIConnection()
 db = LocalDB()
+LOOKUP_RETRY_S = 10.0 # Time after which a plane is looked up again, if the API could not be reached for it
+_lookup_lock = threading.Lock() # Serializes the lookups of planes, which run in background threads
 GENERAL_FLAP_STATES = [
     {"name": "combat", "perc": 25}, 
     {"name": "start", "perc": 50},
@@ -22,6 +27,7 @@ class flapState(Enum):
     
 class WTPlane(object):
     telemetry:TelemetryData|None
+    history:TelemetryHistory
     max_speeds:dict
     recommended_speeds:dict
     max_values_avaliable:bool
@@ -31,68 +37,110 @@ class WTPlane(object):
     
     informed_flap_state:str
     
-    def __init__(self, plane_type:str ,friendly:bool = True, ):
+    def __init__(self, plane_type:str ,friendly:bool = True, lookup:bool = True):
+        """Create a plane and look its limits up in the database
+
+        :param plane_type: Plane type of the telemetry (e.g. "f-80a")
+        :type plane_type: str
+        :param friendly: Whether the plane is friendly, defaults to True
+        :type friendly: bool, optional
+        :param lookup: If False, the database is not queried and the plane has no known limits, e.g. as stand-in while it
+            is looked up in the background, defaults to True
+        :type lookup: bool, optional
+        """
         self.friendly = friendly
         self.planetype = plane_type.lower()
         
         self.possible_flaps = [{"name":"none","perc":0}]
-        try:
-            self.db_data:DBPlane = conn.get_plane(self.planetype)
-            self.name = self.db_data.name
-            self.max_values_avaliable = True
+        # time.monotonic() timestamp of a failed lookup, which has to be retried (see lookup_outdated)
+        self.lookup_failed_at:float|None = None
+        if not lookup:
+            self.__set_unknown(plane_type)
+        else:
+            # the API connection and the local database are shared by all lookups and not thread-safe
+            with _lookup_lock:
+                try:
+                    self.db_data:DBPlane = conn.get_plane(self.planetype)
+                    self.name = self.db_data.name
+                    self.max_values_avaliable = True
             
-            self.max_speeds = {
-                "gear": self.db_data.gear_max_speed,
-                "frame": self.db_data.frame_max_speed,
-                "frame mach": self.db_data.mach_limit,
-                "combat": self.db_data.combat_flap_speed,
-                "start": self.db_data.start_flap_speed,
-                "landing": self.db_data.landing_flap_speed
-            }
-            for key,value in self.max_speeds.items():
-                if value == '' or value is None:
-                    self.max_speeds[key] = None
-                elif key == "frame mach":
-                    self.max_speeds[key] = float(value)
-                else:
-                    self.max_speeds[key] = int(value)
+                    self.max_speeds = {
+                        "gear": self.db_data.gear_max_speed,
+                        "frame": self.db_data.frame_max_speed,
+                        "frame mach": self.db_data.mach_limit,
+                        "combat": self.db_data.combat_flap_speed,
+                        "start": self.db_data.start_flap_speed,
+                        "landing": self.db_data.landing_flap_speed
+                    }
+                    for key,value in self.max_speeds.items():
+                        if value == '' or value is None:
+                            self.max_speeds[key] = None
+                        elif key == "frame mach":
+                            self.max_speeds[key] = float(value)
+                        else:
+                            self.max_speeds[key] = int(value)
             
-            self.recommended_speeds = {
-                "start": self.db_data.start_speed,
-                "landing": self.db_data.landing_speed
-            }
-            self.flaps_avaliable = (
-                (self.max_speeds["combat"] != '') and (self.max_speeds["combat"] is not None),
-                (self.max_speeds["start"] != '') and (self.max_speeds["start"] is not None),
-                (self.max_speeds["landing"] != '') and (self.max_speeds["landing"] is not None)
-            )
+                    self.recommended_speeds = {
+                        "start": self.db_data.start_speed,
+                        "landing": self.db_data.landing_speed
+                    }
+                    self.flaps_avaliable = (
+                        (self.max_speeds["combat"] != '') and (self.max_speeds["combat"] is not None),
+                        (self.max_speeds["start"] != '') and (self.max_speeds["start"] is not None),
+                        (self.max_speeds["landing"] != '') and (self.max_speeds["landing"] is not None)
+                    )
             
             
-            for i in range(len(GENERAL_FLAP_STATES)):
-                if self.flaps_avaliable[i]:
-                    self.possible_flaps.append(GENERAL_FLAP_STATES[i])           
-            self.possible_flaps[-1]["perc"] = 100
+                    for i in range(len(GENERAL_FLAP_STATES)):
+                        if self.flaps_avaliable[i]:
+                            self.possible_flaps.append(GENERAL_FLAP_STATES[i])           
+                    self.possible_flaps[-1]["perc"] = 100
             
-            global_thesholds = db.get_dict("speed_warning_limits", default={})
-            if global_thesholds:
-                global_thesholds = {str(key):float(value) for key,value in global_thesholds.items()}
+                    global_thesholds = db.get_dict("speed_warning_limits", default={})
+                    if global_thesholds:
+                        global_thesholds = {str(key):float(value) for key,value in global_thesholds.items()}
                 
-        except PlaneNotFound:
-            self.max_values_avaliable = False
-            self.name = plane_type
-            
-            self.max_speeds = {}
-            self.recommended_speeds = {}
-            self.flaps_avaliable = (False, False, False)
-        
-        
+                except (PlaneNotFound, APIConnectionError) as e:
+                    if isinstance(e, APIConnectionError):
+                        # the plane may well be known, only a missing plane is final
+                        self.lookup_failed_at = time.monotonic()
+                    self.__set_unknown(plane_type)
+
 
         self.telemetry = None
+        self.history = TelemetryHistory()
         
         self.informed_flap_state = "none"
     
+    def __set_unknown(self, plane_type:str) -> None:
+        """Use no limits, for a plane which is not (or could not be) looked up"""
+        self.max_values_avaliable = False
+        self.name = plane_type
+        
+        self.max_speeds = {}
+        self.recommended_speeds = {}
+        self.flaps_avaliable = (False, False, False)
+    
+    def lookup_outdated(self, plane_type:str) -> bool:
+        """Check whether a plane has to be looked up for the given type, instead of using this one
+
+        :param plane_type: Plane type of the current telemetry
+        :type plane_type: str
+        :return: True if the type differs or the API could not be reached for this plane more than LOOKUP_RETRY_S ago
+        :rtype: bool
+        """
+        if self.planetype != plane_type.lower():
+            return True
+        return self.lookup_failed_at is not None and time.monotonic() - self.lookup_failed_at > LOOKUP_RETRY_S
+    
     def set_telemetry(self, telemetry:TelemetryData):
+        """Set the current telemetry of the plane and add it to its history
+
+        :param telemetry: the New Telemetry data
+        :type telemetry: TelemetryData
+        """
         self.telemetry = telemetry
+        self.history.append(telemetry)
     
     def get_flaps_avaliable(self) -> tuple[bool,bool,bool]:
         """Get an tuple describing which flaps are avaliable on this Plane
@@ -9,6 +9,7 @@ import datetime as dt
 
 
 MAX_NUM_OBJS     = 0xFFFFFFFFFFFFFFFE
+BUFFER_SIZE      = 64 * 1024
 header_mandatory = ('FileType={filetype}\n' 
                     'FileVersion={acmiver}\n'
                     '0,ReferenceTime={reftime}Z\n')
@@ -31,6 +32,7 @@ class ACMI(object):
         '''
         
         self.obj_ids = {}
+        self._log    = None
         
         if num_objs > MAX_NUM_OBJS:
             raise Exception('Too many objects specified - cannot be more than {}'.format(MAX_NUM_OBJS))
@@ -53,17 +55,34 @@ class ACMI(object):
             id_ = str(hex(randint(1, MAX_NUM_OBJS + 2))[2:]).upper()
         
         try:
-            obj_num = str(int(max(self.obj_ids.keys())) + 1)
+            obj_num = str(max(int(key) for key in self.obj_ids.keys()) + 1)
         except ValueError:
             obj_num = '0'
         
         self.obj_ids[str(obj_num)] = id_
         
         return id_
+    
+    def remove_object(self, obj_num: int) -> str:
+        '''
+        Remove an object from the self.obj_ids dict and create the entry
+        telling Tacview the object left the battlefield
+        
+        Args:
+            obj_num:
+                Object number as represented in the ID-lookup dictionary
+                self.obj_ids
+        
+        Returns:
+                Formatted removal entry string
+        '''
+        
+        return '-{}\n'.format(self.obj_ids.pop(str(obj_num)))
         
     def create(self, file_name: str, file_type: str = 'text/acmi/tacview', acmi_ver: str = '2.1'):
         '''
-        Create an ACMI file with a basic header
+        Create an ACMI file with a basic header. The file stays open and
+        entries are written through a buffer, call close() when done
         
         Args:
             file_name:
@@ -85,10 +104,28 @@ class ACMI(object):
         if dir_name and not os.path.exists(dir_name):
             os.makedirs(dir_name)
         
-        with open(self.file_name, 'w') as log:
-            log.write(header_mandatory.format(filetype=file_type,
-                                              acmiver=acmi_ver,
-                                              reftime=self.get_timestamp().isoformat()))
+        self.close()
+        self._log = open(self.file_name, 'w', buffering=BUFFER_SIZE)
+        self._log.write(header_mandatory.format(filetype=file_type,
+                                                acmiver=acmi_ver,
+                                                reftime=self.reference_time.isoformat()))
+    
+    def flush(self):
+        '''
+        Write all buffered entries to the ACMI file
+        '''
+        
+        if self._log is not None:
+            self._log.flush()
+    
+    def close(self):
+        '''
+        Write all buffered entries and close the ACMI file
+        '''
+        
+        if self._log is not None:
+            self._log.close()
+            self._log = None
     
     def get_timestamp(self) -> dt.datetime:
         '''
@@ -119,14 +156,7 @@ class ACMI(object):
         
         header = self.format_user_header(header_content)
         
-        try:
-            with open(self.file_name, 'a') as log:
-                log.write(header)
-            return True
-        
-        except FileNotFoundError:
-            print('ERROR - ACMI file not found')
-            return False
+        return self.write(header)
     
     def format_user_header(self, header_content: dict) -> str:
         '''
@@ -168,14 +198,27 @@ class ACMI(object):
         
         entry = self.format_entry(obj_num, data, timestamp)
         
-        try:
-            with open(self.file_name, 'a') as log:
-                log.write(entry)
-            return True
+        return self.write(entry)
+    
+    def write(self, text: str) -> bool:
+        '''
+        Append already formatted lines to the buffer of the ACMI file
         
-        except FileNotFoundError:
-            print('ERROR - ACMI file not found')
+        Args:
+            text:
+                Formatted header or entry lines
+        
+        Returns:
+            Success:
+                Whether or not the operation was successful
+        '''
+        
+        if self._log is None:
+            print('ERROR - ACMI file not created')
             return False
+        
+        self._log.write(text)
+        return True
     
     def format_entry(self, obj_num: int, data: dict, timestamp: bool = True):
         '''
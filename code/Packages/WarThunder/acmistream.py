@@ -0,0 +1,450 @@
+'''
+Module to stream ACMI telemetry to Tacview in real time - see
+https://www.tacview.net/documentation/realtime/en/
+'''
+
+
+import asyncio
+import threading
+from math import hypot
+from time import monotonic
+from Packages.WarThunder.acmi import ACMI, header_mandatory
+from Packages.WarThunder.telemetry import IN_FLIGHT
+
+
+STREAM_PORT       = 42674 # default port of Tacview real-time telemetry
+HOST_NAME         = 'WTCopilot'
+HANDSHAKE         = 'XtraLib.Stream.0\nTacview.RealTimeTelemetry.0\n{host}\n\0'
+HANDSHAKE_TIMEOUT = 5.0
+MAX_BACKLOG       = 256 * 1024 # bytes a client may have pending before frames are skipped for it
+MATCH_DISTANCE    = 0.02       # farthest a map object moves between two frames (in map widths) to be tracked
+OWN_OBJ           = 0
+KMH_TO_MS         = 1 / 3.6
+
+
+def acmi_type(obj) -> str:
+    '''
+    Find the Tacview object type of a map object
+
+    Args:
+        obj:
+            mapinfo.map_obj of the object
+
+    Returns:
+            Tacview type tags, None for objects which are not streamed
+            (airfields, zones, respawns and the player itself)
+    '''
+
+    if obj.fighter or obj.heavy_fighter or obj.bomber:
+        return 'Air+FixedWing'
+    if obj.heavy_tank or obj.medium_tank or obj.light_tank or obj.spg:
+        return 'Ground+Heavy+Armor+Vehicle+Tank'
+    if obj.spaa or obj.aaa:
+        return 'Ground+AntiAircraft'
+    if obj.wheeled or obj.tracked:
+        return 'Ground+Vehicle'
+    if obj.ship or obj.torpedo_boat:
+        return 'Sea+Watercraft'
+    return None
+
+def own_properties(basic_telemetry: dict, name: str = HOST_NAME) -> dict:
+    '''
+    Create the ACMI properties of our own aircraft
+
+    Args:
+        basic_telemetry:
+            TelemInterface.basic_telemetry of a frame in flight
+        name:
+            Pilot name shown in Tacview
+
+    Returns:
+            Property names and values, None if the position is not known
+    '''
+
+    try:
+        props = {'T':     '{:.7f}|{:.7f}|{:.1f}|{:.1f}|{:.1f}|{:.1f}'.format(basic_telemetry['lon'],
+                                                                          basic_telemetry['lat'],
+                                                                          basic_telemetry['altitude'],
+                                                                          basic_telemetry['roll'],
+                                                                          basic_telemetry['pitch'],
+                                                                          basic_telemetry['heading']),
+                 'Type':  'Air+FixedWing',
+                 'Name':  basic_telemetry['airframe'],
+                 'Pilot': name,
+                 'Color': 'Blue'}
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if basic_telemetry.get('IAS') is not None:
+        props['TAS'] = '{:.1f}'.format(basic_telemetry['IAS'] * KMH_TO_MS)
+
+    return props
+
+def map_obj_properties(obj) -> dict:
+    '''
+    Create the ACMI properties of a map object (/map_obj.json neither reports
+    the altitude nor the type of the vehicle, only its icon)
+
+    Args:
+        obj:
+            mapinfo.map_obj of the object
+
+    Returns:
+            Property names and values
+    '''
+
+    lat, lon = obj.position_ll
+
+    return {'T':     '{:.7f}|{:.7f}||||{:.1f}'.format(lon, lat, obj.hdg),
+            'Type':  acmi_type(obj),
+            'Name':  obj.icon,
+            'Color': 'Blue' if obj.friendly else 'Red'}
+
+
+class MapObjTracker(object):
+    '''
+    Follows the objects of /map_obj.json across frames. The endpoint does not
+    identify its objects, so every object is matched to the nearest unmatched
+    object of the previous frame with the same icon and color
+    '''
+
+    def __init__(self, acmi: ACMI):
+        '''
+        Args:
+            acmi:
+                ACMI object which assigns the IDs of new objects
+        '''
+
+        self.acmi    = acmi
+        self.tracked = {} # obj_num -> map_obj
+
+    def update(self, map_objs: list) -> tuple:
+        '''
+        Match the objects of a new frame to the tracked ones
+
+        Args:
+            map_objs:
+                MapInfo.map_objs of the new frame
+
+        Returns:
+                Dict obj_num -> map_obj of all objects of the frame and the
+                list of removal entries of the objects which disappeared
+        '''
+
+        unmatched = dict(self.tracked)
+        tracked   = {}
+
+        for obj in map_objs:
+            if acmi_type(obj) is None:
+                continue
+
+            match     = None
+            best_dist = MATCH_DISTANCE
+
+            for obj_num, previous in unmatched.items():
+                if previous.icon != obj.icon or previous.hex_color != obj.hex_color:
+                    continue
+
+                dist = hypot(obj.position[0] - previous.position[0],
+                             obj.position[1] - previous.position[1])
+
+                if dist <= best_dist:
+                    match, best_dist = obj_num, dist
+
+            if match is None:
+                id_   = self.acmi.add_object()
+                match = next(int(key) for key, value in self.acmi.obj_ids.items() if value == id_)
+            else:
+                del unmatched[match]
+
+            tracked[match] = obj
+
+        self.tracked = tracked
+
+        return tracked, [self.acmi.remove_object(obj_num) for obj_num in unmatched]
+
+
+class StreamClient(object):
+    '''
+    A connected Tacview client
+    '''
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer  = writer
+        self.synced  = False # whether the client has the complete state and gets deltas
+        self.objects = set() # IDs of the objects the client knows
+
+
+class ACMIStreamServer(object):
+    '''
+    Tacview real-time telemetry server (Tacview: Record > Real-Time Telemetry,
+    no password) streaming our own aircraft and the objects of the map as
+    frames arrive.
+
+    The server runs an asyncio event loop in its own thread. push() only hands
+    the values of a frame over, so the fetch thread never waits for a socket.
+    Each frame is formatted once (only changed properties) and written to the
+    buffered transports of all clients. A client with more than MAX_BACKLOG
+    bytes pending (e.g. a stalled Tacview) skips frames until its buffer
+    drained and then gets the complete state again. Disconnected clients are
+    dropped without affecting the others.
+    '''
+
+    def __init__(self, host: str = '127.0.0.1', port: int = STREAM_PORT, name: str = HOST_NAME):
+        '''
+        Args:
+            host:
+                Interface to listen on, '0.0.0.0' to serve Tacview on other
+                devices of the LAN (there is no password check)
+            port:
+                Port to listen on, 0 picks a free one
+            name:
+                Host and pilot name shown in Tacview
+        '''
+
+        self.host       = host
+        self.port       = port
+        self.name       = name
+        self.acmi       = ACMI(num_objs=1) # object OWN_OBJ is our own aircraft
+        self.tracker    = MapObjTracker(self.acmi)
+        self.properties = {} # obj_num -> complete properties of the latest frame
+        self.clients    = set()
+        self.frames     = 0
+        self.skipped    = 0
+        self._loop      = None
+        self._server    = None
+        self._thread    = None
+        self._started   = None
+        self._last_time = 0.0
+
+    def start(self, timeout: float = 5.0):
+        '''
+        Start listening in the thread of the server
+
+        Args:
+            timeout:
+                Seconds to wait for the server to listen
+
+        Raises:
+            OSError: If the port could not be bound
+        '''
+
+        ready  = threading.Event()
+        errors = []
+
+        self._thread = threading.Thread(target=self._run, args=(ready, errors), name='acmiStreamThread', daemon=True)
+        self._thread.start()
+        ready.wait(timeout)
+
+        if errors:
+            raise errors[0]
+
+    def stop(self, timeout: float = 5.0):
+        '''
+        Disconnect all clients and stop the thread of the server
+
+        Args:
+            timeout:
+                Seconds to wait for the thread to finish
+        '''
+
+        loop = self._loop
+
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(loop.stop)
+            except RuntimeError:
+                pass
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def push(self, basic_telemetry: dict, map_objs: list):
+        '''
+        Stream a frame, can be called from any thread and never blocks
+
+        Args:
+            basic_telemetry:
+                Values of our own aircraft (see TelemInterface.basic_telemetry),
+                None if not in flight. Must not be changed afterwards
+            map_objs:
+                MapInfo.map_objs of the frame
+        '''
+
+        loop = self._loop
+
+        if loop is None:
+            return
+
+        try:
+            loop.call_soon_threadsafe(self._on_frame, monotonic(), basic_telemetry, map_objs)
+        except RuntimeError:
+            # the server stopped meanwhile
+            pass
+
+    def push_interface(self, interface):
+        '''
+        Stream the last frame fetched by a TelemInterface, has to be called in
+        the thread using the interface
+
+        Args:
+            interface:
+                telemetry.TelemInterface (or AsyncTelemInterface)
+        '''
+
+        if interface.status == IN_FLIGHT:
+            # the interface updates basic_telemetry in place, map_objs is rebuilt for every frame
+            self.push(dict(interface.basic_telemetry), interface.map_info.map_objs)
+        else:
+            self.push(None, [])
+
+    def stats(self) -> dict:
+        '''
+        Returns:
+                Number of clients, streamed frames and frames skipped for
+                slow clients
+        '''
+
+        return {'clients': len(self.clients),
+                'frames':  self.frames,
+                'skipped': self.skipped}
+
+    def _run(self, ready: threading.Event, errors: list):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle_client, self.host, self.port))
+        except OSError as e:
+            errors.append(e)
+            ready.set()
+            loop.close()
+            return
+
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+
+        self.acmi.reference_time = self.acmi.get_timestamp()
+        self._started = monotonic()
+        self._loop    = loop
+        ready.set()
+
+        try:
+            loop.run_forever()
+        finally:
+            self._loop = None
+            self._server.close()
+
+            for client in self.clients:
+                client.writer.close()
+
+            tasks = asyncio.all_tasks(loop)
+
+            for task in tasks:
+                task.cancel()
+
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            self.clients.clear()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = None
+
+        try:
+            writer.write(HANDSHAKE.format(host=self.name).encode('utf-8'))
+            # Tacview answers with its own handshake (and password hash), terminated by \0
+            await asyncio.wait_for(reader.readuntil(b'\0'), HANDSHAKE_TIMEOUT)
+
+            writer.write(self._header().encode('utf-8'))
+            client = StreamClient(writer)
+            self.clients.add(client)
+            self._send(client, None)
+
+            # Tacview sends nothing else until it disconnects
+            while await reader.read(1024):
+                pass
+
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, OSError):
+            pass
+
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    def _header(self) -> str:
+        return (header_mandatory.format(filetype='text/acmi/tacview',
+                                        acmiver='2.1',
+                                        reftime=self.acmi.reference_time.isoformat()) +
+                self.acmi.format_user_header({'DataSource':   'War Thunder',
+                                              'DataRecorder': self.name}))
+
+    def _on_frame(self, time: float, basic_telemetry: dict, map_objs: list):
+        '''
+        Format the changes of a frame and send them to all clients
+        '''
+
+        self._last_time = time - self._started
+        properties      = {}
+
+        own = own_properties(basic_telemetry, self.name) if basic_telemetry is not None else None
+
+        if own is not None:
+            properties[OWN_OBJ] = own
+
+        tracked, removals = self.tracker.update(map_objs)
+
+        for obj_num, obj in tracked.items():
+            properties[obj_num] = map_obj_properties(obj)
+
+        entries = ['#{:0.2f}\n'.format(self._last_time)]
+
+        for obj_num, props in properties.items():
+            previous = self.properties.get(obj_num, {})
+            changed  = {name: value for name, value in props.items() if previous.get(name) != value}
+
+            if changed:
+                entries.append(self.acmi.format_entry(obj_num, changed, timestamp=False))
+
+        if own is None and OWN_OBJ in self.properties:
+            entries.append('-{}\n'.format(self.acmi.obj_ids[str(OWN_OBJ)]))
+
+        entries.extend(removals)
+
+        self.properties = properties
+        self.frames    += 1
+        delta           = ''.join(entries).encode('utf-8')
+
+        for client in list(self.clients):
+            self._send(client, delta)
+
+    def _send(self, client: StreamClient, delta: bytes):
+        '''
+        Send a frame to a client, the complete state if it is not synced (delta
+        None only sends the complete state)
+        '''
+
+        transport = client.writer.transport
+
+        if transport.is_closing():
+            self.clients.discard(client)
+            return
+
+        if transport.get_write_buffer_size() > MAX_BACKLOG:
+            client.synced = False
+            self.skipped += 1
+            return
+
+        objects = {self.acmi.obj_ids[str(obj_num)] for obj_num in self.properties}
+
+        if client.synced and delta is not None:
+            client.writer.write(delta)
+        else:
+            entries = ['#{:0.2f}\n'.format(self._last_time)]
+            entries.extend('-{}\n'.format(id_) for id_ in client.objects - objects)
+            entries.extend(self.acmi.format_entry(obj_num, props, timestamp=False)
+                           for obj_num, props in self.properties.items())
+            client.writer.write(''.join(entries).encode('utf-8'))
+            client.synced = True
+
+        client.objects = objects
@@ -0,0 +1,400 @@
+'''
+Module providing a non-blocking (asyncio) keep-alive HTTP/1.1 client for the
+War Thunder web interface (http://localhost:8111)
+
+AsyncWTClient offers the same interface as client.WTClient, but its methods
+are coroutines and the requests of one get_many call run as one task per
+path, each on its own persistent connection. Connections are kept open and
+reused by the following calls, so a tick costs no TCP handshakes and its
+latency is bounded by the slowest single request. Errors are reported with
+the exceptions of client.py.
+
+Idle connections are kept in an AsyncConnectionPool, which can be shared by
+the clients of several hosts (i.e. to monitor several game clients on the
+LAN from one event loop) to bound the number of requests in flight.
+'''
+
+
+import asyncio
+from time import monotonic
+from .client import (WT_PORT, DEFAULT_TIMEOUT, HEADER_END, MAX_CACHED_REQUESTS, Response,
+                     ClientError, ConnectFailed, RequestTimeout, ConnectionClosed)
+
+
+MAX_IDLE_CONNECTIONS = 8
+MAX_POOL_CONNECTIONS = 64
+
+
+class AsyncConnection(object):
+    '''
+    Single persistent connection to the web interface
+    '''
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> 'AsyncConnection':
+        '''
+        Establish a new connection
+
+        Args:
+            host:
+                Host running War Thunder
+            port:
+                Port of the War Thunder web interface
+
+        Returns:
+                The open connection
+        '''
+
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError as e:
+            raise ConnectFailed(f'Failed to establish a new connection to {host}:{port}: {e}') from e
+
+        return cls(reader, writer)
+
+    def close(self):
+        '''
+        Close the connection without waiting for it to be flushed
+        '''
+
+        try:
+            self.writer.close()
+        except (OSError, RuntimeError):
+            # the event loop of the connection might be closed already
+            pass
+
+    async def request(self, raw_request: bytes) -> tuple:
+        '''
+        Send a request and read its response
+
+        Args:
+            raw_request:
+                Complete GET request
+
+        Returns:
+                Status code, body and whether the connection stays open
+        '''
+
+        self.writer.write(raw_request)
+        await self.writer.drain()
+
+        try:
+            head = await self.reader.readuntil(HEADER_END)
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionClosed('Connection closed while reading response') from e
+
+        lines   = head.decode('latin-1').split('\r\n')
+        version, status = lines[0].split(' ', 2)[:2]
+        headers = {}
+
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip().lower()
+
+        connection = headers.get('connection', '')
+        keep_alive = (connection != 'close') if version == 'HTTP/1.1' else (connection == 'keep-alive')
+
+        try:
+            if 'chunked' in headers.get('transfer-encoding', ''):
+                body = bytearray()
+
+                while True:
+                    size = int((await self.reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+
+                    if size == 0:
+                        await self.reader.readuntil(b'\r\n')
+                        break
+
+                    body += await self.reader.readexactly(size)
+                    await self.reader.readexactly(2)
+
+                body = bytes(body)
+
+            elif 'content-length' in headers:
+                body = await self.reader.readexactly(int(headers['content-length']))
+
+            else:
+                # body is delimited by the server closing the connection
+                body       = await self.reader.read()
+                keep_alive = False
+
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionClosed('Connection closed while reading response body') from e
+
+        return int(status), body, keep_alive
+
+
+class AsyncConnectionPool(object):
+    '''
+    Idle keep-alive connections of one or more AsyncWTClients, grouped by
+    host. All clients of a pool share an upper bound of connections in use
+    at the same time, further requests wait for a free slot
+    '''
+
+    def __init__(self, max_connections: int = MAX_POOL_CONNECTIONS, max_idle_per_host: int = MAX_IDLE_CONNECTIONS):
+        '''
+        Args:
+            max_connections:
+                Maximum number of requests in flight over all hosts
+            max_idle_per_host:
+                Maximum number of idle connections kept open per host
+        '''
+
+        self.max_connections   = max_connections
+        self.max_idle_per_host = max_idle_per_host
+        self.slots             = asyncio.Semaphore(max_connections)
+        self._idle             = {}
+
+    def take(self, key: tuple) -> AsyncConnection:
+        '''
+        Take an idle connection to a host out of the pool
+
+        Args:
+            key:
+                (host, port) of the connection
+
+        Returns:
+                The connection, None if there is no idle one
+        '''
+
+        idle = self._idle.get(key)
+        return idle.pop() if idle else None
+
+    def put(self, key: tuple, connection: AsyncConnection):
+        '''
+        Return a connection which can be reused (it is closed if enough
+        idle connections to the host are kept already)
+
+        Args:
+            key:
+                (host, port) of the connection
+            connection:
+                The open connection
+        '''
+
+        idle = self._idle.setdefault(key, [])
+
+        if len(idle) < self.max_idle_per_host:
+            idle.append(connection)
+        else:
+            connection.close()
+
+    def idle_count(self, key: tuple = None) -> int:
+        '''
+        Number of idle connections to a host (or to all hosts, if key is None)
+        '''
+
+        if key is not None:
+            return len(self._idle.get(key, ()))
+
+        return sum(len(idle) for idle in self._idle.values())
+
+    def close(self, key: tuple = None):
+        '''
+        Close the idle connections to a host (or to all hosts, if key is None)
+        '''
+
+        keys = list(self._idle) if key is None else [key]
+
+        for key in keys:
+            for connection in self._idle.pop(key, ()):
+                connection.close()
+
+
+class AsyncWTClient(object):
+    '''
+    Non-blocking keep-alive HTTP/1.1 client for a single War Thunder web
+    interface host
+    '''
+
+    def __init__(self, host: str = 'localhost', port: int = WT_PORT, timeout: float = DEFAULT_TIMEOUT,
+                 pool: AsyncConnectionPool = None):
+        '''
+        Args:
+            host:
+                Host running War Thunder
+            port:
+                Port of the War Thunder web interface
+            timeout:
+                Default timeout in seconds for each request (None waits until
+                the server answers)
+            pool:
+                Pool to keep the idle connections in, i.e. shared with the
+                clients of other hosts. Defaults to a pool of its own
+        '''
+
+        self.host      = host
+        self.port      = port
+        self.timeout   = timeout
+        self.pool      = pool if pool is not None else AsyncConnectionPool()
+        self._key      = (host, port)
+        self._requests = {}
+
+    def close(self):
+        '''
+        Close all idle connections to the host (the next request reconnects)
+        '''
+
+        self.pool.close(self._key)
+
+    async def get(self, path: str, timeout: float = None, deadline: float = None) -> Response:
+        '''
+        Query a single path of the web interface
+
+        Args:
+            path:
+                Path to query (i.e. "/state")
+            timeout:
+                Timeout in seconds, defaults to self.timeout
+            deadline:
+                time.monotonic() timestamp by which the response has to be
+                received (see get_many)
+
+        Returns:
+                Response of the server, None if it missed the deadline
+        '''
+
+        return (await self.get_many([path], timeout, deadline))[0]
+
+    async def get_many(self, paths: list, timeout: float = None, deadline: float = None) -> list:
+        '''
+        Query several paths of the web interface concurrently (one task per
+        path) and join the results once all of them arrived
+
+        Args:
+            paths:
+                Paths to query (i.e. ["/indicators", "/state"])
+            timeout:
+                Timeout in seconds of each request, defaults to self.timeout
+            deadline:
+                time.monotonic() timestamp by which all responses have to be
+                received. Requests that are not complete by then are
+                cancelled and returned as None, the call never waits beyond
+                the deadline
+
+        Returns:
+                List of responses in the same order as paths
+
+        Raises:
+                ConnectFailed if the host could not be reached, ClientError
+                (or one of its subclasses) if a request failed otherwise
+        '''
+
+        if timeout is None:
+            timeout = self.timeout
+
+        if not paths:
+            return []
+
+        tasks = [asyncio.ensure_future(self._get(path, timeout)) for path in paths]
+        wait  = None if deadline is None else max(0, deadline - monotonic())
+        done, pending = await asyncio.wait(tasks, timeout=wait)
+
+        for task in pending:
+            task.cancel()
+
+        if pending:
+            # let the cancelled tasks close their connections
+            await asyncio.wait(pending)
+
+        responses = []
+        error     = None
+
+        for task in tasks:
+            if task in pending or task.cancelled():
+                responses.append(None)
+            elif task.exception() is not None:
+                error = error or task.exception()
+                responses.append(None)
+            else:
+                responses.append(task.result())
+
+        if error is not None:
+            raise error
+
+        return responses
+
+    async def _get(self, path: str, timeout: float) -> Response:
+        '''
+        Query a path on an idle connection (or a new one). If a reused
+        connection turns out to be closed by the server, the request is sent
+        once more on a fresh connection
+        '''
+
+        async with self.pool.slots:
+            return await self._get_on_connection(path, timeout)
+
+    async def _get_on_connection(self, path: str, timeout: float) -> Response:
+        '''
+        Query a path, see _get (a slot of the pool has to be held)
+        '''
+
+        while True:
+            connection = self.pool.take(self._key)
+            reused     = connection is not None
+
+            if not reused:
+                connection = await self._open(timeout)
+
+            try:
+                status, body, keep_alive = await asyncio.wait_for(connection.request(self._request(path)), timeout)
+
+            except asyncio.TimeoutError as e:
+                connection.close()
+                raise RequestTimeout(f'{self.host}:{self.port} did not answer within {timeout}s') from e
+
+            except (OSError, ClientError) as e:
+                connection.close()
+
+                if reused:
+                    continue
+
+                if isinstance(e, ClientError):
+                    raise
+                raise ClientError(f'Connection to {self.host}:{self.port} failed: {e}') from e
+
+            except BaseException:
+                # i.e. cancelled because of the deadline, the connection is in an unknown state
+                connection.close()
+                raise
+
+            if keep_alive:
+                self.pool.put(self._key, connection)
+            else:
+                connection.close()
+
+            return Response(path, status, body)
+
+    async def _open(self, timeout: float) -> AsyncConnection:
+        '''
+        Open a new connection within the timeout
+        '''
+
+        try:
+            return await asyncio.wait_for(AsyncConnection.open(self.host, self.port), timeout)
+        except asyncio.TimeoutError as e:
+            raise RequestTimeout(f'Connecting to {self.host}:{self.port} timed out') from e
+
+    def _request(self, path: str) -> bytes:
+        '''
+        Build (and cache) the raw request for a path
+        '''
+
+        try:
+            return self._requests[path]
+        except KeyError:
+            request = (f'GET {path} HTTP/1.1\r\n'
+                       f'Host: {self.host}:{self.port}\r\n'
+                       'Connection: keep-alive\r\n'
+                       'Accept-Encoding: identity\r\n'
+                       '\r\n').encode('ascii')
+            if len(self._requests) >= MAX_CACHED_REQUESTS:
+                # paths with changing query strings (gamechat, hudmsg)
+                self._requests.clear()
+            self._requests[path] = request
+            return request
@@ -0,0 +1,509 @@
+'''
+Module providing a lightweight persistent-connection HTTP/1.1 client for the
+War Thunder web interface (http://localhost:8111)
+
+The game's web server is polled several times a second. Instead of paying for
+a fresh TCP connection and the full requests stack on every poll, WTClient
+keeps one socket alive, reuses it between ticks and pipelines several GET
+requests on it (all requests are written at once, the responses are read back
+in order). WTClientPool offers the same interface but issues the requests of
+one call concurrently, each on its own persistent connection.
+'''
+
+
+import json
+import socket
+import threading
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+WT_PORT         = 8111
+DEFAULT_TIMEOUT = 1.0
+RECV_SIZE       = 64 * 1024
+HEADER_END      = b'\r\n\r\n'
+MAX_CACHED_REQUESTS = 32
+
+
+class ClientError(ConnectionError):
+    '''
+    Raised when the web interface could not be queried
+    '''
+
+
+class ConnectFailed(ClientError):
+    '''
+    Raised when no connection to the web interface could be established
+    (i.e. War Thunder is not running)
+    '''
+
+
+class RequestTimeout(ClientError):
+    '''
+    Raised when the web interface did not answer in time
+    '''
+
+
+class ConnectionClosed(ClientError):
+    '''
+    Raised when the server closed the connection before a full response was
+    received
+    '''
+
+
+class DeadlineExceeded(RequestTimeout):
+    '''
+    Raised internally when the deadline of a call passed
+    '''
+
+
+class Response(object):
+    '''
+    Raw response of a single GET request
+    '''
+
+    __slots__ = ('path', 'status', 'body', 'received_at')
+
+    def __init__(self, path: str, status: int, body: bytes, received_at: float = None):
+        self.path   = path
+        self.status = status
+        self.body   = body
+        # time.monotonic() timestamp at which the response was complete
+        self.received_at = monotonic() if received_at is None else received_at
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+    def json(self):
+        '''
+        Decode the response body as JSON
+
+        Returns:
+                Decoded JSON object
+        '''
+
+        return json.loads(self.body)
+
+    def __repr__(self) -> str:
+        return f'<Response {self.path} [{self.status}] {len(self.body)} bytes>'
+
+
+class WTClient(object):
+    '''
+    Keep-alive HTTP/1.1 client for a single War Thunder web interface host
+    '''
+
+    def __init__(self, host: str = 'localhost', port: int = WT_PORT, timeout: float = DEFAULT_TIMEOUT):
+        '''
+        Args:
+            host:
+                Host running War Thunder
+            port:
+                Port of the War Thunder web interface
+            timeout:
+                Default socket timeout in seconds for each request (None
+                blocks until the server answers)
+        '''
+
+        self.host      = host
+        self.port      = port
+        self.timeout   = timeout
+        self._sock     = None
+        self._buffer   = bytearray()
+        self._requests = {}
+        self._timeout  = timeout
+        self._deadline = None
+
+    def close(self):
+        '''
+        Close the underlying socket (the next request reconnects)
+        '''
+
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+
+        self._sock = None
+        self._buffer.clear()
+
+    def get(self, path: str, timeout: float = None, deadline: float = None) -> Response:
+        '''
+        Query a single path of the web interface
+
+        Args:
+            path:
+                Path to query (i.e. "/state")
+            timeout:
+                Socket timeout in seconds, defaults to self.timeout
+            deadline:
+                time.monotonic() timestamp by which the response has to be
+                received (see get_many)
+
+        Returns:
+                Response of the server, None if it missed the deadline
+        '''
+
+        return self.get_many([path], timeout, deadline)[0]
+
+    def get_many(self, paths: list, timeout: float = None, deadline: float = None) -> list:
+        '''
+        Query several paths of the web interface by pipelining all requests
+        on the persistent connection
+
+        If a reused connection turns out to be closed by the server, the
+        outstanding requests are sent once more on a fresh connection.
+
+        Args:
+            paths:
+                Paths to query (i.e. ["/indicators", "/state"]), the most
+                important ones should come first
+            timeout:
+                Socket timeout in seconds, defaults to self.timeout
+            deadline:
+                time.monotonic() timestamp by which all responses have to be
+                received. Responses that are not complete by then are
+                returned as None (the connection is reset), so the call never
+                blocks beyond the deadline
+
+        Returns:
+                List of responses in the same order as paths
+        '''
+
+        if timeout is None:
+            timeout = self.timeout
+
+        self._timeout  = timeout
+        self._deadline = deadline
+
+        responses = []
+        pending   = list(paths)
+        retried   = False
+
+        while pending:
+            reused = self._sock is not None
+
+            try:
+                sock = self._connect(timeout)
+                sock.settimeout(self._remaining())
+                sock.sendall(b''.join(self._request(path) for path in pending))
+
+                while pending:
+                    status, body, keep_alive = self._read_response(sock)
+                    responses.append(Response(pending.pop(0), status, body))
+
+                    if not keep_alive:
+                        # remaining requests are sent again on a new connection
+                        self.close()
+                        break
+
+            except DeadlineExceeded:
+                self.close()
+                return responses + [None] * len(pending)
+
+            except socket.timeout as e:
+                self.close()
+
+                if deadline is not None and monotonic() >= deadline:
+                    return responses + [None] * len(pending)
+
+                raise RequestTimeout(f'{self.host}:{self.port} did not answer within {timeout}s') from e
+
+            except ConnectFailed:
+                raise
+
+            except OSError as e:
+                self.close()
+
+                if not reused or retried:
+                    if isinstance(e, ClientError):
+                        raise
+                    raise ClientError(f'Connection to {self.host}:{self.port} failed: {e}') from e
+
+                retried = True
+
+        return responses
+
+    def _connect(self, timeout: float) -> socket.socket:
+        '''
+        Return the open socket, connecting first if needed
+        '''
+
+        if self._sock is None:
+            try:
+                self._sock = socket.create_connection((self.host, self.port), self._remaining())
+            except DeadlineExceeded:
+                raise
+            except socket.timeout as e:
+                raise RequestTimeout(f'Connecting to {self.host}:{self.port} timed out') from e
+            except OSError as e:
+                raise ConnectFailed(f'Failed to establish a new connection to {self.host}:{self.port}: {e}') from e
+
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._buffer.clear()
+
+        return self._sock
+
+    def _request(self, path: str) -> bytes:
+        '''
+        Build (and cache) the raw request for a path
+        '''
+
+        try:
+            return self._requests[path]
+        except KeyError:
+            request = (f'GET {path} HTTP/1.1\r\n'
+                       f'Host: {self.host}:{self.port}\r\n'
+                       'Connection: keep-alive\r\n'
+                       'Accept-Encoding: identity\r\n'
+                       '\r\n').encode('ascii')
+            if len(self._requests) >= MAX_CACHED_REQUESTS:
+                # paths with changing query strings (gamechat, hudmsg)
+                self._requests.clear()
+            self._requests[path] = request
+            return request
+
+    def _remaining(self) -> float:
+        '''
+        Socket timeout for the next operation of the current call
+
+        Raises:
+                DeadlineExceeded if the deadline of the current call passed
+        '''
+
+        if self._deadline is None:
+            return self._timeout
+
+        left = self._deadline - monotonic()
+
+        if left <= 0:
+            raise DeadlineExceeded(f'Deadline for {self.host}:{self.port} passed')
+
+        return left if self._timeout is None else min(self._timeout, left)
+
+    def _fill(self, sock: socket.socket) -> bool:
+        '''
+        Receive more data into the buffer
+
+        Returns:
+                False if the server closed the connection
+        '''
+
+        if self._deadline is not None:
+            sock.settimeout(self._remaining())
+
+        chunk = sock.recv(RECV_SIZE)
+
+        if not chunk:
+            return False
+
+        self._buffer += chunk
+        return True
+
+    def _read_until(self, sock: socket.socket, marker: bytes) -> bytes:
+        '''
+        Pop everything up to and including marker from the buffer
+        '''
+
+        start = 0
+
+        while True:
+            index = self._buffer.find(marker, start)
+
+            if index >= 0:
+                end  = index + len(marker)
+                data = bytes(self._buffer[:end])
+                del self._buffer[:end]
+                return data
+
+            start = max(0, len(self._buffer) - len(marker) + 1)
+
+            if not self._fill(sock):
+                raise ConnectionClosed('Connection closed while reading response')
+
+    def _read_exact(self, sock: socket.socket, size: int) -> bytes:
+        '''
+        Pop exactly size bytes from the buffer
+        '''
+
+        while len(self._buffer) < size:
+            if not self._fill(sock):
+                raise ConnectionClosed('Connection closed while reading response body')
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _read_response(self, sock: socket.socket) -> tuple:
+        '''
+        Read a single response from the connection
+
+        Returns:
+                Status code, body and whether the connection stays open
+        '''
+
+        head    = self._read_until(sock, HEADER_END).decode('latin-1')
+        lines   = head.split('\r\n')
+        version, status = lines[0].split(' ', 2)[:2]
+        headers = {}
+
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip().lower()
+
+        connection = headers.get('connection', '')
+        keep_alive = (connection != 'close') if version == 'HTTP/1.1' else (connection == 'keep-alive')
+
+        if 'chunked' in headers.get('transfer-encoding', ''):
+            body = bytearray()
+
+            while True:
+                size = int(self._read_until(sock, b'\r\n').split(b';', 1)[0], 16)
+
+                if size == 0:
+                    self._read_until(sock, b'\r\n')
+                    break
+
+                body += self._read_exact(sock, size)
+                self._read_exact(sock, 2)
+
+            body = bytes(body)
+
+        elif 'content-length' in headers:
+            body = self._read_exact(sock, int(headers['content-length']))
+
+        else:
+            # body is delimited by the server closing the connection
+            while self._fill(sock):
+                pass
+
+            body = bytes(self._buffer)
+            self._buffer.clear()
+            keep_alive = False
+
+        return int(status), body, keep_alive
+
+
+class WTClientPool(object):
+    '''
+    Drop-in replacement for WTClient which issues the requests of one call
+    concurrently. Every worker thread keeps its own persistent WTClient, so
+    the latency of a call is bounded by the slowest single request instead
+    of the sum of all of them.
+    '''
+
+    def __init__(self, host: str = 'localhost', port: int = WT_PORT, timeout: float = DEFAULT_TIMEOUT, max_workers: int = 5):
+        '''
+        Args:
+            host:
+                Host running War Thunder
+            port:
+                Port of the War Thunder web interface
+            timeout:
+                Default socket timeout in seconds for each request
+            max_workers:
+                Maximum number of concurrent connections
+        '''
+
+        self.host      = host
+        self.port      = port
+        self.timeout   = timeout
+        self._local    = threading.local()
+        self._clients  = []
+        self._lock     = threading.Lock()
+        self._closed   = 0 # number of close() calls, see _get
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=f'WTClientPool-{host}')
+
+    def close(self):
+        '''
+        Close all connections of the pool (the next request reconnects). A
+        worker may be in the middle of a request, so each worker closes its
+        own connection before its next request
+        '''
+
+        with self._lock:
+            self._closed += 1
+
+    def shutdown(self):
+        '''
+        Stop the worker threads and close all connections. Waits for running
+        requests, which end by their timeout or deadline at the latest
+        '''
+
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+        # no worker uses its connection anymore
+        with self._lock:
+            for client in self._clients:
+                client.close()
+
+    def get(self, path: str, timeout: float = None, deadline: float = None) -> Response:
+        '''
+        Query a single path of the web interface
+
+        Args:
+            path:
+                Path to query (i.e. "/state")
+            timeout:
+                Socket timeout in seconds, defaults to self.timeout
+            deadline:
+                time.monotonic() timestamp by which the response has to be
+                received (see get_many)
+
+        Returns:
+                Response of the server, None if it missed the deadline
+        '''
+
+        return self.get_many([path], timeout, deadline)[0]
+
+    def get_many(self, paths: list, timeout: float = None, deadline: float = None) -> list:
+        '''
+        Query several paths of the web interface concurrently and join the
+        results once all of them arrived
+
+        Args:
+            paths:
+                Paths to query (i.e. ["/indicators", "/state"])
+            timeout:
+                Socket timeout in seconds, defaults to self.timeout
+            deadline:
+                time.monotonic() timestamp by which all responses have to be
+                received. Responses that are not complete by then are
+                returned as None, the call never blocks beyond the deadline
+
+        Returns:
+                List of responses in the same order as paths
+        '''
+
+        if timeout is None:
+            timeout = self.timeout
+
+        futures = [self._executor.submit(self._get, path, timeout, deadline) for path in paths]
+        wait(futures, timeout=None if deadline is None else max(0, deadline - monotonic()))
+
+        return [future.result() if future.done() else None for future in futures]
+
+    def _get(self, path: str, timeout: float, deadline: float) -> Response:
+        '''
+        Query a path on the persistent connection of the calling worker thread
+        '''
+
+        client = getattr(self._local, 'client', None)
+
+        if client is None:
+            client = WTClient(self.host, self.port, self.timeout)
+            self._local.client = client
+
+            with self._lock:
+                self._clients.append(client)
+        elif self._local.closed != self._closed:
+            # the pool was closed since the last request of this worker
+            client.close()
+
+        self._local.closed = self._closed
+
+        return client.get(path, timeout, deadline)
@@ -0,0 +1,217 @@
+'''
+Module providing a compact, schema-driven container for the telemetry of
+http://localhost:8111/indicators and http://localhost:8111/state
+
+A TelemetryFrame stores all numeric values in a fixed array('d') whose layout
+is given by a FrameSchema (missing values are NaN, integers are returned as
+int again), all other values (i.e. the airframe name or the "valid" flags) in
+a small side dictionary. Frames are mappings, so they can be used wherever
+the decoded JSON dictionaries were used before. FrameView chains several frames without
+copying them, i.e. to present indicators and state as one full telemetry
+frame.
+'''
+
+
+import sys
+from array import array
+from collections.abc import Mapping
+
+
+MISSING = float('nan')
+
+
+class FrameSchema(object):
+    '''
+    Ordered set of telemetry keys, mapping every key to a slot of the value
+    array of a TelemetryFrame. Keys can only be added, so the slots of
+    existing frames stay valid
+    '''
+
+    def __init__(self, keys=()):
+        '''
+        Args:
+            keys:
+                Initial keys of the schema (their order defines the slots)
+        '''
+
+        self.keys     = []
+        self.index    = {}
+        self.template = array('d')
+
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str) -> int:
+        '''
+        Add a key to the schema, if it is not part of it yet
+
+        Args:
+            key:
+                Telemetry key (i.e. "IAS, km/h")
+
+        Returns:
+                Slot of the key
+        '''
+
+        try:
+            return self.index[key]
+        except KeyError:
+            key = sys.intern(key)
+            self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.template.append(MISSING)
+            return self.index[key]
+
+
+class TelemetryFrame(Mapping):
+    '''
+    Telemetry values of one sample, stored in the layout of a FrameSchema
+    '''
+
+    __slots__ = ('schema', 'values', 'integral', 'objects')
+
+    def __init__(self, schema: FrameSchema):
+        '''
+        Args:
+            schema:
+                Schema defining the slots of the values
+        '''
+
+        self.schema   = schema
+        self.values   = array('d', schema.template)
+        # whether the value of a slot was an int, kept per frame as a key may change its type
+        self.integral = bytearray(len(self.values))
+        self.objects  = {}
+
+    @classmethod
+    def from_dict(cls, schema: FrameSchema, source: dict) -> 'TelemetryFrame':
+        '''
+        Create a frame holding all values of a dictionary, unknown keys are
+        added to the schema
+
+        Args:
+            schema:
+                Schema defining the slots of the values
+            source:
+                Decoded telemetry
+
+        Returns:
+                New frame
+        '''
+
+        frame = cls(schema)
+
+        for key, value in source.items():
+            frame[key] = value
+
+        return frame
+
+    def __setitem__(self, key: str, value):
+        # bool is a subclass of int but is kept as is
+        if type(value) is float or type(value) is int:
+            slot = self.schema.add(key)
+
+            if slot >= len(self.values):
+                # the schema grew after this frame was created
+                self.integral.extend(bytes(len(self.schema.template) - len(self.values)))
+                self.values.extend(self.schema.template[len(self.values):])
+
+            self.values[slot]   = value
+            self.integral[slot] = type(value) is int
+            if self.objects:
+                self.objects.pop(key, None)
+        else:
+            slot = self.schema.index.get(key)
+
+            if slot is not None and slot < len(self.values):
+                self.values[slot] = MISSING
+
+            self.objects[key] = value
+
+    def __getitem__(self, key: str):
+        slot = self.schema.index.get(key)
+
+        if slot is not None and slot < len(self.values):
+            value = self.values[slot]
+
+            if value == value:
+                return int(value) if self.integral[slot] else value
+
+        return self.objects[key]
+
+    def __contains__(self, key) -> bool:
+        slot = self.schema.index.get(key)
+
+        if slot is not None and slot < len(self.values) and self.values[slot] == self.values[slot]:
+            return True
+
+        return key in self.objects
+
+    def __iter__(self):
+        values = self.values
+
+        for slot, key in enumerate(self.schema.keys[:len(values)]):
+            if values[slot] == values[slot]:
+                yield key
+
+        yield from self.objects
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        return bool(self.objects) or any(value == value for value in self.values)
+
+    def __repr__(self) -> str:
+        return f'<TelemetryFrame {dict(self)}>'
+
+
+class FrameView(Mapping):
+    '''
+    Read-only view over several frames (or dictionaries) without copying
+    them. A key is looked up in the given order, the first frame holding it
+    wins
+    '''
+
+    __slots__ = ('frames',)
+
+    def __init__(self, *frames):
+        '''
+        Args:
+            frames:
+                Frames or dictionaries to look keys up in, in order of
+                precedence
+        '''
+
+        self.frames = frames
+
+    def __getitem__(self, key: str):
+        for frame in self.frames:
+            if key in frame:
+                return frame[key]
+
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return any(key in frame for frame in self.frames)
+
+    def __iter__(self):
+        seen = set()
+
+        for frame in self.frames:
+            for key in frame:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        return any(self.frames)
+
+    def __repr__(self) -> str:
+        return f'<FrameView {dict(self)}>'
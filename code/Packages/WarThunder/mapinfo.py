@@ -4,24 +4,21 @@ Module to query and access map and non-player object/vehicle data during War Thu
 print("imported own map object")
 
 import os
-import socket
 import imagehash
-from time import sleep
-from requests import get
+from io import BytesIO
 from PIL import Image, ImageDraw
 from json.decoder import JSONDecodeError
-from simplejson.errors import JSONDecodeError as simpleJSONDecodeError
-from urllib.error import URLError
-from urllib.request import urlretrieve
-from requests.exceptions import ReadTimeout, ConnectTimeout
 from math import radians, degrees, sqrt, sin, asin, cos, atan2
 from Packages.WarThunder.maps import maps
+from Packages.WarThunder.client import WTClient, ClientError, RequestTimeout
 
 
 LOCAL_PATH   = os.path.dirname(os.path.realpath(__file__))
-MAP_PATH     = os.path.join(LOCAL_PATH, 'map.jpg')
 ENEMY_HEX_COLORS = ['#f40C00', '#ff0D00', '#ff0000']
 MAX_HAMMING_DIST = 3
+MAP_HASHES       = [(int(map_hash, 16), map_hash) for map_hash in maps.keys()]
+NIBBLE_MASK      = int('1' * 16, 16)
+MAP_INFO_KEYS    = ('map_generation', 'map_min', 'map_max', 'grid_zero')
 EARTH_RADIUS_KM  = 6378.137
 REQUEST_TIMEOUT  = 0.1
 
@@ -144,12 +141,14 @@ def get_grid_info(map_img: Image) -> dict:
                  'size_km' : 65},
     '''
     
-    hash_ = str(imagehash.average_hash(map_img))
+    hash_ = int(str(imagehash.average_hash(map_img)), 16)
     hamming_dists = []
     
-    for map_hash in maps.keys():
-        hamming_dists.append((len([index for index in range(len(hash_)) if not hash_[index] == map_hash[index]]), map_hash))
-        
+    for map_int, map_hash in MAP_HASHES:
+        # number of differing hex digits between both hashes
+        diff = hash_ ^ map_int
+        diff = (diff | (diff >> 1) | (diff >> 2) | (diff >> 3)) & NIBBLE_MASK
+        hamming_dists.append((diff.bit_count(), map_hash))
         
     match = min(hamming_dists)
     
@@ -450,13 +449,16 @@ class map_obj(object):
 
 
 class MapInfo(object):
-    def __init__(self, host: str = 'localhost'):
+    def __init__(self, host: str = 'localhost', client: WTClient = None):
         self.host = host
+        self.client = client if client is not None else WTClient(host)
         self.base_url = f'http://{self.host}:8111'
-        self.url_map_img = f'{self.base_url}/map.img'
-        self.url_map_obj = f'{self.base_url}/map_obj.json'
-        self.url_map_info = f'{self.base_url}/map_info.json'
+        self.url_map_img = '/map.img'
+        self.url_map_obj = '/map_obj.json'
+        self.url_map_info = '/map_info.json'
         self.map_valid = False
+        self.img_valid = False
+        self.map_key   = None
         self.map_objs  = []
         self.info = {}
         self.obj = []
@@ -500,35 +502,125 @@ class MapInfo(object):
                 Whether or not the map data was successfully retrieved
         '''
         
+        try:
+            info_response, obj_response = self.client.get_many([self.url_map_info,
+                                                                self.url_map_obj],
+                                                               timeout=REQUEST_TIMEOUT)
+            self.load_map_info(info_response)
+            self.load_map_obj(obj_response)
+            
+            if self.needs_map_img:
+                self.load_map_img(self.client.get(self.url_map_img, timeout=REQUEST_TIMEOUT))
+            
+            self.parse_meta()
+            return self.map_valid
+            
+        except RequestTimeout:
+            print('ERROR: Timeout')
+            
+        except ClientError:
+            print('ERROR: could not download map data')
+        
+        self.map_valid = False
+        return self.map_valid
+    
+    @property
+    def needs_map_img(self) -> bool:
+        '''
+        Whether the map image of the current match still has to be downloaded
+        and identified (only the case once per match, see load_map_info)
+        '''
+        
+        return (self.map_key is not None) and not self.img_valid
+    
+    def load_map_img(self, img_response) -> bool:
+        '''
+        Process a downloaded response of /map.img and identify the map. The
+        image is decoded in memory and the identified self.grid_info is kept
+        until load_map_info detects a new map
+        
+        Args:
+            img_response:
+                client.Response of http://localhost:8111/map.img
+        
+        Returns:
+                Whether or not the map image was successfully loaded
+        '''
+        
+        self.img_valid = False
         self.map_valid = False
         
         try:
-            urlretrieve(self.url_map_img, MAP_PATH)
-            self.info = get(self.url_map_info, timeout=REQUEST_TIMEOUT).json()
-            self.obj  = get(self.url_map_obj,  timeout=REQUEST_TIMEOUT).json()
-            self.parse_meta()
+            if not img_response.ok:
+                raise OSError(f'map.img returned HTTP {img_response.status}')
             
-            self.map_img  = Image.open(MAP_PATH)
+            self.map_img  = Image.open(BytesIO(img_response.body))
+            self.map_img.load()
             self.map_draw = ImageDraw.Draw(self.map_img)
             
             self.grid_info = get_grid_info(self.map_img)
             
-            self.map_valid = True
-                
-        except URLError:
-            print('ERROR: could not download map.jpg')
+            self.img_valid = True
+            self.map_valid = self.map_key is not None
     
-        except (OSError, JSONDecodeError, simpleJSONDecodeError):
-            print('Waiting to join a match') # TODO: Das wird dauernd aufgerufen
-            sleep(1)
-            
-        except ReadTimeout:
-            print('ERROR: ReadTimeout')
+        except OSError:
+            print('Waiting to join a match')
             
-        except ConnectTimeout:
-            print('ERROR: ConnectTimeout')
+        return self.img_valid
+    
+    def load_map_info(self, info_response) -> bool:
+        '''
+        Process a downloaded response of /map_info.json. If the map metadata
+        (see MAP_INFO_KEYS) changed, a new match started and the map image
+        has to be identified again (see needs_map_img)
+        
+        Args:
+            info_response:
+                client.Response of http://localhost:8111/map_info.json
+        
+        Returns:
+                Whether or not the map changed
+        '''
+        
+        try:
+            self.info = info_response.json()
+        except JSONDecodeError:
+            self.info = {}
+        
+        if self.info.get('valid', True) and 'map_generation' in self.info:
+            map_key = tuple(repr(self.info.get(key)) for key in MAP_INFO_KEYS)
+        else:
+            map_key = None
+        
+        changed = map_key != self.map_key
+        
+        if changed:
+            self.map_key   = map_key
+            self.img_valid = False
+        
+        self.map_valid = self.img_valid and (self.map_key is not None)
+        return changed
+    
+    def load_map_obj(self, obj_response) -> bool:
+        '''
+        Process a downloaded response of /map_obj.json (call parse_meta
+        afterwards to rebuild self.map_objs)
+        
+        Args:
+            obj_response:
+                client.Response of http://localhost:8111/map_obj.json
+        
+        Returns:
+                Whether or not the map objects were successfully loaded
+        '''
+        
+        try:
+            self.obj = obj_response.json()
+            return True
             
-        return self.map_valid
+        except JSONDecodeError:
+            self.obj = []
+            return False
     
     def parse_meta(self):
         '''
@@ -0,0 +1,131 @@
+'''
+Module to decode only selected keys of the flat JSON objects returned by
+http://localhost:8111/state and http://localhost:8111/indicators
+
+Both endpoints return about 75 keys per request while only a handful of them
+are consumed. ProjectionDecoder finds the wanted keys with a single
+precompiled regular expression scan over the raw response body and decodes
+only their values, so no objects are built for unused keys. If the optional
+orjson package is installed, it is used to decode the full body instead (which
+is faster than scanning in Python) and the result is projected afterwards.
+'''
+
+
+import re
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_decoder = json.JSONDecoder()
+
+
+class ProjectionDecoder(object):
+    '''
+    Decoder for flat JSON objects that only extracts the given keys
+    '''
+
+    def __init__(self, keys: set = None, use_orjson: bool = True):
+        '''
+        Args:
+            keys:
+                Keys to extract, None decodes the complete object
+            use_orjson:
+                Whether or not to use orjson if it is installed
+        '''
+
+        self.keys       = None if keys is None else frozenset(keys)
+        self.use_orjson = use_orjson and (orjson is not None)
+        self._pattern   = None
+        self._encoded   = {}
+
+        if self.keys:
+            # JSON encoded key (without quotes) -> key
+            self._encoded = {json.dumps(key)[1:-1]: key for key in self.keys}
+            alternatives  = sorted(self._encoded.keys(), key=len, reverse=True)
+            
+            # a key is always followed by ":", a string value by "," or "}"
+            self._pattern = re.compile('"(' + '|'.join(re.escape(key) for key in alternatives) + r')"\s*:\s*')
+
+    def decode(self, body: bytes) -> dict:
+        '''
+        Decode the wanted keys of a JSON object
+
+        Args:
+            body:
+                Raw JSON response body
+
+        Returns:
+                Dictionary holding all wanted keys present in body
+        '''
+
+        if self.keys is None:
+            return orjson.loads(body) if self.use_orjson else json.loads(body)
+
+        if self.use_orjson:
+            full = orjson.loads(body)
+            return {key: full[key] for key in self.keys if key in full}
+
+        text = body.decode('utf-8') if isinstance(body, (bytes, bytearray)) else body
+
+        if not text.lstrip().startswith('{'):
+            # let the standard library raise a proper JSONDecodeError
+            return json.loads(text)
+
+        result = {}
+
+        if self._pattern is None:
+            return result
+
+        for match in self._pattern.finditer(text):
+            result[self._encoded[match.group(1)]] = _decoder.raw_decode(text, match.end())[0]
+
+        return result
+
+    def decode_into(self, body: bytes, frame):
+        '''
+        Decode the wanted keys of a JSON object directly into a frame (see
+        frame.TelemetryFrame), without building an intermediate dictionary
+        for the regular expression scan
+
+        Args:
+            body:
+                Raw JSON response body
+            frame:
+                Frame to store the values in
+
+        Returns:
+                The given frame
+
+        Raises:
+            ValueError: If body is no JSON object (json.JSONDecodeError if it
+                        is no valid JSON at all)
+        '''
+
+        if self.keys is None or self.use_orjson:
+            full = orjson.loads(body) if self.use_orjson else json.loads(body)
+
+            if not isinstance(full, dict):
+                raise ValueError(f'Expected a JSON object, got {type(full).__name__}')
+
+            for key, value in full.items():
+                if self.keys is None or key in self.keys:
+                    frame[key] = value
+            return frame
+
+        text = body.decode('utf-8') if isinstance(body, (bytes, bytearray)) else body
+
+        if not text.lstrip().startswith('{'):
+            # let the standard library raise a proper JSONDecodeError for invalid JSON
+            raise ValueError(f'Expected a JSON object, got {type(json.loads(text)).__name__}')
+
+        if self._pattern is None:
+            return frame
+
+        for match in self._pattern.finditer(text):
+            frame[self._encoded[match.group(1)]] = _decoder.raw_decode(text, match.end())[0]
+
+        return frame
@@ -3,9 +3,12 @@ Module to query and access telemetry data during War Thunder matches
 '''
 
 
-import socket
-import requests
+from time import monotonic
 from . import mapinfo
+from .client import WTClient, WTClientPool, ClientError, ConnectFailed, RequestTimeout
+from .aioclient import AsyncWTClient
+from .projection import ProjectionDecoder
+from .frame import FrameSchema, TelemetryFrame, FrameView
 FT_TO_M        = 0.3048
 IN_FLIGHT      = 0
 IN_MENU        = -1
@@ -16,6 +19,29 @@ METRICS_PLANES = ['p-', 'f-', 'f2', 'f3', 'f4', 'f6', 'f7', 'f8', 'f9', 'os',
                   'sb', 'tb', 'a-', 'pb', 'am', 'ad', 'fj', 'b-', 'b_', 'xp',
                   'bt', 'xa', 'xf', 'sp', 'hu', 'ty', 'fi', 'gl', 'ni', 'fu',
                   'fu', 'se', 'bl', 'be', 'su', 'te', 'st', 'mo', 'we', 'ha']
+METRICS_PREFIXES = frozenset(METRICS_PLANES)
+# Altitude keys of /indicators in order of preference
+ALTITUDE_KEYS  = ('altitude_10k', 'altitude_hour', 'altitude_min')
+
+# Seconds between two queries of each endpoint (None - only when requested,
+# i.e. the map image once the map info reports a new match)
+DEFAULT_CADENCES = {'indicators': 1 / 20,
+                    'state':      1 / 20,
+                    'map_obj':    1.0,
+                    'map_info':   1.0,
+                    'map_img':    None,
+                    'hudmsg':     1 / 2,
+                    'gamechat':   1 / 2}
+SCHEDULE_SLACK   = 0.01
+
+# Keys of /indicators and /state needed by TelemInterface itself
+INTERFACE_KEYS = {'valid', 'type', 'compass', 'aviahorizon_pitch', 'aviahorizon_roll',
+                  'altitude_10k', 'altitude_hour', 'altitude_min',
+                  'TAS, km/h', 'flaps, %', 'gear, %'}
+
+# Endpoints whose responses are compared to the previous ones, an identical
+# body is neither decoded again nor does it change the telemetry
+FINGERPRINTED_ENDPOINTS = ('state', 'indicators', 'map_obj', 'map_info')
 
 
 def combine_dicts(to_dict: dict, from_dict: dict) -> dict:
@@ -42,22 +68,235 @@ def combine_dicts(to_dict: dict, from_dict: dict) -> dict:
         return {}
 
 
+class PollSchedule(object):
+    '''
+    Keeps track of when each endpoint of the web interface is due to be
+    queried again, so every endpoint can be polled at its own cadence
+    '''
+    
+    def __init__(self, cadences: dict = None):
+        '''
+        Args:
+            cadences:
+                Seconds between two queries of each endpoint (None - only
+                query once until reset), defaults to DEFAULT_CADENCES
+        '''
+        
+        self.cadences  = dict(DEFAULT_CADENCES)
+        self.last_poll = {}
+        
+        if cadences is not None:
+            self.cadences.update(cadences)
+    
+    def due(self, endpoints: list, now: float) -> list:
+        '''
+        Filter the given endpoints for those that have to be queried
+        
+        Args:
+            endpoints:
+                Names of the endpoints to check (keys of self.cadences)
+            now:
+                Current time.monotonic() timestamp
+        
+        Returns:
+                List of endpoints that are due
+        '''
+        
+        due = []
+        
+        for endpoint in endpoints:
+            last    = self.last_poll.get(endpoint)
+            cadence = self.cadences.get(endpoint, 0)
+            
+            if last is None:
+                due.append(endpoint)
+            elif cadence is not None and (now - last) >= (cadence - SCHEDULE_SLACK):
+                due.append(endpoint)
+        
+        return due
+    
+    def mark(self, endpoint: str, now: float):
+        '''
+        Record that an endpoint was successfully queried
+        
+        Args:
+            endpoint:
+                Name of the endpoint
+            now:
+                time.monotonic() timestamp of the query
+        '''
+        
+        self.last_poll[endpoint] = now
+    
+    def reset(self, endpoint: str = None):
+        '''
+        Make an endpoint (or all endpoints) due immediately
+        
+        Args:
+            endpoint:
+                Name of the endpoint, None resets all endpoints
+        '''
+        
+        if endpoint is None:
+            self.last_poll.clear()
+        else:
+            self.last_poll.pop(endpoint, None)
+
+
+class AirframeProfile(object):
+    '''
+    Normalization of the /indicators values of one airframe. The units of an
+    airframe are fixed, so the profile is built once when the airframe
+    changes and every following sample is normalized without searching keys
+    again. Only a profile built from a sample lacking some of the keys (i.e.
+    right after spawning) is checked against every sample, see outdated
+    '''
+    
+    __slots__ = ('airframe', 'imperial', 'altitude_key', 'altitude_factor',
+                 'has_pitch', 'has_roll', 'complete')
+    
+    def __init__(self, indicators):
+        '''
+        Args:
+            indicators:
+                Decoded /indicators of the airframe (before normalization)
+        '''
+        
+        self.airframe        = indicators.get('type')
+        self.imperial        = (self.airframe is not None) and (self.airframe[:2] in METRICS_PREFIXES)
+        self.altitude_key    = next((key for key in ALTITUDE_KEYS if key in indicators), None)
+        # account for freedom units in US and UK planes
+        self.altitude_factor = FT_TO_M if self.imperial else 1
+        self.has_pitch       = 'aviahorizon_pitch' in indicators
+        self.has_roll        = 'aviahorizon_roll' in indicators
+        self.complete        = self.has_pitch and self.has_roll and (self.altitude_key == ALTITUDE_KEYS[0])
+    
+    def outdated(self, indicators) -> bool:
+        '''
+        Whether the keys of a sample differ from those the profile was built
+        from (a profile with all keys only notices missing keys, see normalize)
+        
+        Args:
+            indicators:
+                Decoded /indicators of the airframe
+        
+        Returns:
+                True if the profile has to be built again
+        '''
+        
+        if self.complete:
+            return False
+        
+        return ((self.has_pitch != ('aviahorizon_pitch' in indicators)) or
+                (self.has_roll != ('aviahorizon_roll' in indicators)) or
+                (self.altitude_key != next((key for key in ALTITUDE_KEYS if key in indicators), None)))
+    
+    def altitude(self, indicators) -> float:
+        '''
+        Altitude in meters
+        
+        Args:
+            indicators:
+                Decoded /indicators of the airframe
+        
+        Returns:
+                Altitude in meters, 0 if the airframe reports none
+        '''
+        
+        if self.altitude_key is None:
+            return 0
+        
+        return indicators[self.altitude_key] * self.altitude_factor
+    
+    def normalize(self, indicators):
+        '''
+        Fix odd WT sign conventions and add the altitude in meters ("alt_m")
+        
+        Args:
+            indicators:
+                Freshly decoded /indicators of the airframe, changed in place
+        
+        Raises:
+                KeyError if a key of the profile is missing, the profile has
+                to be built again
+        '''
+        
+        # read everything before writing, so a KeyError leaves indicators untouched
+        pitch = -indicators['aviahorizon_pitch'] if self.has_pitch else 0
+        roll  = -indicators['aviahorizon_roll']  if self.has_roll  else 0
+        
+        if self.airframe is not None:
+            indicators['alt_m'] = self.altitude(indicators)
+        
+        indicators['aviahorizon_pitch'] = pitch
+        indicators['aviahorizon_roll']  = roll
+
+
 class TelemInterface(object):
-    def __init__(self, host: str = 'localhost'):
+    def __init__(self, host: str = 'localhost', concurrent: bool = False, cadences: dict = None, keys: set = None):
+        '''
+        Args:
+            host:
+                Host running War Thunder
+            concurrent:
+                Whether the requests of one get_telemetry call are issued
+                concurrently (one connection per endpoint) instead of being
+                pipelined on a single connection
+            cadences:
+                Seconds between two queries of each endpoint, see
+                DEFAULT_CADENCES
+            keys:
+                Keys of /indicators and /state the consumers need. Only these
+                (and INTERFACE_KEYS) are decoded into self.indicators,
+                self.state and self.full_telemetry. None decodes all keys
+        '''
+        
         self.host            = host
         self.base_url        = f'http://{self.host}:8111'
+        self.client          = WTClientPool(host) if concurrent else WTClient(host)
         self.connected       = False
         self.full_telemetry  = {}
         self.basic_telemetry = {}
         self.indicators      = {}
         self.state           = {}
-        self.map_info        = mapinfo.MapInfo(host=host)
+        self.map_info        = mapinfo.MapInfo(host=host, client=self.client)
+        self.schedule        = PollSchedule(cadences)
+        self.decoder         = ProjectionDecoder(None if keys is None else INTERFACE_KEYS | set(keys))
+        self.probe_decoder   = ProjectionDecoder({'valid', 'type'})
+        # slots of the decoded values, grows with new keys if all keys are decoded
+        self.schema          = FrameSchema(() if keys is None else sorted(self.decoder.keys | {'alt_m'}))
+        self.profile         = None
+        self.missed_deadlines = 0
+        self.unchanged       = False
+        self.changed_endpoints = set()
+        self.received_at     = None
+        self.rtt             = None
+        # endpoint -> time.monotonic() timestamps (sent, received) of the response it is served from
+        self.stamps          = {}
+        self.unchanged_responses = 0
+        self.last_bodies     = {}
         self.last_event_ID   = -1
         self.last_comment_ID = -1
         self.comments        = []
         self.events          = {}
         self.status          = WT_NOT_RUNNING
     
+    def close(self):
+        '''
+        Close the connections to the web interface and stop the worker
+        threads of a concurrent client. The interface must not be used
+        afterwards
+        '''
+        
+        if isinstance(self.client, WTClientPool):
+            self.client.shutdown()
+        else:
+            self.client.close()
+        
+        if self.map_info.client is not self.client:
+            # blocking client of the map of an AsyncTelemInterface
+            self.map_info.client.close()
+    
     def get_comments(self) -> list:
         '''
         Query http://localhost:8111/gamechat?lastId=-1 to get a list of all
@@ -66,12 +305,17 @@ class TelemInterface(object):
         Returns:
                 List of comments
         '''
-        url = f'{self.base_url}/gamechat?lastId={self.last_comment_ID}'
-        comments_response = requests.get(url)
+        comments_response = self.client.get(self.__comments_path())
+        self.__load_comments(comments_response)
+        return self.comments
+    
+    def __comments_path(self) -> str:
+        return f'/gamechat?lastId={self.last_comment_ID}'
+    
+    def __load_comments(self, comments_response):
         self.comments.extend(comments_response.json())
         if self.comments:
             self.last_comment_ID = max([comment['id'] for comment in self.comments])
-        return self.comments
     
     def get_events(self) -> dict:
         '''
@@ -82,16 +326,20 @@ class TelemInterface(object):
         Returns:
                 Events log dictionary
         '''
-        url = f'{self.base_url}/hudmsg?lastEvt=-1&lastDmg={self.last_event_ID}'
-        events_response    = requests.get(url)
-        self.events        = combine_dicts(self.events, events_response.json())
+        events_response = self.client.get(self.__events_path())
+        self.__load_events(events_response)
+        return self.events
+    
+    def __events_path(self) -> str:
+        return f'/hudmsg?lastEvt=-1&lastDmg={self.last_event_ID}'
+    
+    def __load_events(self, events_response):
+        self.events = combine_dicts(self.events, events_response.json())
         
         try:
             self.last_event_ID = max([event['id'] for event in self.events['damage']])
         except ValueError:
             self.last_event_ID = -1
-        
-        return self.events
     
     def find_altitude(self) -> float:
         '''
@@ -101,38 +349,137 @@ class TelemInterface(object):
                 Altitude in meters
         '''
         
-        name = self.indicators['type']
+        return self.__airframe_profile().altitude(self.indicators)
+    
+    def __airframe_profile(self) -> AirframeProfile:
+        '''
+        Profile of the current airframe, only built again when it changes
+        '''
         
-        # account for freedom units in US and UK planes
-        if name[:2] in METRICS_PLANES:
-            if 'altitude_10k' in self.indicators.keys():
-                return self.indicators['altitude_10k'] * FT_TO_M
-            elif 'altitude_hour' in self.indicators.keys():
-                return self.indicators['altitude_hour'] * FT_TO_M
-            elif 'altitude_min' in self.indicators.keys():
-                return self.indicators['altitude_min'] * FT_TO_M
-            else:
-                return 0
+        if (self.profile is None) or (self.profile.airframe != self.indicators.get('type')):
+            self.profile = AirframeProfile(self.indicators)
+        
+        return self.profile
+
+    def __endpoint_path(self, endpoint: str) -> str:
+        if endpoint == 'map_img':
+            return self.map_info.url_map_img
+        elif endpoint == 'map_info':
+            return self.map_info.url_map_info
+        elif endpoint == 'map_obj':
+            return self.map_info.url_map_obj
+        elif endpoint == 'gamechat':
+            return self.__comments_path()
+        elif endpoint == 'hudmsg':
+            return self.__events_path()
         else:
-            if 'altitude_10k' in self.indicators.keys():
-                return self.indicators['altitude_10k']
-            elif 'altitude_hour' in self.indicators.keys():
-                return self.indicators['altitude_hour']
-            elif 'altitude_min' in self.indicators.keys():
-                return self.indicators['altitude_min']
-            else:
-                return 0
+            return f'/{endpoint}'
+    
+    def __load_indicators(self, indicator_response):
+        self.indicators = self.decoder.decode_into(indicator_response.body, TelemetryFrame(self.schema))
+        
+        if self.indicators['valid']:
+            if self.__airframe_profile().outdated(self.indicators):
+                # the airframe started reporting a key it lacked so far
+                self.profile = AirframeProfile(self.indicators)
+            
+            try:
+                self.profile.normalize(self.indicators)
+            except KeyError:
+                # the airframe stopped reporting a key, build the profile again
+                self.profile = AirframeProfile(self.indicators)
+                self.profile.normalize(self.indicators)
 
-    def get_telemetry(self, comments: bool = False, events: bool = False) -> bool:
+    def probe(self, deadline: float = None) -> int:
+        '''
+        Cheaply check whether the player is in a match with a single request
+        of http://localhost:8111/indicators. Meant to be polled instead of
+        get_telemetry while the player is in the hangar or War Thunder is not
+        running. When a spawn is detected, all endpoints are made due so the
+        next get_telemetry call samples everything at once
+        
+        Args:
+            deadline:
+                time.monotonic() timestamp by which the probe has to finish
+        
+        Returns:
+                Status of the game (IN_FLIGHT if the player has spawned)
+        '''
+        
+        last_status = self.status
+        
+        try:
+            self._load_probe(self.client.get('/indicators', deadline=deadline))
+            
+        except ConnectFailed:
+            self.status = WT_NOT_RUNNING
+            
+        except Exception:
+            self.status = OTHER_ERROR
+        
+        return self._finish_probe(last_status)
+    
+    def _load_probe(self, indicator_response):
+        '''
+        Set self.status from the response of a probe (None if it missed the
+        deadline)
+        '''
+        
+        if indicator_response is None:
+            self.missed_deadlines += 1
+            raise RequestTimeout('/indicators missed the deadline')
+        
+        indicators = self.probe_decoder.decode(indicator_response.body)
+        
+        if indicators.get('valid') and 'type' in indicators:
+            self.status = IN_FLIGHT
+        elif indicators.get('valid'):
+            self.status = IN_MENU
+        else:
+            self.status = NO_MISSION
+    
+    def _finish_probe(self, last_status: int) -> int:
+        '''
+        Make all endpoints due if the probe detected a spawn
+        '''
+        
+        if self.status == IN_FLIGHT and last_status != IN_FLIGHT:
+            self.schedule.reset()
+        
+        return self.status
+
+    def get_telemetry(self, comments: bool = False, events: bool = False, deadline: float = None) -> bool:
         '''
         Ping http://localhost:8111/indicators and http://localhost:8111/state
-        to sample telemetry data. Each one of the URL requests returns a
-        respective JSON string. These two JSON strings are converted into
-        dictionaries (self.indicators and self.state). From these dictionaries,
-        two more dictionaries are created: self.full_telemetry and
-        self.basic_telemetry.
+        to sample telemetry data. Every endpoint is only queried when it is
+        due according to self.schedule (i.e. the map image once per match,
+        map objects once a second), all other values are served from the
+        last response. All requests of one call are pipelined on the
+        persistent connection of self.client, or issued concurrently if the
+        interface was created with concurrent=True, and joined into one
+        consistent frame. If a deadline is given, endpoints that did not
+        answer in time are skipped for this call (counted in
+        self.missed_deadlines) and served from their last response as well.
+        The time.monotonic() timestamp at which the telemetry was received
+        is stored in self.received_at, the time its requests took in
+        self.rtt (both are only updated when the telemetry changed). If
+        /state or /indicators is served from an older response, its
+        timestamps are used, so the age of the frame is never understated.
+        Responses of FINGERPRINTED_ENDPOINTS whose body is byte-identical to
+        the previous one (i.e. while the game is paused) are not decoded
+        again. If none of them changed, the last telemetry is kept as is and
+        self.unchanged is set, so callers can skip their processing too
+        (counted in self.unchanged_responses). This requires at least one
+        identical response: if every queried endpoint missed the deadline,
+        the call fails like any other request error. The endpoints whose
+        content changed are listed in self.changed_endpoints.
+        Each one of the URL requests returns a
+        respective JSON string. These two JSON strings are decoded into
+        frames (self.indicators and self.state, see frame.TelemetryFrame).
+        From these frames, two more mappings are created: self.full_telemetry
+        and self.basic_telemetry.
         
-        Dictionary self.full_telemetry holds a combination of all telemetry
+        Mapping self.full_telemetry is a view combining all telemetry
         values returned from http://localhost:8111/indicators and
         http://localhost:8111/state. Dictionary self.basic_telemetry holds
         the minimal amount of telmetry needed for navigation and control (see
@@ -143,95 +490,286 @@ class TelemInterface(object):
                 Whether or not to query for match comment data
             events:
                 Whether or not to query for match event data
+            deadline:
+                time.monotonic() timestamp by which the call has to return
         
         Returns:
                 Whether or not player is in a match
         '''
         
+        self.unchanged = False
+        self.changed_endpoints = set()
+
+        try:
+            now     = monotonic()
+            due     = self._due_endpoints(comments, events, now)
+            fetched = self.client.get_many(self._endpoint_paths(due), deadline=deadline)
+            self._load_responses(due, fetched, now)
+        
+        except Exception as e:
+            self._on_telemetry_error(e)
+        
+        return self.connected
+    
+    def _due_endpoints(self, comments: bool, events: bool, now: float) -> list:
+        '''
+        Endpoints to query in a get_telemetry call, most important ones first
+        (they are answered first)
+        '''
+        
+        endpoints = ['state', 'indicators', 'map_obj', 'map_info']
+        
+        if self.map_info.needs_map_img:
+            endpoints.append('map_img')
+            self.schedule.reset('map_img')
+        
+        if comments:
+            endpoints.append('gamechat')
+        else:
+            self.comments = []
+        
+        if events:
+            endpoints.append('hudmsg')
+        else:
+            self.events = {}
+        
+        return self.schedule.due(endpoints, now)
+    
+    def _endpoint_paths(self, endpoints: list) -> list:
+        '''
+        Paths of the web interface to query for the given endpoints
+        '''
+        
+        return [self.__endpoint_path(endpoint) for endpoint in endpoints]
+    
+    def _load_responses(self, due: list, fetched: list, now: float):
+        '''
+        Process the responses of a get_telemetry call (see there)
+        
+        Args:
+            due:
+                Queried endpoints
+            fetched:
+                Responses in the same order as due, None for those that
+                missed the deadline
+            now:
+                time.monotonic() timestamp at which the requests were sent
+        '''
+        
+        responses = {}
+        
+        for endpoint, response in zip(due, fetched):
+            if response is None:
+                # missed the deadline, stays due for the next call
+                self.missed_deadlines += 1
+            else:
+                responses[endpoint] = response
+                self.stamps[endpoint] = (now, response.received_at)
+                self.schedule.mark(endpoint, now)
+        
+        identical = 0
+        
+        for endpoint in FINGERPRINTED_ENDPOINTS:
+            if endpoint in responses:
+                body = responses[endpoint].body
+                
+                if body == self.last_bodies.get(endpoint):
+                    del responses[endpoint]
+                    identical += 1
+                else:
+                    self.last_bodies[endpoint] = body
+        
+        self.changed_endpoints = set(responses)
+        
+        if not responses:
+            if due and not identical:
+                # nothing arrived in time, this is a miss and not a paused game
+                raise RequestTimeout('No endpoint answered before the deadline')
+            
+            if self.last_bodies:
+                # same input as the last successful call, keep its telemetry
+                self.unchanged = True
+                self.unchanged_responses += 1
+                return
+        
         self.connected       = False
         self.full_telemetry  = {}
         self.basic_telemetry = {}
-
-        try:
-            self.map_info.download_files()
+        
+        if 'map_info' in responses:
+            self.map_info.load_map_info(responses['map_info'])
+        
+        if 'map_img' in responses and self.map_info.needs_map_img:
+            self.map_info.load_map_img(responses['map_img'])
+        
+        if 'map_obj' in responses:
+            self.map_info.load_map_obj(responses['map_obj'])
+        
+        if 'map_img' in responses or 'map_obj' in responses:
             self.map_info.parse_meta()
+        
+        if 'indicators' in responses:
+            self.__load_indicators(responses['indicators'])
+        
+        if 'state' in responses:
+            self.state = self.decoder.decode_into(responses['state'].body, TelemetryFrame(self.schema))
+        
+        if 'gamechat' in responses:
+            self.__load_comments(responses['gamechat'])
+        
+        if 'hudmsg' in responses:
+            self.__load_events(responses['hudmsg'])
+        
+        if not self.indicators or not self.state:
+            raise RequestTimeout('No telemetry received before the deadline')
+        
+        # the frame is as old as the older one of both responses it is built from
+        sent, received   = min(self.stamps['state'], self.stamps['indicators'], key=lambda stamp: stamp[1])
+        self.received_at = received
+        self.rtt         = received - sent
 
-            indicator_url = f'{self.base_url}/indicators'
-            indicator_response = requests.get(indicator_url)
-            self.indicators    = indicator_response.json()
+        if self.indicators['valid'] and self.state['valid']:
+            try:
+                # values of /state take precedence, as both frames are only viewed no values are copied
+                self.full_telemetry = FrameView(self.state, self.indicators)
+                
+                self.basic_telemetry['airframe'] = self.indicators['type']
+                self.basic_telemetry['roll']     = self.indicators['aviahorizon_roll']
+                self.basic_telemetry['pitch']    = self.indicators['aviahorizon_pitch']
+                self.basic_telemetry['heading']  = self.indicators['compass']
+                self.basic_telemetry['altitude'] = self.indicators['alt_m']
+            
+                self.basic_telemetry['lat'] = self.map_info.player_lat
+                self.basic_telemetry['lon'] = self.map_info.player_lon
+                self.full_telemetry = FrameView({'lat': self.map_info.player_lat,
+                                                 'lon': self.map_info.player_lon},
+                                                self.state, self.indicators)
+                
+                try: 
+                    self.basic_telemetry['IAS'] = self.state['TAS, km/h']
+                except KeyError:
+                    self.basic_telemetry['IAS'] = None
+                
+                try: 
+                    self.basic_telemetry['flapState'] = self.state['flaps, %']
+                except KeyError:
+                    self.basic_telemetry['flapState'] = None
+                
+                try: 
+                    self.basic_telemetry['gearState'] = self.state['gear, %']
+                except KeyError:
+                    self.basic_telemetry['gearState'] = None
+                
+                self.connected = True
+                self.status    = IN_FLIGHT
+                
+            except (KeyError, AttributeError):
+                self.status = IN_MENU
+        else:
+            self.status = NO_MISSION
+    
+    def _on_telemetry_error(self, e: Exception):
+        '''
+        Reset the telemetry after a failed get_telemetry call
+        '''
+        
+        self.connected       = False
+        self.full_telemetry  = {}
+        self.basic_telemetry = {}
+        # the connection might have been reset, decode the next responses in any case
+        self.last_bodies.clear()
+        self.changed_endpoints = set()
+        
+        if isinstance(e, ConnectFailed):
+            self.status = WT_NOT_RUNNING
+        elif isinstance(e, ClientError):
+            self.status = OTHER_ERROR
+        else:
+            import traceback
+            traceback.print_exc()
+            self.status = OTHER_ERROR
 
-            state_url = f'{self.base_url}/state'
-            state_response = requests.get(state_url)
-            self.state     = state_response.json()
+
+class AsyncTelemInterface(TelemInterface):
+    '''
+    TelemInterface for asyncio event loops: probe and get_telemetry are
+    coroutines which query the web interface with an AsyncWTClient (one task
+    per endpoint) instead of blocking. The results are stored in the same
+    attributes as by TelemInterface
+    '''
+    
+    def __init__(self, host: str = 'localhost', cadences: dict = None, keys: set = None, client: AsyncWTClient = None):
+        '''
+        Args:
+            host:
+                Host running War Thunder
+            cadences:
+                Seconds between two queries of each endpoint, see
+                DEFAULT_CADENCES
+            keys:
+                Keys of /indicators and /state the consumers need, see
+                TelemInterface
+            client:
+                Client to query the web interface with, defaults to a new
+                AsyncWTClient for host
+        '''
+        
+        super().__init__(host, cadences=cadences, keys=keys)
+        # self.map_info keeps its blocking client for MapInfo.download_files
+        self.client = client if client is not None else AsyncWTClient(host)
+    
+    async def probe(self, deadline: float = None) -> int:
+        '''
+        Non-blocking version of TelemInterface.probe
+        
+        Args:
+            deadline:
+                time.monotonic() timestamp by which the probe has to finish
+        
+        Returns:
+                Status of the game (IN_FLIGHT if the player has spawned)
+        '''
+        
+        last_status = self.status
+        
+        try:
+            self._load_probe(await self.client.get('/indicators', deadline=deadline))
             
-            if comments:
-                self.get_comments()
-            else:
-                self.comments = []
+        except ConnectFailed:
+            self.status = WT_NOT_RUNNING
             
-            if events:
-                self.get_events()
-            else:
-                self.events = {}
-
-            if self.indicators['valid'] and self.state['valid']:
-                try:
-                    # fix odd WT sign conventions
-                    try:
-                        self.indicators['aviahorizon_pitch'] = -self.indicators['aviahorizon_pitch']
-                    except KeyError:
-                        self.indicators['aviahorizon_pitch'] = 0
-                    
-                    try:
-                        self.indicators['aviahorizon_roll']  = -self.indicators['aviahorizon_roll']
-                    except KeyError:
-                        self.indicators['aviahorizon_roll']  = 0
-                    
-                    self.indicators['alt_m'] = self.find_altitude()
-                    
-                    self.full_telemetry = combine_dicts(self.full_telemetry, self.indicators)
-                    self.full_telemetry = combine_dicts(self.full_telemetry, self.state)
-                    
-                    self.basic_telemetry['airframe'] = self.indicators['type']
-                    self.basic_telemetry['roll']     = self.indicators['aviahorizon_roll']
-                    self.basic_telemetry['pitch']    = self.indicators['aviahorizon_pitch']
-                    self.basic_telemetry['heading']  = self.indicators['compass']
-                    self.basic_telemetry['altitude'] = self.indicators['alt_m']
-                
-                    self.basic_telemetry['lat'] = self.map_info.player_lat
-                    self.full_telemetry['lat']  = self.map_info.player_lat
-                    self.basic_telemetry['lon'] = self.map_info.player_lon
-                    self.full_telemetry['lon']  = self.map_info.player_lon
-                    
-                    try: 
-                        self.basic_telemetry['IAS'] = self.state['TAS, km/h']
-                    except KeyError:
-                        self.basic_telemetry['IAS'] = None
-                    
-                    try: 
-                        self.basic_telemetry['flapState'] = self.state['flaps, %']
-                    except KeyError:
-                        self.basic_telemetry['flapState'] = None
-                    
-                    try: 
-                        self.basic_telemetry['gearState'] = self.state['gear, %']
-                    except KeyError:
-                        self.basic_telemetry['gearState'] = None
-                    
-                    self.connected = True
-                    self.status    = IN_FLIGHT
-                    
-                except (KeyError, AttributeError):
-                    self.status = IN_MENU
-            else:
-                self.status = NO_MISSION
+        except Exception:
+            self.status = OTHER_ERROR
+        
+        return self._finish_probe(last_status)
+    
+    async def get_telemetry(self, comments: bool = False, events: bool = False, deadline: float = None) -> bool:
+        '''
+        Non-blocking version of TelemInterface.get_telemetry, all due
+        endpoints are queried concurrently
+        
+        Args:
+            comments:
+                Whether or not to query for match comment data
+            events:
+                Whether or not to query for match event data
+            deadline:
+                time.monotonic() timestamp by which the call has to return
+        
+        Returns:
+                Whether or not player is in a match
+        '''
+        
+        self.unchanged = False
+        self.changed_endpoints = set()
 
+        try:
+            now     = monotonic()
+            due     = self._due_endpoints(comments, events, now)
+            fetched = await self.client.get_many(self._endpoint_paths(due), deadline=deadline)
+            self._load_responses(due, fetched, now)
+        
         except Exception as e:
-            if 'Failed to establish a new connection' in str(e):
-                self.status = WT_NOT_RUNNING
-            else:
-                import traceback
-                traceback.print_exc()
-                self.status = OTHER_ERROR
+            self._on_telemetry_error(e)
         
         return self.connected
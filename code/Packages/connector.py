@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 import requests
 
+API_TIMEOUT = 5 # seconds to wait for the API before giving up
 
 class PlaneNotFound(Exception):
     def __init__(self, plane_type):
@@ -44,7 +45,12 @@ class APIConnection:
         :return: Plane Data
         :rtype: DBPlane
         """
-        response = requests.get(f"{self.base_url}{plane_id}")
+        try:
+            response = requests.get(f"{self.base_url}{plane_id}", timeout=API_TIMEOUT)
+        except requests.exceptions.Timeout as e:
+            raise APIConnectionError(f"API timeout: {e}") from e
+        except requests.exceptions.ConnectionError as e:
+            raise APIConnectionError(f"Network error: {e}") from e
         try:
             response.raise_for_status() # Raise an exception for bad status codes
         except requests.exceptions.HTTPError as e:
@@ -0,0 +1,189 @@
+from collections import deque
+from dataclasses import dataclass
+
+# Keys of the raw telemetry (/state) the derived channels are computed from
+CLIMB_RATE_KEY = "Vy, m/s"
+FUEL_KEY = "Mfuel, kg"
+G_LOAD_KEY = "Ny"
+AOA_KEY = "AoA, deg"
+DERIVED_TELEMETRY_KEYS = (CLIMB_RATE_KEY, FUEL_KEY, G_LOAD_KEY, AOA_KEY)
+
+# Window lengths in s
+ACCELERATION_WINDOW_S = 1.0
+CLIMB_RATE_WINDOW_S = 2.0
+FUEL_FLOW_WINDOW_S = 10.0
+PEAK_WINDOW_S = 5.0
+
+
+class RollingMean(object):
+    """Mean of the samples of the last seconds, kept up to date with a running sum (O(1) per sample)."""
+    def __init__(self, seconds:float):
+        self.seconds = seconds
+        self._samples:deque[tuple[float, float]] = deque()
+        self._sum = 0.0
+
+    def add(self, t:float, value:float) -> float:
+        """Add a sample and get the mean of the window
+
+        :param t: time.monotonic() timestamp of the sample
+        :type t: float
+        :param value: The value
+        :type value: float
+        :return: Mean of all samples within the window
+        :rtype: float
+        """
+        self._samples.append((t, value))
+        self._sum += value
+        while t - self._samples[0][0] > self.seconds:
+            self._sum -= self._samples.popleft()[1]
+        return self._sum / len(self._samples)
+
+    def clear(self) -> None:
+        self._samples.clear()
+        self._sum = 0.0
+
+
+class RollingExtreme(object):
+    """Maximum (or minimum) of the samples of the last seconds, kept in a monotonic deque (amortized O(1) per sample)."""
+    def __init__(self, seconds:float, maximum:bool = True):
+        """
+        :param seconds: Length of the window in s
+        :type seconds: float
+        :param maximum: True to track the maximum, False for the minimum, defaults to True
+        :type maximum: bool, optional
+        """
+        self.seconds = seconds
+        self.sign = 1 if maximum else -1
+        # (time, sign * value), sign * value is decreasing from left to right
+        self._samples:deque[tuple[float, float]] = deque()
+
+    def add(self, t:float, value:float) -> float:
+        """Add a sample and get the extreme of the window
+
+        :param t: time.monotonic() timestamp of the sample
+        :type t: float
+        :param value: The value
+        :type value: float
+        :return: Maximum (minimum) of all samples within the window
+        :rtype: float
+        """
+        value = self.sign * value
+        while self._samples and self._samples[-1][1] <= value:
+            self._samples.pop()
+        self._samples.append((t, value))
+        while t - self._samples[0][0] > self.seconds:
+            self._samples.popleft()
+        return self.sign * self._samples[0][1]
+
+    def clear(self) -> None:
+        self._samples.clear()
+
+
+class RollingSlope(object):
+    """Least squares slope (rate of change per s) of the samples of the last seconds, kept up to date with running
+    sums (O(1) per sample)."""
+    def __init__(self, seconds:float):
+        self.seconds = seconds
+        self._samples:deque[tuple[float, float]] = deque()
+        self._origin:float|None = None
+        self._sum_t = self._sum_v = self._sum_tt = self._sum_tv = 0.0
+
+    def add(self, t:float, value:float) -> float|None:
+        """Add a sample and get the slope of the window
+
+        :param t: time.monotonic() timestamp of the sample
+        :type t: float
+        :param value: The value
+        :type value: float
+        :return: Slope per s, None if the window holds less than two samples at different times
+        :rtype: float|None
+        """
+        if self._origin is None:
+            self._origin = t
+        # times relative to the first sample keep the sums precise
+        t -= self._origin
+        self._samples.append((t, value))
+        self.__account(t, value, 1)
+        while t - self._samples[0][0] > self.seconds:
+            self.__account(*self._samples.popleft(), -1)
+
+        n = len(self._samples)
+        denominator = n * self._sum_tt - self._sum_t * self._sum_t
+        if n < 2 or denominator <= 1e-12:
+            return None
+        return (n * self._sum_tv - self._sum_t * self._sum_v) / denominator
+
+    def __account(self, t:float, value:float, sign:int) -> None:
+        self._sum_t += sign * t
+        self._sum_v += sign * value
+        self._sum_tt += sign * t * t
+        self._sum_tv += sign * t * value
+
+    def clear(self) -> None:
+        self._samples.clear()
+        self._origin = None
+        self._sum_t = self._sum_v = self._sum_tt = self._sum_tv = 0.0
+
+
+@dataclass(slots=True)
+class DerivedTelemetry:
+    """Values derived from the telemetry stream, None if the plane does not report the needed data (yet)"""
+    ias_acceleration: float|None = None # km/h per s
+    climb_rate: float|None = None # m/s, smoothed
+    fuel_flow: float|None = None # kg per min
+    g_load_max: float|None = None # highest G-load of the last PEAK_WINDOW_S
+    g_load_min: float|None = None # lowest G-load of the last PEAK_WINDOW_S
+    aoa_max: float|None = None # highest angle of attack in deg of the last PEAK_WINDOW_S
+
+
+class DerivedTelemetryEngine(object):
+    """Computes DerivedTelemetry incrementally, every sample is processed once in O(1).
+    Has to be reset when the plane changes."""
+    def __init__(self):
+        self.ias_acceleration = RollingSlope(ACCELERATION_WINDOW_S)
+        self.climb_rate = RollingMean(CLIMB_RATE_WINDOW_S)
+        self.fuel = RollingSlope(FUEL_FLOW_WINDOW_S)
+        self.g_load_max = RollingExtreme(PEAK_WINDOW_S)
+        self.g_load_min = RollingExtreme(PEAK_WINDOW_S, maximum=False)
+        self.aoa_max = RollingExtreme(PEAK_WINDOW_S)
+
+    def update(self, t:float, ias:float|None, source) -> DerivedTelemetry:
+        """Add a sample
+
+        :param t: time.monotonic() timestamp at which the sample was received
+        :type t: float
+        :param ias: Indicated airspeed in km/h
+        :type ias: float | None
+        :param source: Mapping with the raw telemetry, see DERIVED_TELEMETRY_KEYS
+        :type source: Mapping
+        :return: The derived values including this sample
+        :rtype: DerivedTelemetry
+        """
+        derived = DerivedTelemetry()
+        if ias is not None:
+            derived.ias_acceleration = self.ias_acceleration.add(t, ias)
+
+        value = source.get(CLIMB_RATE_KEY)
+        if value is not None:
+            derived.climb_rate = self.climb_rate.add(t, value)
+
+        value = source.get(FUEL_KEY)
+        if value is not None:
+            slope = self.fuel.add(t, value)
+            derived.fuel_flow = -slope * 60 if slope is not None else None
+
+        value = source.get(G_LOAD_KEY)
+        if value is not None:
+            derived.g_load_max = self.g_load_max.add(t, value)
+            derived.g_load_min = self.g_load_min.add(t, value)
+
+        value = source.get(AOA_KEY)
+        if value is not None:
+            derived.aoa_max = self.aoa_max.add(t, value)
+
+        return derived
+
+    def reset(self) -> None:
+        """Drop all samples, e.g. after the plane changed"""
+        for window in (self.ias_acceleration, self.climb_rate, self.fuel, self.g_load_max, self.g_load_min, self.aoa_max):
+            window.clear()
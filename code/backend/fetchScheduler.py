@@ -0,0 +1,190 @@
+import time
+from enum import Enum
+from typing import Callable
+from Packages.WarThunder import telemetry
+from .refreshRateTuner import RefreshRateTuner
+
+ACTIVE_GRACE_S = 3.0 # Time to keep polling at full rate after the player was last seen in flight
+TICK_BUDGET = 0.8 # Share of the current intervall a single run may spend waiting for the WT-API
+HEADROOM_SHARE = 0.05 # With adaptive_intervall, poll at least this often relative to the time to the nearest speed limit
+MAX_RELAX_FACTOR = 4 # With adaptive_intervall, the intervall in flight is at most this factor above std_intervall
+RELAX_HYSTERESIS = 0.25 # With adaptive_intervall, the intervall is only raised once the headroom exceeds the next step by this share
+
+class FetchPhase(Enum):
+    ACTIVE = "active"   # in flight, full telemetry is fetched every std_intervall
+    IDLE = "idle"       # in hangar or menu, only a cheap probe request every idle_intervall
+    OFFLINE = "offline" # WT not running or errors, probe every error_intervall
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class FetchScheduler(object):
+    """State machine deciding in which phase (see FetchPhase) and intervall the WT-API is queried.
+
+    It is shared by the drivers worker.dataFetcher (QTimer) and IngestEngine (asyncio), which only run the requests and
+    report their results (on_probe, on_telemetry, on_error). The intervall of the current phase is read with
+    current_intervall, drivers which have to be told about changes register in self.intervall_callbacks.
+    """
+    def __init__(self, std_intervall_ms:int = 100, error_intervall_ms:int = 5000, idle_intervall_ms:int = 500,
+                 auto_intervall:bool = False, min_intervall_ms:int = 20, max_intervall_ms:int = 200, adaptive_intervall:bool = False):
+        """Create a scheduler, it starts in the active phase
+
+        :param std_intervall_ms: The intervall in ms while the player is in flight, defaults to 100
+        :type std_intervall_ms: int, optional
+        :param error_intervall_ms: The intervall in ms while WT is not reachable, defaults to 5000
+        :type error_intervall_ms: int, optional
+        :param idle_intervall_ms: The intervall in ms while the player is not in a match, defaults to 500
+        :type idle_intervall_ms: int, optional
+        :param auto_intervall: If True, the intervall in flight is tuned to the update rate of the game, defaults to False
+        :type auto_intervall: bool, optional
+        :param min_intervall_ms: Lowest intervall in ms if auto_intervall is set, defaults to 20
+        :type min_intervall_ms: int, optional
+        :param max_intervall_ms: Highest intervall in ms if auto_intervall is set, defaults to 200
+        :type max_intervall_ms: int, optional
+        :param adaptive_intervall: If True, poll slower while the plane is far from its speed limits, defaults to False
+        :type adaptive_intervall: bool, optional
+        """
+        self.std_intervall = std_intervall_ms
+        self.error_intervall = error_intervall_ms
+        self.idle_intervall = idle_intervall_ms
+        self.adaptive_intervall = adaptive_intervall
+        self.phase = FetchPhase.ACTIVE
+        self.time_to_limit = 0.0
+        # With adaptive_intervall, the intervall in flight is this multiple of std_intervall (1 to MAX_RELAX_FACTOR)
+        self.relax_factor = 1
+        self.tuner = RefreshRateTuner(min_intervall_ms, max_intervall_ms) if auto_intervall else None
+        if self.tuner is not None:
+            self.std_intervall = self.tuner.intervall
+        # Called with the new intervall in ms whenever current_intervall changes
+        self.intervall_callbacks:list[Callable[[int], None]] = []
+        # Called with the intervall in ms locked by the tuner, /state and /indicators have to be queried that often
+        self.cadence_callbacks:list[Callable[[int], None]] = []
+        self.__intervall = self.current_intervall()
+        self.__last_in_flight = time.monotonic()
+
+    def current_intervall(self) -> int:
+        """Get the intervall of the current phase in ms"""
+        match self.phase:
+            case FetchPhase.ACTIVE:
+                return self.active_intervall()
+            case FetchPhase.IDLE:
+                return self.idle_intervall
+            case _:
+                return self.error_intervall
+
+    def active_intervall(self) -> int:
+        """Get the intervall in ms to use in flight, raised in steps of std_intervall while no speed limit is near"""
+        if not self.adaptive_intervall or (self.tuner is not None and self.tuner.calibrating):
+            return self.std_intervall
+        return self.std_intervall * self.relax_factor
+
+    def deadline(self) -> float:
+        """Get the time.monotonic() timestamp by which a run started now has to be finished, see TICK_BUDGET"""
+        return time.monotonic() + self.current_intervall() / 1000 * TICK_BUDGET
+
+    def on_probe(self, status:int) -> bool:
+        """Report the game status found by a probe (outside the active phase)
+
+        :param status: Status of the game, one of the status constants of Packages.WarThunder.telemetry
+        :type status: int
+        :return: True if the player spawned, the full telemetry should then be fetched in the same run
+        :rtype: bool
+        """
+        if status != telemetry.IN_FLIGHT:
+            self.__set_phase(self.__phase_for_status(status))
+            return False
+        self.__last_in_flight = time.monotonic()
+        self.time_to_limit = 0.0
+        self.relax_factor = 1
+        self.__set_phase(FetchPhase.ACTIVE)
+        return True
+
+    def on_telemetry(self, state_changed:bool) -> None:
+        """Report a run which returned the telemetry of the plane
+
+        :param state_changed: Whether the content of /state changed with the run, measured by the tuner
+        :type state_changed: bool
+        """
+        self.__last_in_flight = time.monotonic()
+        if self.tuner is not None:
+            new_intervall = self.tuner.on_fetch(state_changed, self.__last_in_flight)
+            if new_intervall is not None:
+                self.__apply_tuned_intervall(new_intervall)
+
+    def on_error(self, status:int) -> None:
+        """Report a run without telemetry. The active phase is left if no telemetry was found for longer than
+        ACTIVE_GRACE_S (e.g. the player left the match), short gaps (e.g. right after spawning) keep the full rate.
+
+        :param status: Status of the game found by the run
+        :type status: int
+        """
+        if time.monotonic() - self.__last_in_flight > ACTIVE_GRACE_S:
+            if status == telemetry.IN_FLIGHT:
+                # in a match, but the telemetry of the plane is not usable
+                self.__set_phase(FetchPhase.OFFLINE)
+            else:
+                self.__set_phase(self.__phase_for_status(status))
+
+    def on_time_to_limit(self, seconds:float) -> None:
+        """Update the estimated time until the plane reaches its nearest speed limit, with adaptive_intervall the
+        intervall in flight is scaled with it.
+        The estimate changes with every frame, so the intervall only moves in whole steps of std_intervall. It is lowered
+        as soon as the headroom drops below the current step, but only raised once it exceeds the next one by
+        RELAX_HYSTERESIS, so the timer of the driver is not restarted on every frame.
+
+        :param seconds: Time to the nearest limit in s, 0 if a limit is exceeded, inf if none is approached
+        :type seconds: float
+        """
+        self.time_to_limit = seconds
+        # multiple of std_intervall which keeps HEADROOM_SHARE of the time to the limit
+        headroom = seconds * 1000 * HEADROOM_SHARE / max(1, self.std_intervall)
+        if seconds == float("inf"):
+            self.relax_factor = MAX_RELAX_FACTOR
+        elif headroom < self.relax_factor:
+            self.relax_factor = max(1, int(headroom))
+        elif headroom >= (self.relax_factor + 1) * (1 + RELAX_HYSTERESIS):
+            self.relax_factor = min(MAX_RELAX_FACTOR, int(headroom / (1 + RELAX_HYSTERESIS)))
+        self.__notify()
+
+    def set_std_intervall(self, interval_ms:int) -> None:
+        """Update the intervall used while the player is in flight, ignored while the tuner sets it
+
+        :param interval_ms: the new Intervall in ms
+        :type interval_ms: int
+        """
+        if self.tuner is not None:
+            return
+        self.std_intervall = interval_ms
+        self.__notify()
+
+    def start_calibration(self) -> None:
+        """Measure the update rate of the game again (e.g. after the endpoint changed), if auto_intervall is set"""
+        if self.tuner is not None:
+            self.__apply_tuned_intervall(self.tuner.start_calibration())
+
+    def __apply_tuned_intervall(self, interval_ms:int) -> None:
+        """Use an intervall found by the tuner while in flight, /state and /indicators are queried in every run"""
+        self.std_intervall = interval_ms
+        for callback in self.cadence_callbacks:
+            callback(interval_ms)
+        self.__notify()
+
+    def __phase_for_status(self, status:int) -> FetchPhase:
+        """Get the phase to use for a game status, which is not in flight"""
+        if status in (telemetry.IN_MENU, telemetry.NO_MISSION):
+            return FetchPhase.IDLE
+        return FetchPhase.OFFLINE
+
+    def __set_phase(self, phase:FetchPhase) -> None:
+        self.phase = phase
+        self.__notify()
+
+    def __notify(self) -> None:
+        """Call the intervall_callbacks if the intervall of the current phase changed"""
+        intervall = self.current_intervall()
+        if intervall == self.__intervall:
+            return
+        self.__intervall = intervall
+        for callback in self.intervall_callbacks:
+            callback(intervall)
@@ -0,0 +1,227 @@
+import asyncio
+import time
+from typing import Callable
+from Packages.Models.Plane import WTPlane
+from Packages.WarThunder import telemetry
+from .wtFetcher import AsyncWTUpdater, TelemetryData
+from .latestFrame import LatestFrameChannel
+from .telemetryDispatcher import merge_skipped_frame
+from .fetchScheduler import FetchScheduler, FetchPhase
+
+LATENCY_SMOOTHING = 0.2 # Weight of the newest sample in the moving average of the request latency
+
+
+def call_sinks(sinks:list[Callable], argument) -> None:
+    """Call every sink with the argument, an error of a sink is printed and neither stops the others nor the fetcher
+
+    :param sinks: The sinks, e.g. IngestEngine.frame_sinks
+    :type sinks: list[Callable]
+    :param argument: Frame or interface to hand to the sinks
+    """
+    for sink in sinks:
+        try:
+            sink(argument)
+        except Exception as e:
+            print(f"Error in sink {sink}: {e}")
+
+
+class IngestEngine(object):
+    """Headless counterpart of worker.dataFetcher, running in a plain asyncio event loop without Qt.
+
+    The WT-API is queried with an AsyncWTUpdater (one task per endpoint, non-blocking), the game state is followed by
+    the same FetchScheduler as in dataFetcher. Frames are published to self.telemetry_channel, the callbacks in
+    self.plane_callbacks and self.telemetry_callbacks are called like the signals new_plane_data and new_telemetry_data of
+    dataFetcher (in the thread of the event loop). Run it with asyncio.run(engine.run()) or as task of a running loop.
+    """
+    def __init__(self, endpoint_ip:str, debug_mode:bool = False, std_intervall_ms:int = 100, error_intervall_ms:int = 5000, idle_intervall_ms:int = 500,
+                 auto_intervall:bool = False, min_intervall_ms:int = 20, max_intervall_ms:int = 200, adaptive_intervall:bool = False, client = None):
+        """Create an engine, it starts fetching with run()
+
+        :param endpoint_ip: The Address of the local Warthunder web endpoint
+        :type endpoint_ip: str
+        :param debug_mode: If True, data is fetched from a local File instad of the Web Endpoint, defaults to False
+        :type debug_mode: bool, optional
+        :param std_intervall_ms: The intervall of fetching in ms while the player is in flight, defaults to 100
+        :type std_intervall_ms: int, optional
+        :param error_intervall_ms: The intervall of probing in ms while WT is not reachable, defaults to 5000
+        :type error_intervall_ms: int, optional
+        :param idle_intervall_ms: The intervall of probing the game state in ms while the player is not in a match, defaults to 500
+        :type idle_intervall_ms: int, optional
+        :param auto_intervall: If True, the intervall in flight is tuned to the update rate of the game, defaults to False
+        :type auto_intervall: bool, optional
+        :param min_intervall_ms: Lowest intervall in ms if auto_intervall is set, defaults to 20
+        :type min_intervall_ms: int, optional
+        :param max_intervall_ms: Highest intervall in ms if auto_intervall is set, defaults to 200
+        :type max_intervall_ms: int, optional
+        :param adaptive_intervall: If True, poll slower while the plane is far from its speed limits, defaults to False
+        :type adaptive_intervall: bool, optional
+        :param client: AsyncWTClient to query the WT-API with, defaults to None (a new client for endpoint_ip)
+        :type client: AsyncWTClient | None, optional
+        """
+        self.fetcher = AsyncWTUpdater(endpoint_ip, debug_mode, client)
+        self.scheduler = FetchScheduler(std_intervall_ms, error_intervall_ms, idle_intervall_ms, auto_intervall,
+                                        min_intervall_ms, max_intervall_ms, adaptive_intervall)
+        self.scheduler.cadence_callbacks.append(self.__set_cadence)
+        if self.scheduler.tuner is not None:
+            self.__set_cadence(self.scheduler.std_intervall)
+        self.own_plane:WTPlane|None = None
+        self.telemetry_channel = LatestFrameChannel(merge=merge_skipped_frame)
+        self.plane_callbacks:list[Callable[[WTPlane], None]] = []
+        self.telemetry_callbacks:list[Callable[[TelemetryData], None]] = []
+        # Called with every new frame, independent of the consumers of the channel (e.g. to export it). Must not block.
+        self.frame_sinks:list[Callable[[TelemetryData], None]] = []
+        # Called after every step (also probes outside of flight) with the interface of self.fetcher, see dataFetcher
+        self.interface_sinks:list[Callable[[telemetry.AsyncTelemInterface], None]] = []
+        self.paused = False
+        # Time in s the requests of the last run took and its exponential moving average, None until the first run
+        self.latency:float|None = None
+        self.mean_latency:float|None = None
+        self.__stopped = False
+        self.__stop_event:asyncio.Event|None = None
+        self.__plane_lookup:asyncio.Future|None = None
+
+    @property
+    def phase(self) -> FetchPhase:
+        return self.scheduler.phase
+
+    async def run(self) -> None:
+        """Fetch in the intervall of the current phase until stop() is called"""
+        self.__stop_event = asyncio.Event()
+        while not self.__stopped:
+            started = time.monotonic()
+            if not self.paused:
+                try:
+                    await self.step()
+                except Exception as e:
+                    # a failing step must not end the task, the next one is run as usual
+                    print(f"Error in fetch step: {e}")
+            delay = self.current_intervall() / 1000 - (time.monotonic() - started)
+            try:
+                await asyncio.wait_for(self.__stop_event.wait(), max(0.0, delay))
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        """Stop run() after the current step (also if it was not started yet), has to be called in the thread of the event loop"""
+        self.__stopped = True
+        if self.__stop_event is not None:
+            self.__stop_event.set()
+
+    def pause(self) -> None:
+        self.paused = True
+
+    def resume(self) -> None:
+        self.paused = False
+
+    def set_std_intervall(self, interval_ms:int) -> None:
+        """Update the intervall used while the player is in flight
+
+        :param interval_ms: the new Intervall in ms
+        :type interval_ms: int
+        """
+        self.scheduler.set_std_intervall(interval_ms)
+
+    def on_time_to_limit(self, seconds:float) -> None:
+        """Update the estimated time until the plane reaches its nearest speed limit, see dataFetcher.on_time_to_limit
+
+        :param seconds: Time to the nearest limit in s, 0 if a limit is exceeded, inf if none is approached
+        :type seconds: float
+        """
+        self.scheduler.on_time_to_limit(seconds)
+
+    async def step(self) -> None:
+        """Run a single fetch (or probe) for the current phase and publish the result"""
+        await self.__fetch()
+        call_sinks(self.interface_sinks, self.fetcher.tel_interface)
+
+    async def __fetch(self) -> None:
+        deadline = self.scheduler.deadline()
+        if self.phase != FetchPhase.ACTIVE:
+            started = time.monotonic()
+            status = await self.fetcher.probe(deadline)
+            self.__record_latency(time.monotonic() - started)
+            if not self.scheduler.on_probe(status):
+                return
+            # Spawn detected, fetch everything right now
+            deadline = self.scheduler.deadline()
+
+        started = time.monotonic()
+        await self.fetcher.fetch_data(deadline)
+        self.__record_latency(time.monotonic() - started)
+        tel = self.fetcher.get_plane_telemetry()
+        if tel is None:
+            self.scheduler.on_error(self.fetcher.status)
+            return
+
+        self.scheduler.on_telemetry("state" in self.fetcher.changed_endpoints)
+        self.__update_plane(tel.planetype)
+        if self.fetcher.unchanged:
+            return
+
+        self.own_plane.set_telemetry(tel)
+
+        call_sinks(self.frame_sinks, tel)
+        if self.telemetry_channel.publish(tel):
+            for callback in self.telemetry_callbacks:
+                callback(tel)
+
+    def current_intervall(self) -> int:
+        """Get the intervall of the current phase in ms"""
+        return self.scheduler.current_intervall()
+
+    def get_diagnostics(self) -> dict:
+        """Get counters describing the state of the fetch pipeline, see dataFetcher.get_diagnostics
+
+        :return: Dict of diagnostic values
+        :rtype: dict
+        """
+        channel_stats = self.telemetry_channel.stats()
+        _seq, frame = self.telemetry_channel.latest()
+        return {
+            "phase": str(self.phase),
+            "published_frames": channel_stats["published"],
+            "skipped_frames": channel_stats["skipped"],
+            "missed_deadlines": self.fetcher.missed_deadlines,
+            "unchanged_frames": self.fetcher.unchanged_responses,
+            "last_frame_seq": frame.seq if frame is not None else None,
+            "last_frame_age_ms": frame.age() * 1000 if frame is not None else None,
+            "last_rtt_ms": frame.rtt * 1000 if frame is not None else None,
+            "latency_ms": self.latency * 1000 if self.latency is not None else None,
+            "mean_latency_ms": self.mean_latency * 1000 if self.mean_latency is not None else None,
+            "std_intervall_ms": self.scheduler.std_intervall,
+            "active_intervall_ms": self.scheduler.active_intervall(),
+            "time_to_limit_s": self.scheduler.time_to_limit,
+            "calibrating": self.scheduler.tuner.calibrating if self.scheduler.tuner is not None else False,
+            "measured_refresh_hz": self.scheduler.tuner.measured_rate_hz if self.scheduler.tuner is not None else None,
+        }
+
+    def __record_latency(self, seconds:float) -> None:
+        self.latency = seconds
+        if self.mean_latency is None:
+            self.mean_latency = seconds
+        else:
+            self.mean_latency += LATENCY_SMOOTHING * (seconds - self.mean_latency)
+
+    def __update_plane(self, planetype:str) -> WTPlane:
+        """Get the plane of the current telemetry, see dataFetcher. The lookup runs in the default executor, so neither
+        the event loop nor the following steps wait for the database."""
+        if self.__plane_lookup is not None and self.__plane_lookup.done():
+            lookup, self.__plane_lookup = self.__plane_lookup, None
+            try:
+                self.own_plane = lookup.result()
+            except Exception as e:
+                # not retried, go on without limits
+                print(f"Error while looking up {planetype}: {e}")
+                self.own_plane = WTPlane(planetype, lookup=False)
+            for callback in self.plane_callbacks:
+                callback(self.own_plane)
+        if self.__plane_lookup is None and (self.own_plane is None or self.own_plane.lookup_outdated(planetype)):
+            self.__plane_lookup = asyncio.get_running_loop().run_in_executor(None, WTPlane, planetype)
+        if self.own_plane is None:
+            self.own_plane = WTPlane(planetype, lookup=False)
+            for callback in self.plane_callbacks:
+                callback(self.own_plane)
+        return self.own_plane
+
+    def __set_cadence(self, interval_ms:int) -> None:
+        self.fetcher.set_telemetry_cadence(interval_ms / 1000)
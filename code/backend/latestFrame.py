@@ -0,0 +1,82 @@
+import threading
+from typing import Any, Callable
+
+
+class LatestFrameChannel(object):
+    """Thread-safe register which only holds the newest frame published by a producer thread.
+
+    Publishing never queues: a frame which was not taken by the consumer before the next one arrives is overwritten
+    and counted as skipped. The producer only has to notify the consumer (e.g. by emitting a queued Qt signal) when
+    publish returns True, so at most one notification is pending at any time and the backlog can never grow.
+    """
+    def __init__(self, merge:Callable[[Any, Any], Any]|None = None):
+        """Create an empty channel
+
+        :param merge: Function (skipped frame, new frame) -> frame to store, used when a frame is overwritten before it was
+            taken (e.g. to keep information of the skipped frame), None stores the new frame as is, defaults to None
+        :type merge: Callable[[Any, Any], Any] | None, optional
+        """
+        self._merge = merge
+        self._lock = threading.Lock()
+        self._frame: Any = None
+        self._seq = 0
+        self._pending = False
+        self.published = 0
+        self.taken = 0
+        self.skipped = 0
+
+    def publish(self, frame:Any) -> bool:
+        """Store a frame as the newest one.
+
+        :param frame: the new frame
+        :type frame: Any
+        :return: True if the consumer has to be notified, False if a notification is still pending
+        :rtype: bool
+        """
+        with self._lock:
+            if self._pending:
+                # the previous frame was never taken by the consumer
+                self.skipped += 1
+                if self._merge is not None:
+                    frame = self._merge(self._frame, frame)
+            self._frame = frame
+            self._seq += 1
+            self.published += 1
+            notify = not self._pending
+            self._pending = True
+            return notify
+
+    def take(self) -> tuple[int, Any]|None:
+        """Take the newest frame if it was not taken yet.
+
+        :return: Tuple (sequence number, frame), None if no new frame was published since the last call
+        :rtype: tuple[int, Any]|None
+        """
+        with self._lock:
+            if not self._pending:
+                return None
+            self._pending = False
+            self.taken += 1
+            return self._seq, self._frame
+
+    def latest(self) -> tuple[int, Any]:
+        """Get the newest frame without taking it.
+
+        :return: Tuple (sequence number, frame), sequence number 0 if nothing was published yet
+        :rtype: tuple[int, Any]
+        """
+        with self._lock:
+            return self._seq, self._frame
+
+    def stats(self) -> dict:
+        """Get counters of this channel.
+
+        :return: Dict with the number of published, taken and skipped frames
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "published": self.published,
+                "taken": self.taken,
+                "skipped": self.skipped,
+            }
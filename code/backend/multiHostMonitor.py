@@ -0,0 +1,170 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Callable
+from Packages.Models.Plane import WTPlane
+from Packages.WarThunder.aioclient import AsyncWTClient, AsyncConnectionPool, MAX_POOL_CONNECTIONS
+from .ingestEngine import IngestEngine
+from .wtFetcher import TelemetryData
+
+
+@dataclass(slots=True)
+class HostStatus:
+    """State of the pipeline of one monitored host"""
+    host: str
+    phase: str
+    latency_ms: float|None # duration of the requests of the last run
+    mean_latency_ms: float|None # moving average of latency_ms
+    last_frame_seq: int|None
+    last_frame_age_ms: float|None
+    missed_deadlines: int
+
+
+class MultiHostMonitor(object):
+    """Polls the WT-APIs of several game clients (e.g. all rigs of a LAN) from one asyncio event loop.
+
+    Every host gets its own IngestEngine (own phases, intervalls, telemetry channel and plane), all of them run as tasks
+    of the same loop and their clients share one AsyncConnectionPool, which bounds the requests in flight over all hosts.
+    So dozens of hosts need neither a thread nor a connection setup per poll each. The callbacks in self.plane_callbacks
+    and self.telemetry_callbacks are called with the host and the data of its engine (see IngestEngine).
+    """
+    def __init__(self, std_intervall_ms:int = 100, error_intervall_ms:int = 5000, idle_intervall_ms:int = 500, max_connections:int = MAX_POOL_CONNECTIONS,
+                 **engine_options):
+        """Create a monitor without hosts
+
+        :param std_intervall_ms: The intervall of fetching in ms while a player is in flight, defaults to 100
+        :type std_intervall_ms: int, optional
+        :param error_intervall_ms: The intervall of probing in ms while a host is not reachable, defaults to 5000
+        :type error_intervall_ms: int, optional
+        :param idle_intervall_ms: The intervall of probing in ms while a player is not in a match, defaults to 500
+        :type idle_intervall_ms: int, optional
+        :param max_connections: Maximum number of requests in flight over all hosts, defaults to MAX_POOL_CONNECTIONS
+        :type max_connections: int, optional
+        :param engine_options: Further keyword arguments for the IngestEngine of each host (e.g. auto_intervall)
+        """
+        self.std_intervall = std_intervall_ms
+        self.error_intervall = error_intervall_ms
+        self.idle_intervall = idle_intervall_ms
+        self.engine_options = engine_options
+        self.pool = AsyncConnectionPool(max_connections)
+        self.engines:dict[str, IngestEngine] = {}
+        self.plane_callbacks:list[Callable[[str, WTPlane], None]] = []
+        self.telemetry_callbacks:list[Callable[[str, TelemetryData], None]] = []
+        self.__tasks:dict[str, asyncio.Task] = {}
+        # Tasks closing the engines of removed hosts
+        self.__cleanups:set[asyncio.Task] = set()
+        self.__stop_event:asyncio.Event|None = None
+        self.__stopped = False
+
+    def add_host(self, host:str) -> IngestEngine:
+        """Start monitoring a host, has to be called in the thread of the event loop if the monitor is running
+
+        :param host: IP or name of the host running War Thunder
+        :type host: str
+        :return: The engine of the host
+        :rtype: IngestEngine
+        """
+        if host in self.engines:
+            return self.engines[host]
+
+        engine = IngestEngine(host, std_intervall_ms=self.std_intervall, error_intervall_ms=self.error_intervall,
+                              idle_intervall_ms=self.idle_intervall, client=AsyncWTClient(host, pool=self.pool), **self.engine_options)
+        engine.plane_callbacks.append(lambda plane: self.__on_plane(host, plane))
+        engine.telemetry_callbacks.append(lambda telemetry: self.__on_telemetry(host, telemetry))
+        self.engines[host] = engine
+        if self.__stop_event is not None:
+            self.__tasks[host] = asyncio.ensure_future(engine.run())
+        return engine
+
+    def remove_host(self, host:str) -> None:
+        """Stop monitoring a host, has to be called in the thread of the event loop if the monitor is running.
+        A running engine is cancelled, its client is closed once the cancelled task finished.
+
+        :param host: IP or name of the host
+        :type host: str
+        """
+        engine = self.engines.pop(host, None)
+        if engine is None:
+            return
+        engine.stop()
+        task = self.__tasks.pop(host, None)
+        if task is None:
+            engine.fetcher.close()
+            return
+        # the task may be in the middle of a request, its client is only closed once it finished
+        task.cancel()
+        cleanup = asyncio.ensure_future(self.__close_engine(engine, task))
+        self.__cleanups.add(cleanup)
+        cleanup.add_done_callback(self.__cleanups.discard)
+
+    async def __close_engine(self, engine:IngestEngine, task:asyncio.Task) -> None:
+        await asyncio.gather(task, return_exceptions=True)
+        engine.fetcher.close()
+
+    async def run(self) -> None:
+        """Monitor all hosts (also those added later) until stop() is called"""
+        self.__stop_event = asyncio.Event()
+        if self.__stopped:
+            self.__stop_event.set()
+        for host, engine in self.engines.items():
+            self.__tasks[host] = asyncio.ensure_future(engine.run())
+        try:
+            await self.__stop_event.wait()
+        finally:
+            for engine in self.engines.values():
+                engine.stop()
+            if self.__tasks or self.__cleanups:
+                await asyncio.gather(*self.__tasks.values(), *self.__cleanups, return_exceptions=True)
+            self.__tasks.clear()
+            self.__stop_event = None
+            for engine in self.engines.values():
+                engine.fetcher.close()
+            self.pool.close()
+
+    def stop(self) -> None:
+        """Stop run() after the current run of every host, has to be called in the thread of the event loop"""
+        self.__stopped = True
+        if self.__stop_event is not None:
+            self.__stop_event.set()
+
+    def pause(self) -> None:
+        for engine in self.engines.values():
+            engine.pause()
+
+    def resume(self) -> None:
+        for engine in self.engines.values():
+            engine.resume()
+
+    def host_status(self, host:str) -> HostStatus:
+        """Get the state of the pipeline of a host
+
+        :param host: IP or name of the host
+        :type host: str
+        :return: Phase, latency and last frame of the host
+        :rtype: HostStatus
+        """
+        diagnostics = self.engines[host].get_diagnostics()
+        return HostStatus(
+            host=host,
+            phase=diagnostics["phase"],
+            latency_ms=diagnostics["latency_ms"],
+            mean_latency_ms=diagnostics["mean_latency_ms"],
+            last_frame_seq=diagnostics["last_frame_seq"],
+            last_frame_age_ms=diagnostics["last_frame_age_ms"],
+            missed_deadlines=diagnostics["missed_deadlines"],
+        )
+
+    def get_status(self) -> list[HostStatus]:
+        """Get the state of the pipelines of all hosts, e.g. to compare their latency
+
+        :return: Status of every host in the order they were added
+        :rtype: list[HostStatus]
+        """
+        return [self.host_status(host) for host in list(self.engines)]
+
+    def __on_plane(self, host:str, plane:WTPlane) -> None:
+        for callback in self.plane_callbacks:
+            callback(host, plane)
+
+    def __on_telemetry(self, host:str, telemetry:TelemetryData) -> None:
+        for callback in self.telemetry_callbacks:
+            callback(host, telemetry)
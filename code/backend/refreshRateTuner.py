@@ -0,0 +1,115 @@
+from collections import deque
+import math
+
+TUNE_SAMPLES = 20 # Number of measured update periods needed to lock the intervall
+TUNE_MARGIN = 1.1 # The intervall is locked this factor above the measured update period
+CALIBRATION_TIMEOUT_S = 5.0 # Give up calibrating if the game does not update often enough (e.g. paused)
+RECALIBRATE_S = 60.0 # Time after which the update period is measured again
+MAX_RECALIBRATE_S = 960.0 # While calibrations confirm the period, the time to the next one is doubled up to this
+STABLE_TOLERANCE = 0.1 # A calibration confirms the period if it measures within this share of the previous one
+
+
+class RefreshRateTuner(object):
+    """Measures how often the game actually updates its telemetry and derives the polling intervall from it.
+
+    While calibrating, the WT-API is polled at the lower bound of the intervall and the time between two changes of the
+    response content is recorded. The mean of these periods is the effective update period of the game, the intervall
+    is then locked just above it (within the given bounds) until the next calibration.
+    Calibrating polls at the lower bound, so the time to the next calibration is doubled (from recalibrate_s up to
+    MAX_RECALIBRATE_S) whenever it confirms the previous period and reset once the period drifted.
+    """
+    def __init__(self, min_intervall_ms:int, max_intervall_ms:int, samples:int = TUNE_SAMPLES, recalibrate_s:float = RECALIBRATE_S):
+        """Create a tuner, it starts calibrating with the first call of on_fetch
+
+        :param min_intervall_ms: Lowest intervall in ms, used while calibrating
+        :type min_intervall_ms: int
+        :param max_intervall_ms: Highest intervall in ms
+        :type max_intervall_ms: int
+        :param samples: Number of update periods to measure per calibration, defaults to TUNE_SAMPLES
+        :type samples: int, optional
+        :param recalibrate_s: Time in s after which the update period is measured again while it is not confirmed,
+            defaults to RECALIBRATE_S
+        :type recalibrate_s: float, optional
+        """
+        self.min_intervall = min(min_intervall_ms, max_intervall_ms)
+        self.max_intervall = max(min_intervall_ms, max_intervall_ms)
+        self.samples = samples
+        self.recalibrate_s = recalibrate_s
+        # Time in s until the next calibration, backed off while the period is stable
+        self.recalibrate_after = recalibrate_s
+        self.intervall = self.min_intervall
+        self.period_ms:float|None = None
+        self.calibrating = True
+        self.__changes:deque[float] = deque(maxlen=samples + 1)
+        self.__since:float|None = None
+
+    @property
+    def measured_rate_hz(self) -> float|None:
+        """Update rate of the game found by the last calibration, None if it is not known (yet)"""
+        if not self.period_ms:
+            return None
+        return 1000 / self.period_ms
+
+    def start_calibration(self) -> int:
+        """Measure the update period again
+
+        :return: The intervall in ms to use while calibrating
+        :rtype: int
+        """
+        self.calibrating = True
+        self.__changes.clear()
+        self.__since = None
+        self.intervall = self.min_intervall
+        return self.intervall
+
+    def on_fetch(self, changed:bool, now:float) -> int|None:
+        """Record the result of a fetch
+
+        :param changed: Whether the content of the response changed compared to the last fetch
+        :type changed: bool
+        :param now: time.monotonic() timestamp of the fetch
+        :type now: float
+        :return: The new intervall in ms if it has to be changed, None otherwise
+        :rtype: int|None
+        """
+        if self.__since is None:
+            self.__since = now
+
+        if not self.calibrating:
+            if self.period_ms is None and changed:
+                # the last calibration timed out, the game is updating again
+                return self.start_calibration()
+            if now - self.__since > self.recalibrate_after:
+                return self.start_calibration()
+            return None
+
+        if changed:
+            self.__changes.append(now)
+
+        if len(self.__changes) > self.samples:
+            changes = list(self.__changes)
+            periods = sorted(b - a for a, b in zip(changes, changes[1:]))
+            # the single periods are quantized to the polling intervall, their mean is not. Periods far above the
+            # median (e.g. a short pause of the game) are left out
+            median = periods[len(periods) // 2]
+            periods = [period for period in periods if period <= 2 * median]
+            period_ms = sum(periods) / len(periods) * 1000
+            if self.period_ms is not None and abs(period_ms - self.period_ms) <= STABLE_TOLERANCE * self.period_ms:
+                self.recalibrate_after = min(MAX_RECALIBRATE_S, 2 * self.recalibrate_after)
+            else:
+                self.recalibrate_after = self.recalibrate_s
+            self.period_ms = period_ms
+            return self.__lock(now, math.ceil(self.period_ms * TUNE_MARGIN))
+
+        if now - self.__since > CALIBRATION_TIMEOUT_S:
+            self.period_ms = None
+            return self.__lock(now, self.max_intervall)
+
+        return None
+
+    def __lock(self, now:float, intervall:int) -> int:
+        """Stop calibrating and use the given intervall (limited to the bounds)"""
+        self.calibrating = False
+        self.__since = now
+        self.intervall = max(self.min_intervall, min(self.max_intervall, intervall))
+        return self.intervall
@@ -12,12 +12,38 @@ class GeneralSettings:
     ip: str = "127.0.0.1"
     intervall: int = 100
     theme: Theme = Theme.AUTO
+    concurrent_fetch: bool = False
+    auto_intervall: bool = False
+    min_intervall: int = 20
+    max_intervall: int = 200
+    adaptive_intervall: bool = False
+    async_fetch: bool = False
+    relay_enabled: bool = False
+    relay_port: int = 8112
+    relay_lan: bool = False
+    shared_memory_export: bool = False
+    tacview_stream: bool = False
+    tacview_port: int = 42674
+    tacview_lan: bool = False
     
     def to_dict(self):
         return {
             "ip": self.ip,
             "intervall": self.intervall,
             "theme": self.theme.value,
+            "concurrent_fetch": self.concurrent_fetch,
+            "auto_intervall": self.auto_intervall,
+            "min_intervall": self.min_intervall,
+            "max_intervall": self.max_intervall,
+            "adaptive_intervall": self.adaptive_intervall,
+            "async_fetch": self.async_fetch,
+            "relay_enabled": self.relay_enabled,
+            "relay_port": self.relay_port,
+            "relay_lan": self.relay_lan,
+            "shared_memory_export": self.shared_memory_export,
+            "tacview_stream": self.tacview_stream,
+            "tacview_port": self.tacview_port,
+            "tacview_lan": self.tacview_lan,
         }
 
 @dataclass
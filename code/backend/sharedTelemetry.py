@@ -0,0 +1,199 @@
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import astuple, fields
+from .derivedTelemetry import DerivedTelemetry
+from .wtFetcher import TelemetryData
+
+SHARED_MEMORY_NAME = "WTCopilotTelemetry" # Tagname of the mapping on Windows, file name in /dev/shm (or the temp dir) elsewhere
+LAYOUT_VERSION = 2
+RING_SLOTS = 8 # Number of frames kept in the ring, the writer never touches the slot of the newest frame before RING_SLOTS - 1 more frames
+PLANETYPE_SIZE = 64 # bytes of the utf-8 encoded, zero padded plane type
+READ_RETRIES = 100 # Attempts of a reader to get a consistent copy of a slot while the writer overwrites it
+
+# Header: magic, layout version, number of slots, size of a slot, 4 reserved bytes (zero), number of frames written (the
+# newest one is in slot (written - 1) % slots). The frame counter is padded to offset 16, so it is 8 byte aligned and
+# readers can load it atomically
+HEADER = struct.Struct("<4sHHIIQ")
+HEADER_SIZE = 64
+MAGIC = b"WTCT"
+WRITTEN_OFFSET = 16
+# Slot: version counter of the seqlock (odd while the writer changes the slot), followed by the frame
+VERSION = struct.Struct("<Q")
+DERIVED_FIELDS = tuple(f.name for f in fields(DerivedTelemetry))
+# seq, written_at (time.time()), received_at (time.monotonic() of the writer), rtt, ias, flaps, gear, airbrake, lat, lon,
+# mach_speed, the values of DerivedTelemetry (NaN if None), planetype
+FRAME = struct.Struct(f"<Q10d{len(DERIVED_FIELDS)}d{PLANETYPE_SIZE}s")
+SLOT_SIZE = VERSION.size + FRAME.size
+SHARED_MEMORY_SIZE = HEADER_SIZE + RING_SLOTS * SLOT_SIZE
+
+
+def _open_mapping(name:str, create:bool) -> mmap.mmap:
+    """Map the shared memory, a named mapping on Windows and a file in /dev/shm (RAM backed) elsewhere"""
+    if sys.platform == 'win32':
+        return mmap.mmap(-1, SHARED_MEMORY_SIZE, tagname=name)
+    path = shared_memory_path(name)
+    if create:
+        with open(path, "w+b") as file:
+            file.truncate(SHARED_MEMORY_SIZE)
+            return mmap.mmap(file.fileno(), SHARED_MEMORY_SIZE)
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), SHARED_MEMORY_SIZE, access=mmap.ACCESS_READ)
+
+
+def shared_memory_path(name:str = SHARED_MEMORY_NAME) -> str:
+    """Get the file backing the shared memory on systems other than Windows
+
+    :param name: Name of the shared memory, defaults to SHARED_MEMORY_NAME
+    :type name: str, optional
+    :return: Path of the file
+    :rtype: str
+    """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, name)
+
+
+def _float(value) -> float:
+    return float("nan") if value is None else float(value)
+
+
+def _optional(value:float) -> float|None:
+    return None if math.isnan(value) else value
+
+
+class SharedTelemetryWriter(object):
+    """Exports every frame into a ring in shared memory, so local consumers (overlays, helper tools) read the newest
+    telemetry at any rate without sockets and without ever blocking the fetcher.
+
+    The layout is fixed (see HEADER and FRAME, little-endian) so readers do not have to be written in Python. Each slot is
+    guarded by a seqlock: the writer makes its version counter odd, writes the frame, makes it even again and only then
+    advances the frame counter of the header. A reader copies the slot of the newest frame and retries if the version was
+    odd or changed meanwhile, see SharedTelemetryReader. There is a single writer, add publish to dataFetcher.frame_sinks.
+    """
+    def __init__(self, name:str = SHARED_MEMORY_NAME):
+        """Create (or reset) the shared memory
+
+        :param name: Name of the shared memory, defaults to SHARED_MEMORY_NAME
+        :type name: str, optional
+        """
+        self.name = name
+        self.written = 0
+        self._lock = threading.Lock()
+        self._memory:mmap.mmap|None = _open_mapping(name, create=True)
+        self._memory[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        self._memory[:HEADER.size] = HEADER.pack(MAGIC, LAYOUT_VERSION, RING_SLOTS, SLOT_SIZE, 0, 0)
+        self._versions = [0] * RING_SLOTS
+
+    def publish(self, telemetry:TelemetryData) -> None:
+        """Write a frame into the next slot of the ring, never blocks
+
+        :param telemetry: The new frame
+        :type telemetry: TelemetryData
+        """
+        derived = astuple(telemetry.derived) if telemetry.derived is not None else (None,) * len(DERIVED_FIELDS)
+        frame = FRAME.pack(
+            telemetry.seq, time.time(), telemetry.received_at, telemetry.rtt,
+            _float(telemetry.ias), _float(telemetry.flaps), _float(telemetry.gear), _float(telemetry.airbrake),
+            _float(telemetry.lat), _float(telemetry.lon), _float(telemetry.mach_speed),
+            *(_float(value) for value in derived),
+            str(telemetry.planetype).encode("utf-8")[:PLANETYPE_SIZE],
+        )
+        with self._lock:
+            if self._memory is None:
+                return
+            index = self.written % RING_SLOTS
+            offset = HEADER_SIZE + index * SLOT_SIZE
+            version = self._versions[index]
+            VERSION.pack_into(self._memory, offset, version + 1)
+            self._memory[offset + VERSION.size:offset + SLOT_SIZE] = frame
+            VERSION.pack_into(self._memory, offset, version + 2)
+            self._versions[index] = version + 2
+            self.written += 1
+            struct.pack_into("<Q", self._memory, WRITTEN_OFFSET, self.written)
+
+    def close(self) -> None:
+        """Release the shared memory, readers see no new frames afterwards"""
+        with self._lock:
+            if self._memory is None:
+                return
+            self._memory.close()
+            self._memory = None
+        if sys.platform != 'win32':
+            try:
+                os.remove(shared_memory_path(self.name))
+            except OSError:
+                pass
+
+
+class SharedTelemetryReader(object):
+    """Reads the frames exported by a SharedTelemetryWriter (possibly of another process) without locking it.
+    Polling is cheap: latest_count reads a single counter, read_latest only copies the slot of the newest frame.
+    """
+    def __init__(self, name:str = SHARED_MEMORY_NAME):
+        """Map the shared memory of a writer
+
+        :param name: Name of the shared memory, defaults to SHARED_MEMORY_NAME
+        :type name: str, optional
+        :raises FileNotFoundError: If no writer created the shared memory (not on Windows, there it is empty until then)
+        """
+        self.name = name
+        self.retries = 0
+        self._memory = _open_mapping(name, create=False)
+
+    def latest_count(self) -> int:
+        """Get the number of frames written so far, e.g. to check for a new frame before reading it
+
+        :return: Number of frames, 0 if the writer did not start yet
+        :rtype: int
+        """
+        magic, layout_version, _slots, _slot_size, _reserved, written = HEADER.unpack_from(self._memory, 0)
+        if magic != MAGIC or layout_version != LAYOUT_VERSION:
+            return 0
+        return written
+
+    def read_latest(self) -> TelemetryData|None:
+        """Get a consistent copy of the newest frame
+
+        :return: The frame, its received_at is a time.monotonic() timestamp of the writer. None if there is none yet or the
+            writer kept overwriting it for READ_RETRIES attempts
+        :rtype: TelemetryData | None
+        """
+        for _ in range(READ_RETRIES):
+            written = self.latest_count()
+            if written == 0:
+                return None
+            offset = HEADER_SIZE + (written - 1) % RING_SLOTS * SLOT_SIZE
+            version = VERSION.unpack_from(self._memory, offset)[0]
+            if version % 2 == 0:
+                values = FRAME.unpack_from(self._memory, offset + VERSION.size)
+                if VERSION.unpack_from(self._memory, offset)[0] == version:
+                    return self.__to_telemetry(values)
+            self.retries += 1
+        return None
+
+    def close(self) -> None:
+        self._memory.close()
+
+    @staticmethod
+    def __to_telemetry(values:tuple) -> TelemetryData:
+        seq, _written_at, received_at, rtt, ias, flaps, gear, airbrake, lat, lon, mach_speed = values[:11]
+        derived = values[11:11 + len(DERIVED_FIELDS)]
+        return TelemetryData(
+            planetype=values[-1].rstrip(b"\0").decode("utf-8", "replace"),
+            flaps=_optional(flaps),
+            gear=_optional(gear),
+            ias=_optional(ias),
+            lat=_optional(lat),
+            lon=_optional(lon),
+            airbrake=_optional(airbrake),
+            mach_speed=_optional(mach_speed),
+            seq=seq,
+            received_at=received_at,
+            rtt=rtt,
+            derived=DerivedTelemetry(**{name: _optional(value) for name, value in zip(DERIVED_FIELDS, derived)}),
+        )
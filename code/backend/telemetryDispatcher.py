@@ -0,0 +1,56 @@
+from dataclasses import replace
+from typing import Callable
+from .wtFetcher import TelemetryData, TelemetryField
+
+
+def merge_skipped_frame(skipped:TelemetryData, frame:TelemetryData) -> TelemetryData:
+    """Merge function for LatestFrameChannel: keep the changes of a frame which was never taken by the consumer,
+    so the dirty mask of the next taken frame covers every change since the last taken one.
+
+    :param skipped: The frame which is overwritten
+    :type skipped: TelemetryData
+    :param frame: The new frame
+    :type frame: TelemetryData
+    :return: Copy of frame with the changes of both frames
+    :rtype: TelemetryData
+    """
+    return replace(frame, changed=frame.changed | skipped.changed)
+
+
+class TelemetryDispatcher(object):
+    """Calls subscribers of telemetry frames only if one of the fields they subscribed to changed (see TelemetryData.changed)."""
+    def __init__(self):
+        self._subscribers:list[tuple[TelemetryField, Callable[[TelemetryData], None]]] = []
+        self.dispatched = 0
+        self.suppressed = 0
+
+    def subscribe(self, fields:TelemetryField, callback:Callable[[TelemetryData], None]) -> None:
+        """Call callback with every frame in which one of the given fields changed
+
+        :param fields: Fields the subscriber depends on, e.g. TelemetryField.IAS | TelemetryField.GEAR
+        :type fields: TelemetryField
+        :param callback: Function to call with the frame
+        :type callback: Callable[[TelemetryData], None]
+        """
+        self._subscribers.append((fields, callback))
+
+    def unsubscribe(self, callback:Callable[[TelemetryData], None]) -> None:
+        """Remove all subscriptions of a callback
+
+        :param callback: The subscribed function
+        :type callback: Callable[[TelemetryData], None]
+        """
+        self._subscribers = [(fields, cb) for fields, cb in self._subscribers if cb != callback]
+
+    def dispatch(self, telemetry:TelemetryData) -> None:
+        """Pass a frame to the subscribers of its changed fields
+
+        :param telemetry: The new frame
+        :type telemetry: TelemetryData
+        """
+        for fields, callback in self._subscribers:
+            if telemetry.changed & fields:
+                self.dispatched += 1
+                callback(telemetry)
+            else:
+                self.suppressed += 1
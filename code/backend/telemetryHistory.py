@@ -0,0 +1,166 @@
+import math
+import threading
+import numpy as np
+from .wtFetcher import TelemetryData
+
+HISTORY_S = 60.0 # Default length of the history in s
+MAX_RATE_HZ = 50 # Highest expected telemetry rate, used to size the buffers
+# Numeric fields of TelemetryData kept in the history
+HISTORY_FIELDS = ("ias", "mach_speed", "flaps", "gear", "airbrake", "lat", "lon")
+
+
+class RingBuffer(object):
+    """Fixed capacity ring buffer of float64 values.
+
+    Every value is written twice (at its position and one capacity later), so the newest values are always one
+    contiguous slice of the underlying array and windows can be returned as views without copying. Appending never
+    allocates. The buffer is not synchronized: there must only be one writer, and readers in other threads have to
+    hold a lock shared with it (see TelemetryHistory). Views are overwritten once the buffer wraps around.
+    """
+    def __init__(self, capacity:int):
+        """Create an empty buffer
+
+        :param capacity: Number of values the buffer holds
+        :type capacity: int
+        """
+        self.capacity = capacity
+        self._data = np.full(2 * capacity, np.nan)
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value:float) -> None:
+        """Add a value, the oldest one is dropped if the buffer is full
+
+        :param value: The new value, None is stored as NaN
+        :type value: float
+        """
+        if value is None:
+            value = math.nan
+        pos = self._pos
+        self._data[pos] = value
+        self._data[pos + self.capacity] = value
+        self._pos = (pos + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    @property
+    def position(self) -> int:
+        """Position the next value is written to"""
+        return self._pos
+
+    def window(self, n:int|None = None, position:int|None = None) -> np.ndarray:
+        """Get the newest values as read-only view, oldest first
+
+        :param n: Number of values, None for all stored values, defaults to None
+        :type n: int | None, optional
+        :param position: End the window before this position instead of self.position, used to align buffers which
+            are written one after another, defaults to None
+        :type position: int | None, optional
+        :return: View of the newest min(n, len(self)) values
+        :rtype: np.ndarray
+        """
+        count = self._count if n is None else max(0, min(n, self._count))
+        end = (self._pos if position is None else position) + self.capacity
+        view = self._data[end - count:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self) -> float|None:
+        """Get the newest value, None if the buffer is empty"""
+        if self._count == 0:
+            return None
+        return float(self._data[self._pos + self.capacity - 1])
+
+    def clear(self) -> None:
+        """Remove all values"""
+        self._pos = 0
+        self._count = 0
+
+
+class TelemetryHistory(object):
+    """History of the numeric fields of TelemetryData (see HISTORY_FIELDS), sized in seconds.
+
+    Each field and the receive time of the frames are stored in their own RingBuffer, windows are selected by time
+    for vectorized computations. Frames are appended by the fetch thread while the GUI, warning and interpolator threads
+    read, so append and window hold a lock and windows are returned as copies, which the writer cannot change later.
+    """
+    def __init__(self, seconds:float = HISTORY_S, max_rate_hz:float = MAX_RATE_HZ):
+        """Create an empty history
+
+        :param seconds: Time span the history covers at max_rate_hz, defaults to HISTORY_S
+        :type seconds: float, optional
+        :param max_rate_hz: Highest expected rate of new frames, defaults to MAX_RATE_HZ
+        :type max_rate_hz: float, optional
+        """
+        self.capacity = max(2, math.ceil(seconds * max_rate_hz))
+        self.times = RingBuffer(self.capacity)
+        self.fields = {name: RingBuffer(self.capacity) for name in HISTORY_FIELDS}
+        self.last_seq = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.times)
+
+    def append(self, telemetry:TelemetryData) -> None:
+        """Add a frame, frames which were already added (same sequence number) are ignored
+
+        :param telemetry: The new frame
+        :type telemetry: TelemetryData
+        """
+        if telemetry.seq and telemetry.seq == self.last_seq:
+            return
+        values = [getattr(telemetry, name) for name in self.fields]
+        with self._lock:
+            self.last_seq = telemetry.seq
+            for buffer, value in zip(self.fields.values(), values):
+                buffer.append(value)
+            self.times.append(telemetry.received_at)
+
+    def window(self, name:str, seconds:float|None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Get the values of a field received within the last seconds
+
+        :param name: Name of the field (one of HISTORY_FIELDS)
+        :type name: str
+        :param seconds: Length of the window in s, None for the whole history, defaults to None
+        :type seconds: float | None, optional
+        :return: Copies (receive times, values), oldest first
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        with self._lock:
+            times = self.times.window()
+            if seconds is not None and len(times) > 0:
+                times = times[np.searchsorted(times, times[-1] - seconds, side="left"):]
+            return times.copy(), self.fields[name].window(len(times)).copy()
+
+    def rate(self, name:str, seconds:float) -> float|None:
+        """Get the rate of change of a field per s, as least squares slope over the given window
+
+        :param name: Name of the field (one of HISTORY_FIELDS)
+        :type name: str
+        :param seconds: Length of the window in s
+        :type seconds: float
+        :return: Rate per s, None if the window holds less than two valid values
+        :rtype: float|None
+        """
+        times, values = self.window(name, seconds)
+        valid = ~np.isnan(values)
+        if np.count_nonzero(valid) < 2:
+            return None
+        times = times[valid]
+        values = values[valid]
+        times = times - times.mean()
+        denominator = np.dot(times, times)
+        if denominator == 0:
+            return None
+        return float(np.dot(times, values - values.mean()) / denominator)
+
+    def clear(self) -> None:
+        """Remove all frames"""
+        with self._lock:
+            self.times.clear()
+            for buffer in self.fields.values():
+                buffer.clear()
+            self.last_seq = None
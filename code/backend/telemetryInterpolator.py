@@ -0,0 +1,76 @@
+import time
+import numpy as np
+from .telemetryHistory import TelemetryHistory, HISTORY_FIELDS
+
+INTERPOLATION_WINDOW_S = 2.0 # Samples older than this (relative to the newest one) are not looked at
+MAX_EXTRAPOLATION_S = 0.25 # Values are extrapolated at most this far beyond the newest sample
+DISPLAY_DELAY_S = 0.0 # Default delay of the display time behind now
+
+
+class TelemetryInterpolator(object):
+    """Turns the timestamped telemetry of a TelemetryHistory into values at any display time.
+
+    Between two samples values are interpolated linearly, after the newest sample they are extrapolated with the rate
+    of the last two samples (for at most max_extrapolation_s), before the oldest one the oldest value is used. So the
+    GUI can render at its own frame rate while the game is polled at a much lower rate.
+    """
+    def __init__(self, history:TelemetryHistory, max_extrapolation_s:float = MAX_EXTRAPOLATION_S, delay_s:float = DISPLAY_DELAY_S,
+                 stale_s:float|None = None):
+        """Create an interpolator for a history
+
+        :param history: History of the plane (see WTPlane.history)
+        :type history: TelemetryHistory
+        :param max_extrapolation_s: Time in s values are extrapolated at most beyond the newest sample, defaults to MAX_EXTRAPOLATION_S
+        :type max_extrapolation_s: float, optional
+        :param delay_s: Delay of the display time behind now used by sample(), a delay of about one poll intervall
+            replaces extrapolation by interpolation at the cost of latency, defaults to DISPLAY_DELAY_S
+        :type delay_s: float, optional
+        :param stale_s: If set, no value is returned once the newest sample is older than this (in s), e.g. because
+            no frames arrive anymore, defaults to None
+        :type stale_s: float | None, optional
+        """
+        self.history = history
+        self.max_extrapolation_s = max_extrapolation_s
+        self.delay_s = delay_s
+        self.stale_s = stale_s
+
+    def value_at(self, name:str, t:float) -> float|None:
+        """Get the value of a field at the given time
+
+        :param name: Name of the field (one of HISTORY_FIELDS)
+        :type name: str
+        :param t: time.monotonic() timestamp to get the value for
+        :type t: float
+        :return: The interpolated value, None if the field has no valid samples or they are stale (see stale_s)
+        :rtype: float|None
+        """
+        times, values = self.history.window(name, INTERPOLATION_WINDOW_S)
+        valid = ~np.isnan(values)
+        if not valid.all():
+            times = times[valid]
+            values = values[valid]
+        if len(values) == 0:
+            return None
+        if self.stale_s is not None and t - times[-1] > self.stale_s:
+            return None
+
+        if t <= times[-1] or len(values) == 1:
+            return float(np.interp(t, times, values))
+
+        dt = times[-1] - times[-2]
+        if dt <= 0:
+            return float(values[-1])
+        rate = (values[-1] - values[-2]) / dt
+        return float(values[-1] + rate * min(t - times[-1], self.max_extrapolation_s))
+
+    def sample(self, t:float|None = None) -> dict[str, float|None]:
+        """Get the values of all fields at a display time
+
+        :param t: time.monotonic() timestamp, defaults to now minus self.delay_s
+        :type t: float | None, optional
+        :return: Dict field name -> value (see value_at)
+        :rtype: dict[str, float|None]
+        """
+        if t is None:
+            t = time.monotonic() - self.delay_s
+        return {name: self.value_at(name, t) for name in HISTORY_FIELDS}
@@ -0,0 +1,301 @@
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import struct
+from dataclasses import asdict, fields
+from .wtFetcher import TelemetryData
+
+RELAY_PORT = 8112 # Default port of the relay (the WT-API itself uses 8111)
+WEBSOCKET_PATH = "/ws"
+SNAPSHOT_PATH = "/telemetry"
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+WRITE_BUFFER_LIMIT = 64 * 1024 # A subscriber with more unsent bytes than this is conflated to the newest frame
+MAX_HEADER_SIZE = 8 * 1024
+MAX_CLIENT_FRAME = 64 * 1024 # Clients only send control frames, larger frames close the connection
+# Fields of TelemetryData which are part of the published frames
+FRAME_FIELDS = tuple(f.name for f in fields(TelemetryData) if f.name not in ("changed", "derived", "received_at"))
+
+
+def frame_to_dict(telemetry:TelemetryData) -> dict:
+    """Normalize a frame for publishing: numeric and string fields as is, derived values flattened with the prefix
+    "derived.", NaN as None (JSON has no NaN)
+
+    :param telemetry: The frame
+    :type telemetry: TelemetryData
+    :return: Flat dict of the frame
+    :rtype: dict
+    """
+    frame = {name: getattr(telemetry, name) for name in FRAME_FIELDS}
+    if telemetry.derived is not None:
+        for name, value in asdict(telemetry.derived).items():
+            frame[f"derived.{name}"] = value
+    for name, value in frame.items():
+        if isinstance(value, float) and math.isnan(value):
+            frame[name] = None
+    return frame
+
+
+def frame_delta(sent:dict, frame:dict) -> dict:
+    """Get the values of a frame which differ from the ones already sent
+
+    :param sent: Values the subscriber has
+    :type sent: dict
+    :param frame: The new frame (see frame_to_dict)
+    :type frame: dict
+    :return: Changed values
+    :rtype: dict
+    """
+    return {name: value for name, value in frame.items() if name not in sent or sent[name] != value}
+
+
+class RelaySubscriber(object):
+    """A WebSocket client of the relay. It only holds the values it was sent, never a queue of frames: when it is woken up
+    it gets the delta between these values and the newest frame, so frames published while it was busy are conflated."""
+    def __init__(self, writer:asyncio.StreamWriter):
+        self.writer = writer
+        self.sent:dict = {}
+        self.wakeup = asyncio.Event()
+        self.messages = 0
+
+
+class TelemetryRelay(object):
+    """Re-publishes the telemetry of the copilot to other local consumers (tablets, overlays, stream decks, ...), so only
+    the copilot polls the WT-API and any number of consumers costs the game the same as one.
+
+    Served over HTTP on one port:
+        GET /telemetry: the newest frame as JSON object {"seq": ..., "data": {...}}
+        GET /ws (WebSocket): a "snapshot" message with the full frame, then a "delta" message with the changed values
+            for each new frame. Slow clients are not sent every frame, they get the delta to the newest one (conflation).
+
+    publish has to be called in the thread of the event loop the relay is served in.
+    """
+    def __init__(self, host:str = "127.0.0.1", port:int = RELAY_PORT):
+        """Create a relay, it listens with serve_forever()
+
+        :param host: Interface to listen on, "0.0.0.0" to serve other devices of the LAN, defaults to "127.0.0.1"
+        :type host: str, optional
+        :param port: Port to listen on, defaults to RELAY_PORT
+        :type port: int, optional
+        """
+        self.host = host
+        self.port = port
+        self.frame:dict|None = None
+        self.subscribers:set[RelaySubscriber] = set()
+        self.published = 0
+        self.snapshots_served = 0
+        self.__server:asyncio.AbstractServer|None = None
+        self.__connections:set[asyncio.StreamWriter] = set()
+        self.__snapshot:bytes|None = None
+
+    def publish(self, telemetry:TelemetryData) -> None:
+        """Set the newest frame and wake up all subscribers, never blocks
+
+        :param telemetry: The new frame
+        :type telemetry: TelemetryData
+        """
+        self.frame = frame_to_dict(telemetry)
+        self.__snapshot = None
+        self.published += 1
+        for subscriber in self.subscribers:
+            subscriber.wakeup.set()
+
+    async def start(self) -> None:
+        """Start listening"""
+        self.__server = await asyncio.start_server(self.__handle_client, self.host, self.port)
+        if self.port == 0:
+            self.port = self.__server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Start listening and serve until the task is cancelled or stop() is called"""
+        if self.__server is None:
+            await self.start()
+        try:
+            await self.__server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.close()
+
+    def stop(self) -> None:
+        """Stop listening and disconnect all clients, serve_forever() returns"""
+        if self.__server is not None:
+            self.__server.close()
+        for writer in list(self.__connections):
+            writer.close()
+
+    async def close(self) -> None:
+        """Stop listening and disconnect all clients"""
+        self.stop()
+        self.__server = None
+        self.subscribers.clear()
+
+    def stats(self) -> dict:
+        """Get counters of the relay
+
+        :return: Number of subscribers, published frames, served snapshots and sent websocket messages
+        :rtype: dict
+        """
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "snapshots_served": self.snapshots_served,
+            "messages_sent": sum(subscriber.messages for subscriber in self.subscribers),
+        }
+
+    async def __handle_client(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        self.__connections.add(writer)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    return
+                if len(head) > MAX_HEADER_SIZE:
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                method, path = (lines[0].split(" ") + ["", ""])[:2]
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                if method != "GET":
+                    await self.__respond(writer, 405, b"", close=True)
+                    return
+                path = path.split("?", 1)[0]
+                if path == WEBSOCKET_PATH and headers.get("upgrade", "").lower() == "websocket":
+                    await self.__serve_websocket(reader, writer, headers)
+                    return
+                if path == SNAPSHOT_PATH:
+                    self.snapshots_served += 1
+                    await self.__respond(writer, 200, self.__snapshot_body())
+                else:
+                    await self.__respond(writer, 404, b"")
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.__connections.discard(writer)
+            writer.close()
+
+    def __snapshot_body(self) -> bytes:
+        """JSON of the newest frame, encoded once per frame for all clients"""
+        if self.__snapshot is None:
+            seq = self.frame.get("seq") if self.frame is not None else None
+            self.__snapshot = json.dumps({"seq": seq, "data": self.frame}).encode()
+        return self.__snapshot
+
+    async def __respond(self, writer:asyncio.StreamWriter, status:int, body:bytes, close:bool = False) -> None:
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed"}[status]
+        writer.write((f"HTTP/1.1 {status} {reason}\r\n"
+                      "Content-Type: application/json\r\n"
+                      "Access-Control-Allow-Origin: *\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: {'close' if close else 'keep-alive'}\r\n"
+                      "\r\n").encode("ascii") + body)
+        await writer.drain()
+
+    async def __serve_websocket(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter, headers:dict) -> None:
+        key = headers.get("sec-websocket-key", "").encode("ascii")
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest()).decode("ascii")
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\n"
+                      "Connection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n"
+                      "\r\n").encode("ascii"))
+        await writer.drain()
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_LIMIT)
+
+        subscriber = RelaySubscriber(writer)
+        self.subscribers.add(subscriber)
+        if self.frame is not None:
+            subscriber.wakeup.set()
+        sender = asyncio.ensure_future(self.__send_frames(subscriber))
+        try:
+            await self.__read_frames(reader, writer)
+        finally:
+            self.subscribers.discard(subscriber)
+            sender.cancel()
+
+    async def __send_frames(self, subscriber:RelaySubscriber) -> None:
+        """Send the delta to the newest frame whenever the subscriber is woken up. While drain() waits for a slow
+        client, new frames only set the wakeup event again, so they are conflated into the next delta."""
+        try:
+            while True:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+                frame = self.frame
+                if frame is None:
+                    continue
+                if subscriber.sent:
+                    message = {"type": "delta", "seq": frame.get("seq"), "data": frame_delta(subscriber.sent, frame)}
+                else:
+                    message = {"type": "snapshot", "seq": frame.get("seq"), "data": frame}
+                subscriber.sent = frame
+                subscriber.writer.write(encode_websocket_frame(0x1, json.dumps(message).encode()))
+                subscriber.messages += 1
+                await subscriber.writer.drain()
+        except (ConnectionError, OSError):
+            subscriber.writer.close()
+
+    async def __read_frames(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        """Handle the frames sent by the client until it closes the connection (pings are answered, data is ignored)"""
+        try:
+            while True:
+                opcode, payload = await read_websocket_frame(reader)
+                if opcode == 0x8:
+                    writer.write(encode_websocket_frame(0x8, payload[:2]))
+                    await writer.drain()
+                    return
+                if opcode == 0x9:
+                    writer.write(encode_websocket_frame(0xA, payload))
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            return
+
+
+def encode_websocket_frame(opcode:int, payload:bytes) -> bytes:
+    """Encode a single unmasked (server to client) WebSocket frame
+
+    :param opcode: 0x1 text, 0x8 close, 0xA pong
+    :type opcode: int
+    :param payload: Content of the frame
+    :type payload: bytes
+    :return: The encoded frame
+    :rtype: bytes
+    """
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_websocket_frame(reader:asyncio.StreamReader) -> tuple[int, bytes]:
+    """Read a single WebSocket frame (client frames are masked)
+
+    :param reader: Stream of the connection
+    :type reader: asyncio.StreamReader
+    :return: Opcode and unmasked payload
+    :rtype: tuple[int, bytes]
+    """
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_CLIENT_FRAME:
+        raise ConnectionError(f"WebSocket frame of {length} bytes exceeds the limit")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask is not None:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return first & 0x0F, payload
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
-from PySide6.QtCore import QObject, Signal
+import math
+from PySide6.QtCore import QObject, Signal, Slot
 from Packages.Models.Plane import WTPlane, flapState
+from backend.telemetryHistory import TelemetryHistory
 from backend.SoundEngine import Sound
 from backend.SoundEngine.sounds import SpeedWarningSound, FlapSpeedWarningSound, GearSpeedWarningSound, FlapInfoSound
-from backend.wtFetcher import TelemetryData
+from backend.wtFetcher import TelemetryData, TelemetryField
 from backend.settings import WarningSettings
 @dataclass
 class thresholdSpeeds:
@@ -25,8 +27,16 @@ class thresholdSettings:
     mach_max_diff:float = 0.2
     
 STANDADRD_SPEED_TRESHOLDS = thresholdSettings(0.9, 10, 50)
+# Telemetry fields the warnings depend on
+WARNING_FIELDS = TelemetryField.PLANETYPE | TelemetryField.IAS | TelemetryField.FLAPS | TelemetryField.GEAR | TelemetryField.MACH_SPEED
+# Telemetry older than this (in s) does not describe the current situation anymore, no warnings are given for it
+STALE_TELEMETRY_S = 1.0
+# Time span in s over which the speed rates are computed from the history of the plane
+RATE_WINDOW_S = 1.0
 
 class PlaneSpeedWarningEngine(QObject):
+    """Calculates the speed warnings of the own plane. Runs in the Thread of a WarningEvaluationWorker, so its slots
+    are called there (queued) and never block the GUI."""
     thresholds:thresholdSpeeds|None
     _speed_borders:thresholdSettings
     _plane_max_speeds:dict|None
@@ -36,6 +46,7 @@ class PlaneSpeedWarningEngine(QObject):
     # SIGNALS
     play_sound_signal = Signal(list)
     stop_sound_signal = Signal(list)
+    time_to_limit_signal = Signal(float)
     
     def __init__(self,
                 speed_warning_treshold:float|None = None, 
@@ -47,6 +58,9 @@ class PlaneSpeedWarningEngine(QObject):
                 ):    
         super().__init__()
         self._plane_max_speeds = None
+        self._last_telemetry:TelemetryData|None = None
+        self._history:TelemetryHistory|None = None
+        self.time_to_limit = 0.0
         self.thresholds = None
         self._speed_borders = STANDADRD_SPEED_TRESHOLDS
         
@@ -64,12 +78,14 @@ class PlaneSpeedWarningEngine(QObject):
             self._speed_borders.mach_max_diff = mach_max_diff
     
     
+    @Slot(object)
     def on_new_plane(self, plane:WTPlane):
         """Update plane data
 
         :param plane: the New Plane object
         :type plane: WTPlane
         """
+        self._history = plane.history
         max_speeds = plane.get_max_speeds()
         if max_speeds is None:
             self.thresholds = None
@@ -80,6 +96,10 @@ class PlaneSpeedWarningEngine(QObject):
             self._calc_and_set_tresholds()
         
         self._plane_flap_states = plane.get_flap_deployment_thresholds()
+        # assume a limit is close until the history of the new plane allows an estimate
+        self.time_to_limit = 0.0
+        self.time_to_limit_signal.emit(self.time_to_limit)
+        self._reevaluate()
         
     
     def on_new_telemetry(self, telemetry:TelemetryData):
@@ -89,8 +109,15 @@ class PlaneSpeedWarningEngine(QObject):
         :type telemetry: TelemetryData
         """
         warning_list:list[Sound] = []
+        self._last_telemetry = telemetry
         if telemetry is None or self.thresholds is None:
             return
+        if telemetry.age() > STALE_TELEMETRY_S:
+            # e.g. the GUI thread was blocked or the game is paused, don't warn based on outdated data
+            if len(self._current_warnings) > 0:
+                self.stop_sound_signal.emit(self._pop_old_warning_sounds([]))
+            return
+        self._update_time_to_limit(telemetry)
         print(f"IAS: {telemetry.ias} | FLAPS: {telemetry.flaps} | GEAR: {telemetry.gear} | MACH: {telemetry.mach_speed} | TRESHOLDS: {self.thresholds}")
         
         if telemetry.ias is not None and self.thresholds is not None:
@@ -116,6 +143,7 @@ class PlaneSpeedWarningEngine(QObject):
             if len(new_warnings) > 0:                
                 self.play_sound_signal.emit(new_warnings)
 
+    @Slot(object)
     def on_new_threshold_settings(self, settings:WarningSettings):
         """Update Threshold settings
 
@@ -131,6 +159,53 @@ class PlaneSpeedWarningEngine(QObject):
         
         self._speed_borders = tresh_settings
         self._calc_and_set_tresholds()
+        self._reevaluate()
+    
+    def _update_time_to_limit(self, telemetry:TelemetryData) -> None:
+        """Estimate the time until the nearest speed threshold is reached with the current acceleration (taken from the
+        history of the plane) and emit it with time_to_limit_signal (0 if a threshold is already exceeded, inf if none is approached).
+
+        :param telemetry: the New Telemetry data
+        :type telemetry: TelemetryData
+        """
+        if telemetry.ias is None or self.thresholds is None:
+            return
+        
+        ias_rate = mach_rate = None
+        if self._history is not None:
+            ias_rate = self._history.rate("ias", RATE_WINDOW_S)
+            mach_rate = self._history.rate("mach_speed", RATE_WINDOW_S)
+        ias_rate = ias_rate or 0.0
+        mach_rate = mach_rate or 0.0
+        
+        # (margin to the threshold, rate at which it shrinks)
+        margins = [(self.thresholds.frame - telemetry.ias, ias_rate)]
+        if telemetry.gear is not None and telemetry.gear > 0:
+            margins.append((self.thresholds.gear - telemetry.ias, ias_rate))
+        if telemetry.flaps is not None:
+            flap_tresh = self._get_current_flap_treshold(telemetry.flaps)
+            if flap_tresh is not None:
+                margins.append((flap_tresh - telemetry.ias, ias_rate))
+        if self.thresholds.frame_mach is not None and telemetry.mach_speed is not None:
+            margins.append((self.thresholds.frame_mach - telemetry.mach_speed, mach_rate))
+        
+        time_to_limit = math.inf
+        for margin, rate in margins:
+            if margin <= 0:
+                time_to_limit = 0.0
+                break
+            if rate > 0:
+                time_to_limit = min(time_to_limit, margin / rate)
+        
+        self.time_to_limit = time_to_limit
+        self.time_to_limit_signal.emit(time_to_limit)
+    
+    def _reevaluate(self) -> None:
+        """Recalculate the warnings for the last telemetry after the thresholds changed.
+        on_new_telemetry is only called when one of WARNING_FIELDS changed, so the current state would be kept otherwise.
+        """
+        if self._last_telemetry is not None:
+            self.on_new_telemetry(self._last_telemetry)
             
     def _calc_and_set_tresholds(self) -> thresholdSpeeds|None:
         """
@@ -0,0 +1,101 @@
+from PySide6.QtCore import QObject, QThread, Slot
+from .SoundEngine import Sound, SoundBox
+from .telemetryDispatcher import TelemetryDispatcher
+from .wtFetcher import TelemetryData, TelemetryField
+from .worker import dataFetcher, asyncDataFetcher
+
+
+class WarningEvaluationWorker(QObject):
+    """Runs the warning modules and dispatches their sounds in a dedicated Thread.
+
+    Telemetry is taken from the channel of the attached dataFetcher and passed to the warning modules (see
+    TelemetryDispatcher) within this Thread, the resulting sounds are handed to the SoundBoxes directly (they are
+    thread-safe). So overspeed alerts never wait for the event loop of the GUI.
+    """
+    running_thread:QThread
+
+    def __init__(self, default_sound_box:SoundBox, priority_sound_box:SoundBox):
+        """Create the Worker and start its Thread
+
+        :param default_sound_box: SoundBox for sounds without priority_playback
+        :type default_sound_box: SoundBox
+        :param priority_sound_box: SoundBox for sounds with priority_playback
+        :type priority_sound_box: SoundBox
+        """
+        super().__init__()
+        self._default_sound_box = default_sound_box
+        self._priority_sound_box = priority_sound_box
+        self.dispatcher = TelemetryDispatcher()
+        self._fetcher:dataFetcher|asyncDataFetcher|None = None
+
+        self.running_thread = QThread()
+        self.running_thread.setObjectName("warningEvaluationThread")
+        self.moveToThread(self.running_thread)
+        self.running_thread.start()
+
+    def add_module(self, module:QObject, fields:TelemetryField) -> None:
+        """Run a warning module in the Thread of this Worker.
+        The module has to provide on_new_telemetry and the signals play_sound_signal and stop_sound_signal.
+
+        :param module: The warning module, e.g. PlaneSpeedWarningEngine
+        :type module: QObject
+        :param fields: Telemetry fields the module depends on, it is only called if one of them changed
+        :type fields: TelemetryField
+        """
+        module.moveToThread(self.running_thread)
+        self.dispatcher.subscribe(fields, module.on_new_telemetry)
+        module.play_sound_signal.connect(self.play_sounds)
+        module.stop_sound_signal.connect(self.stop_sounds)
+
+    def attach(self, fetcher:dataFetcher|asyncDataFetcher) -> None:
+        """Take the telemetry of a (new) dataFetcher, has to be repeated whenever the fetcher is recreated
+
+        :param fetcher: The Worker fetching the telemetry
+        :type fetcher: dataFetcher | asyncDataFetcher
+        """
+        self._fetcher = fetcher
+        fetcher.new_telemetry_data.connect(self.on_new_telemetry)
+
+    @Slot(object)
+    def on_new_telemetry(self, _telemetry:TelemetryData) -> None:
+        """Forward the newest telemetry frame of the fetcher to the warning modules.
+        Frames which arrived while the modules were busy are skipped instead of processed one by one.
+        """
+        fetcher = self._fetcher
+        if fetcher is None:
+            return
+        latest = fetcher.telemetry_channel.take()
+        if latest is None:
+            return
+        _seq, telemetry = latest
+        self.dispatcher.dispatch(telemetry)
+
+    @Slot(list)
+    def play_sounds(self, sounds:list[Sound]|Sound) -> None:
+        if isinstance(sounds, Sound):
+            sounds = [sounds]
+        for sound in sounds:
+            if sound.priority_playback:
+                self._priority_sound_box.add_sound(sound)
+            else:
+                self._default_sound_box.add_sound(sound)
+
+    @Slot(list)
+    def stop_sounds(self, sounds:list[Sound]|Sound) -> None:
+        if isinstance(sounds, Sound):
+            sounds = [sounds]
+        for sound in sounds:
+            if sound.priority_playback:
+                self._priority_sound_box.remove_sound(sound)
+            else:
+                self._default_sound_box.remove_sound(sound)
+
+    def stop(self, wait:bool = False) -> None:
+        """Stop the Thread of the Worker
+
+        :param wait: If True, wait until the Thread finished, defaults to False
+        :type wait: bool, optional
+        """
+        self.running_thread.quit()
+        if wait:
+            self.running_thread.wait()
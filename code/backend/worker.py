@@ -1,7 +1,18 @@
 from PySide6.QtCore import QObject, QThread, Signal, QTimer, Slot
 from Packages.Models.Plane import WTPlane
+from Packages.WarThunder import telemetry
+import asyncio
 import threading
-from .wtFetcher import WTUpdater, TelemetryNotFoundException, PlaneNotFoundException, TelemetryData
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+from .wtFetcher import WTUpdater, TelemetryData
+from .latestFrame import LatestFrameChannel
+from .telemetryDispatcher import merge_skipped_frame
+from .ingestEngine import IngestEngine, call_sinks
+from .fetchScheduler import FetchScheduler, FetchPhase
+from .multiHostMonitor import MultiHostMonitor, HostStatus
+from .telemetryRelay import TelemetryRelay
 
 class AsyncPeriodicWorker(QObject):
     running_thread:QThread
@@ -87,10 +98,22 @@ class dataFetcher(AsyncPeriodicWorker):
     new_plane_data = Signal(WTPlane)
     new_telemetry_data = Signal(TelemetryData)
     new_map_data = Signal(dict) #TODO: Implement with Map Support
+    # Internal signal to close a replaced WTUpdater in the thread of the Worker, after its last run
+    _close_fetcher = Signal(object)
 
     
-    def __init__(self,endpoint_ip:str, debug_mode:bool = False, std_intervall_ms:int = 100, error_intervall_ms:int = 5000):
+    def __init__(self,endpoint_ip:str, debug_mode:bool = False, std_intervall_ms:int = 100, error_intervall_ms:int = 5000, concurrent_fetch:bool = False, idle_intervall_ms:int = 500,
+                 auto_intervall:bool = False, min_intervall_ms:int = 20, max_intervall_ms:int = 200, adaptive_intervall:bool = False):
         """Create a Worker to fetch data from the local WT-Web-Endpoint
+        
+        The Worker follows the state of the game (see FetchPhase and FetchScheduler): While the player is in flight, the full telemetry is
+        fetched every std_intervall_ms. In the hangar only a single cheap probe request is sent every idle_intervall_ms,
+        while WT is not running every error_intervall_ms. As soon as a probe detects a spawn, the full telemetry is fetched
+        in the same run and the Worker switches back to std_intervall_ms.
+        If auto_intervall is set, std_intervall_ms is not used. Instead the update rate of the game is measured (see
+        RefreshRateTuner) and the intervall is locked just above it, within min_intervall_ms and max_intervall_ms.
+        If adaptive_intervall is set, the intervall in flight is raised in steps of std_intervall up to
+        MAX_RELAX_FACTOR * std_intervall while no speed limit is near (see on_time_to_limit).
 
         :param endpoint_ip: The Address of the local Warthunder web endpoint
         :type endpoint_ip: str
@@ -100,20 +123,54 @@ class dataFetcher(AsyncPeriodicWorker):
         :type std_intervall_ms: int, optional
         :param error_intervall_ms: The intervall of running this Worker in ms as long as an error occured, defaults to 5000
         :type error_intervall_ms: int, optional
+        :param concurrent_fetch: If True, all endpoints of one run are queried concurrently instead of one after another, defaults to False
+        :type concurrent_fetch: bool, optional
+        :param idle_intervall_ms: The intervall of probing the game state in ms while the player is not in a match, defaults to 500
+        :type idle_intervall_ms: int, optional
+        :param auto_intervall: If True, the intervall in flight is tuned to the update rate of the game, defaults to False
+        :type auto_intervall: bool, optional
+        :param min_intervall_ms: Lowest intervall in ms if auto_intervall is set, defaults to 20
+        :type min_intervall_ms: int, optional
+        :param max_intervall_ms: Highest intervall in ms if auto_intervall is set, defaults to 200
+        :type max_intervall_ms: int, optional
+        :param adaptive_intervall: If True, poll slower while the plane is far from its speed limits, defaults to False
+        :type adaptive_intervall: bool, optional
         
         Signals:
             new_plane_data (WTPlane): Emitted when planer type was changed ingame, sends new Plane Data (e.g., plane type changes).
-            new_telemetry_data (dict): Emitted when new telemetry data is fetched.
+            new_telemetry_data (TelemetryData): Emitted when new telemetry data is fetched and the last emitted data was already taken
+                from self.telemetry_channel. Consumers should act on self.telemetry_channel.take(), which is always the newest frame.
+                Its dirty mask (TelemetryData.changed) includes the changes of all frames skipped since the last take.
             new_map_data (dict): Emitted when new map data is available (TODO: Implement with Map Support).
         """
         super().__init__(std_intervall_ms)
         self.running_thread.setObjectName("dataFetcherThread")
-        self.std_intervall = std_intervall_ms
-        self.error_intervall = error_intervall_ms
-        self.fetcher = WTUpdater(endpoint_ip, debug_mode)
+        self.scheduler = FetchScheduler(std_intervall_ms, error_intervall_ms, idle_intervall_ms, auto_intervall,
+                                        min_intervall_ms, max_intervall_ms, adaptive_intervall)
+        self.fetcher = WTUpdater(endpoint_ip, debug_mode, concurrent_fetch)
         self.own_plane: WTPlane|None = None
-        self.__last_was_success = True
+        self.telemetry_channel = LatestFrameChannel(merge=merge_skipped_frame)
+        # Called in the Thread of the Worker with every new frame, e.g. to export it. Must not block.
+        self.frame_sinks:list[Callable[[TelemetryData], None]] = []
+        # Called in the Thread of the Worker after every run (also probes outside of flight) with the interface of
+        # self.fetcher, e.g. to stream its raw state. Must not block.
+        self.interface_sinks:list[Callable[[telemetry.TelemInterface], None]] = []
         self.__debug_mode = debug_mode
+        self.__concurrent_fetch = concurrent_fetch
+        # Planes are looked up in the database (up to API_TIMEOUT) in the background, not in the fetch tick
+        self.__plane_lookups = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planeLookup")
+        self.__plane_lookup:Future|None = None
+        self._close_fetcher.connect(self._on_close_fetcher)
+        self.running_thread.finished.connect(self._on_fetcher_finished)
+        self.scheduler.intervall_callbacks.append(self.update_intervall)
+        self.scheduler.cadence_callbacks.append(self.__set_cadence)
+        if self.scheduler.tuner is not None:
+            self.__set_cadence(self.scheduler.std_intervall)
+            self.update_intervall(self.scheduler.current_intervall())
+    
+    @property
+    def phase(self) -> FetchPhase:
+        return self.scheduler.phase
     
     def on_ip_change(self, new_ip:str):
         """Update the Endpoint IP of the fetcher
@@ -121,50 +178,326 @@ class dataFetcher(AsyncPeriodicWorker):
         :param new_ip: The new IP Address of the local Warthunder web endpoint
         :type new_ip: str
         """
-        self.fetcher = WTUpdater(new_ip, self.__debug_mode)
+        old_fetcher, self.fetcher = self.fetcher, WTUpdater(new_ip, self.__debug_mode, self.__concurrent_fetch)
+        self._close_fetcher.emit(old_fetcher)
+        self.scheduler.start_calibration()
+    
+    @Slot(object)
+    def _on_close_fetcher(self, fetcher:WTUpdater) -> None:
+        fetcher.close()
+    
+    @Slot()
+    def _on_fetcher_finished(self) -> None:
+        # Runs in the thread of the Worker once it stopped, no run uses the fetcher anymore
+        self.fetcher.close()
+    
+    def set_std_intervall(self, interval_ms:int):
+        """Update the intervall used while the player is in flight
+
+        :param interval_ms: the new Intervall in ms
+        :type interval_ms: int
+        """
+        self.scheduler.set_std_intervall(interval_ms)
+    
+    @Slot(float)
+    def on_time_to_limit(self, seconds:float):
+        """Update the estimated time until the plane reaches its nearest speed limit (see PlaneSpeedWarningEngine).
+        With adaptive_intervall, the intervall in flight is scaled with it.
+
+        :param seconds: Time to the nearest limit in s, 0 if a limit is exceeded, inf if none is approached
+        :type seconds: float
+        """
+        self.scheduler.on_time_to_limit(seconds)
+    
+    def get_diagnostics(self) -> dict:
+        """Get counters describing the state of the fetch pipeline
+
+        :return: Dict of diagnostic values
+        :rtype: dict
+        """
+        channel_stats = self.telemetry_channel.stats()
+        _seq, frame = self.telemetry_channel.latest()
+        return {
+            "phase": str(self.phase),
+            "published_frames": channel_stats["published"],
+            "skipped_frames": channel_stats["skipped"],
+            "missed_deadlines": self.fetcher.missed_deadlines,
+            "unchanged_frames": self.fetcher.unchanged_responses,
+            "last_frame_seq": frame.seq if frame is not None else None,
+            "last_frame_age_ms": frame.age() * 1000 if frame is not None else None,
+            "last_rtt_ms": frame.rtt * 1000 if frame is not None else None,
+            "std_intervall_ms": self.scheduler.std_intervall,
+            "active_intervall_ms": self.scheduler.active_intervall(),
+            "time_to_limit_s": self.scheduler.time_to_limit,
+            "calibrating": self.scheduler.tuner.calibrating if self.scheduler.tuner is not None else False,
+            "measured_refresh_hz": self.scheduler.tuner.measured_rate_hz if self.scheduler.tuner is not None else None,
+        }
     
     def _work(self):
-        errors_occured = False
-        error = None
-        tel = None
-        try:
-            self.fetcher.fetch_data()
-            tel = self.fetcher.get_plane_telemetry()
-        except (TelemetryNotFoundException, PlaneNotFoundException) as e:
-            print(e)
-            errors_occured = True
-            error = e
+        fetcher = self.fetcher
+        self.__fetch()
+        call_sinks(self.interface_sinks, fetcher.tel_interface)
+    
+    def __fetch(self):
+        deadline = self.scheduler.deadline()
+        if self.phase != FetchPhase.ACTIVE:
+            if not self.scheduler.on_probe(self.fetcher.probe(deadline)):
+                return
+            # Spawn detected, fetch everything right now
+            deadline = self.scheduler.deadline()
         
-        if not errors_occured and tel is not None:
-            self.new_telemetry_data.emit(tel)
-            
-            if self.own_plane is None or not (self.own_plane.planetype == tel.planetype): 
-                self.own_plane = WTPlane(tel.planetype)
-                self.new_plane_data.emit(self.own_plane)
-            
-            self.own_plane.set_telemetry(tel)
-            self.__on_success()
-        else:
-            if errors_occured and error is not None: 
-                self.__on_error(error)
-            elif tel is None:
-                self.__on_error(TelemetryNotFoundException("No Telemetry found while Update run."))
-            else:
-                self.__on_error(RuntimeError("Unknown error occured"))
-                
-                
-    def __on_error(self, error:Exception) -> None:
-        """set update rate to self.error_intervall
-        """
-        if self.__last_was_success:
-            self.__last_was_success = False
-            self.update_intervall(self.error_intervall)
+        # WTUpdater.fetch_data reports its errors itself, a run without telemetry of the plane is an error here
+        self.fetcher.fetch_data(deadline)
+        tel = self.fetcher.get_plane_telemetry()
+        if tel is None:
+            self.__on_error()
+            return
         
+        self.scheduler.on_telemetry("state" in self.fetcher.changed_endpoints)
+        self.__update_plane(tel.planetype)
+        if self.fetcher.unchanged:
+            # nothing new to process for the consumers
+            return
+        
+        # add the frame to the history of the plane before consumers are notified about it
+        self.own_plane.set_telemetry(tel)
+        
+        call_sinks(self.frame_sinks, tel)
+        if self.telemetry_channel.publish(tel):
+            self.new_telemetry_data.emit(tel)
     
-    def __on_success(self) -> None:
-        """set update rate to self.std_intervall
+    def stop(self):
+        """Stop the Worker, its Thread and a running plane lookup
+        """
+        self.__plane_lookups.shutdown(wait=False, cancel_futures=True)
+        super().stop()
+    
+    def __update_plane(self, planetype:str) -> WTPlane:
+        """Get the plane of the current telemetry. A new plane type (or a plane whose lookup failed to reach the API)
+        is looked up in the background, new_plane_data is emitted once it is done. Meanwhile frames are published with
+        the previous plane, for the first plane with one without known limits.
+
+        :param planetype: Plane type of the current telemetry
+        :type planetype: str
+        :return: The plane to add the frame to
+        :rtype: WTPlane
+        """
+        if self.__plane_lookup is not None and self.__plane_lookup.done():
+            lookup, self.__plane_lookup = self.__plane_lookup, None
+            try:
+                self.own_plane = lookup.result()
+            except Exception as e:
+                # not retried, go on without limits
+                print(f"Error while looking up {planetype}: {e}")
+                self.own_plane = WTPlane(planetype, lookup=False)
+            self.new_plane_data.emit(self.own_plane)
+        if self.__plane_lookup is None and (self.own_plane is None or self.own_plane.lookup_outdated(planetype)):
+            self.__plane_lookup = self.__plane_lookups.submit(WTPlane, planetype)
+        if self.own_plane is None:
+            self.own_plane = WTPlane(planetype, lookup=False)
+            self.new_plane_data.emit(self.own_plane)
+        return self.own_plane
+    
+    def __on_error(self) -> None:
+        """Report a run without telemetry to the scheduler, which leaves the active phase after ACTIVE_GRACE_S"""
+        self.scheduler.on_error(self.fetcher.status)
+    
+    def __set_cadence(self, interval_ms:int) -> None:
+        self.fetcher.set_telemetry_cadence(interval_ms / 1000)
+
+
+
+class EventLoopWorker(QObject):
+    """Base for Workers which run a coroutine (e.g. IngestEngine.run) in an asyncio event loop in their own Thread.
+    Child Classes implement _main and start the Thread with _start once they are set up.
+    """
+    def __init__(self, thread_name:str):
+        """
+        :param thread_name: Name of the Thread running the event loop
+        :type thread_name: str
         """
-        if not self.__last_was_success:
-            self.__last_was_success = True
-            self.update_intervall(self.std_intervall)
-            
\ No newline at end of file
+        super().__init__()
+        self._loop = asyncio.new_event_loop()
+        self.running_thread = threading.Thread(target=self.__run_loop, name=thread_name, daemon=True)
+
+    def _start(self) -> None:
+        self.running_thread.start()
+
+    def _main(self):
+        # Has to be implemented by child Classes, returns the coroutine to run
+        raise NotImplementedError
+
+    def _on_loop_finished(self) -> None:
+        # Called in the Thread of the loop after _main returned, e.g. to close connections
+        pass
+
+    def __run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._on_loop_finished()
+            self._loop.close()
+
+    def _call_in_loop(self, function, *args) -> None:
+        """Call a function in the Thread of the event loop"""
+        try:
+            self._loop.call_soon_threadsafe(function, *args)
+        except RuntimeError:
+            # the loop is already closed
+            pass
+
+
+class asyncDataFetcher(EventLoopWorker):
+    # Signals Emitted by this Worker, see dataFetcher
+    new_plane_data = Signal(WTPlane)
+    new_telemetry_data = Signal(TelemetryData)
+    new_map_data = Signal(dict) #TODO: Implement with Map Support
+
+    def __init__(self,endpoint_ip:str, debug_mode:bool = False, std_intervall_ms:int = 100, error_intervall_ms:int = 5000, idle_intervall_ms:int = 500,
+                 auto_intervall:bool = False, min_intervall_ms:int = 20, max_intervall_ms:int = 200, adaptive_intervall:bool = False):
+        """Create a Worker which runs an IngestEngine in an asyncio event loop in its own Thread and forwards its results
+        into the same signals as dataFetcher, so it can be used in place of it. All endpoints of a run are queried
+        concurrently without blocking.
+        The parameters are the same as for dataFetcher (see there).
+        """
+        super().__init__("ingestEngineThread")
+        self.engine = IngestEngine(endpoint_ip, debug_mode, std_intervall_ms, error_intervall_ms, idle_intervall_ms,
+                                   auto_intervall=auto_intervall, min_intervall_ms=min_intervall_ms, max_intervall_ms=max_intervall_ms,
+                                   adaptive_intervall=adaptive_intervall)
+        self.engine.plane_callbacks.append(self.new_plane_data.emit)
+        self.engine.telemetry_callbacks.append(self.new_telemetry_data.emit)
+        self.telemetry_channel = self.engine.telemetry_channel
+        self.fetcher = self.engine.fetcher
+        # see dataFetcher.frame_sinks and dataFetcher.interface_sinks, called in the Thread of the event loop
+        self.frame_sinks = self.engine.frame_sinks
+        self.interface_sinks = self.engine.interface_sinks
+        self._start()
+
+    def _main(self):
+        return self.engine.run()
+
+    def _on_loop_finished(self) -> None:
+        self.engine.fetcher.close()
+
+    @property
+    def phase(self) -> FetchPhase:
+        return self.engine.phase
+
+    @Slot(float)
+    def on_time_to_limit(self, seconds:float):
+        """See dataFetcher.on_time_to_limit"""
+        self._call_in_loop(self.engine.on_time_to_limit, seconds)
+
+    def set_std_intervall(self, interval_ms:int):
+        """See dataFetcher.set_std_intervall"""
+        self._call_in_loop(self.engine.set_std_intervall, interval_ms)
+
+    def get_diagnostics(self) -> dict:
+        return self.engine.get_diagnostics()
+
+    def stop(self):
+        """Stop the engine and its Thread"""
+        self._call_in_loop(self.engine.stop)
+
+    def pause(self):
+        self.engine.pause()
+
+    def resume(self):
+        self.engine.resume()
+
+
+class multiHostFetcher(EventLoopWorker):
+    # Signals Emitted by this Worker
+    host_plane_data = Signal(str, WTPlane)
+    host_telemetry_data = Signal(str, TelemetryData)
+
+    def __init__(self, hosts:list[str], std_intervall_ms:int = 100, error_intervall_ms:int = 5000, idle_intervall_ms:int = 500, **engine_options):
+        """Create a Worker which monitors several WT-Web-Endpoints with a MultiHostMonitor in one event loop in its own Thread
+
+        :param hosts: Addresses of the Warthunder web endpoints to monitor
+        :type hosts: list[str]
+        :param std_intervall_ms: The intervall of fetching in ms while a player is in flight, defaults to 100
+        :type std_intervall_ms: int, optional
+        :param error_intervall_ms: The intervall of probing in ms while a host is not reachable, defaults to 5000
+        :type error_intervall_ms: int, optional
+        :param idle_intervall_ms: The intervall of probing in ms while a player is not in a match, defaults to 500
+        :type idle_intervall_ms: int, optional
+        :param engine_options: Further keyword arguments for the IngestEngine of each host (e.g. auto_intervall)
+
+        Signals:
+            host_plane_data (str, WTPlane): Emitted when the plane of a host changed, with the host.
+            host_telemetry_data (str, TelemetryData): Emitted when new telemetry of a host was fetched and the last one was
+                already taken from telemetry_channel(host), see dataFetcher.new_telemetry_data.
+        """
+        super().__init__("multiHostMonitorThread")
+        self.monitor = MultiHostMonitor(std_intervall_ms, error_intervall_ms, idle_intervall_ms, **engine_options)
+        self.monitor.plane_callbacks.append(self.host_plane_data.emit)
+        self.monitor.telemetry_callbacks.append(self.host_telemetry_data.emit)
+        for host in hosts:
+            self.monitor.add_host(host)
+        self._start()
+
+    def _main(self):
+        return self.monitor.run()
+
+    def telemetry_channel(self, host:str) -> LatestFrameChannel:
+        """Get the channel holding the newest telemetry of a host"""
+        return self.monitor.engines[host].telemetry_channel
+
+    def add_host(self, host:str) -> None:
+        self._call_in_loop(self.monitor.add_host, host)
+
+    def remove_host(self, host:str) -> None:
+        self._call_in_loop(self.monitor.remove_host, host)
+
+    def get_status(self) -> list[HostStatus]:
+        """Get phase and latency of every host, see MultiHostMonitor.get_status"""
+        return self.monitor.get_status()
+
+    def stop(self):
+        """Stop monitoring and the Thread"""
+        self._call_in_loop(self.monitor.stop)
+
+    def pause(self):
+        self._call_in_loop(self.monitor.pause)
+
+    def resume(self):
+        self._call_in_loop(self.monitor.resume)
+
+
+class telemetryRelayWorker(EventLoopWorker):
+    def __init__(self, host:str = "127.0.0.1", port:int = 8112):
+        """Create a Worker which serves a TelemetryRelay from an asyncio event loop in its own Thread.
+        Add publish to dataFetcher.frame_sinks to re-publish every fetched frame.
+
+        :param host: Interface to listen on, "0.0.0.0" to serve other devices of the LAN, defaults to "127.0.0.1"
+        :type host: str, optional
+        :param port: Port to listen on, defaults to 8112
+        :type port: int, optional
+        :raises OSError: If the port could not be bound (e.g. it is in use)
+        """
+        super().__init__("telemetryRelayThread")
+        self.relay = TelemetryRelay(host, port)
+        try:
+            # bind before the Thread starts, so errors reach the caller instead of ending the Thread silently
+            self._loop.run_until_complete(self.relay.start())
+        except OSError:
+            self._loop.close()
+            raise
+        self._start()
+
+    def _main(self):
+        return self.relay.serve_forever()
+
+    def publish(self, telemetry:TelemetryData) -> None:
+        """Hand a frame to the relay, can be called from any Thread and never blocks"""
+        self._call_in_loop(self.relay.publish, telemetry)
+
+    def get_diagnostics(self) -> dict:
+        return self.relay.stats()
+
+    def stop(self):
+        """Stop the relay and its Thread"""
+        self._call_in_loop(self.relay.stop)
+
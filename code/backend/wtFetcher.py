@@ -1,6 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+from enum import IntFlag
 from Packages.WarThunder import telemetry, mapinfo
 from paths import get_resource_path
+from .derivedTelemetry import DerivedTelemetry, DerivedTelemetryEngine, DERIVED_TELEMETRY_KEYS
 import time
 import json
 
@@ -20,12 +22,36 @@ OPTIONAL_TELEMETRY = [
     "lon", 
     "mach_speed"
 ]
+def required_telemetry_keys() -> set[str]:
+    """Get all keys of the raw telemetry which are read by WTUpdater (see TELEMETRY_INFORMATION).
+
+    Returns:
+        set[str]: Keys which have to be decoded from the WT-API responses
+    """
+    keys = set(DERIVED_TELEMETRY_KEYS)
+    for source_keys in TELEMETRY_INFORMATION.values():
+        keys.update(source_keys)
+    return keys
+
 class TelemetryNotFoundException(Exception):
     pass
 class PlaneNotFoundException(Exception):
     pass
 
-@dataclass
+class TelemetryField(IntFlag):
+    """Flags for the fields of TelemetryData, used as dirty mask (TelemetryData.changed) and for subscriptions"""
+    NONE = 0
+    PLANETYPE = 1 << 0
+    FLAPS = 1 << 1
+    GEAR = 1 << 2
+    IAS = 1 << 3
+    LAT = 1 << 4
+    LON = 1 << 5
+    AIRBRAKE = 1 << 6
+    MACH_SPEED = 1 << 7
+    ALL = PLANETYPE | FLAPS | GEAR | IAS | LAT | LON | AIRBRAKE | MACH_SPEED
+
+@dataclass(slots=True)
 class TelemetryData:
     planetype:str
     flaps: int
@@ -35,79 +61,357 @@ class TelemetryData:
     lon: float = 0
     airbrake: int = 0
     mach_speed: float = 999.9
+    # Fields which changed compared to the previous frame, every field for the first one
+    changed: TelemetryField = field(default=TelemetryField.ALL, compare=False, repr=False)
+    # Number of the frame, counted by the WTUpdater which parsed it
+    seq: int = field(default=0, compare=False, repr=False)
+    # time.monotonic() timestamp at which the underlying responses were received
+    received_at: float = field(default=0.0, compare=False, repr=False)
+    # Time in s the requests for this frame took
+    rtt: float = field(default=0.0, compare=False, repr=False)
+    # Values computed from the telemetry stream up to this frame, shared by all consumers
+    derived: DerivedTelemetry|None = field(default=None, compare=False, repr=False)
+    
+    def age(self, now:float|None = None) -> float:
+        """Get the time since the frame was received.
+
+        Args:
+            now (float|None, optional): time.monotonic() timestamp to compare to, defaults to the current time.
+
+        Returns:
+            float: Age of the frame in s
+        """
+        if now is None:
+            now = time.monotonic()
+        return now - self.received_at
+
+# (name, flag) of every field of TelemetryData covered by TelemetryField
+_FIELD_FLAGS = tuple((f.name, TelemetryField[f.name.upper()]) for f in fields(TelemetryData) if f.name.upper() in TelemetryField.__members__)
+
+def changed_fields(previous:TelemetryData|None, current:TelemetryData) -> TelemetryField:
+    """Compare two telemetry frames field by field.
+
+    Args:
+        previous (TelemetryData|None): The older frame, None if there is none
+        current (TelemetryData): The newer frame
+
+    Returns:
+        TelemetryField: Flags of all fields which differ, TelemetryField.ALL if there is no previous frame
+    """
+    if previous is None:
+        return TelemetryField.ALL
+    changed = TelemetryField.NONE
+    for name, flag in _FIELD_FLAGS:
+        if getattr(previous, name) != getattr(current, name):
+            changed |= flag
+    return changed
+
+class TelemetryResolver(object):
+    """Resolver which knows for one airframe from which source and key each field of TelemetryData is read.
+    It is compiled once per plane type, so no keys have to be searched while parsing the following telemetry.
+    Keys which were missing while compiling (optional categories or keys preferred over the found ones) are remembered,
+    the resolver is outdated as soon as one of them shows up (see outdated).
+    """
+    def __init__(self, lookups:list[tuple[str, int, str]], missing:list[tuple[int, str]]|None = None):
+        """Create a Resolver from already found lookups, use TelemetryResolver.compile to search them.
+
+        Args:
+            lookups (list[tuple[str, int, str]]): (category, index of the source, key) for each found category
+            missing (list[tuple[int, str]]|None, optional): (index of the source, key) of the keys which would be preferred
+                over the found ones (or would resolve a missing category). Defaults to None.
+        """
+        self.lookups = lookups
+        self.missing = missing or []
+    
+    @classmethod
+    def compile(cls, sources:tuple[dict, ...]) -> "TelemetryResolver":
+        """Search the keys defined in TELEMETRY_INFORMATION in the given sources.
+        Earlier sources and keys are preferred.
+
+        Args:
+            sources (tuple[dict, ...]): Dicts containing the telemetry information
+
+        Raises:
+            TelemetryNotFoundException: If a category not listed in OPTIONAL_TELEMETRY is not found.
+
+        Returns:
+            TelemetryResolver: Resolver for the airframe of the given sources
+        """
+        lookups = []
+        missing = []
+        
+        for category, keys in TELEMETRY_INFORMATION.items():
+            lookup = None
+            skipped = []
+            
+            for key in keys:
+                for index, source in enumerate(sources):
+                    if key in source:
+                        lookup = (category, index, key)
+                        break
+                    skipped.append((index, key))
+                if lookup is not None:
+                    break
+            
+            if lookup is not None:
+                lookups.append(lookup)
+            elif category not in OPTIONAL_TELEMETRY:
+                raise TelemetryNotFoundException(f"Telemetry object {category} ({keys}) not found in Telemetry of the Plane.")
+            missing.extend(skipped)
+        
+        return cls(lookups, missing)
+    
+    def outdated(self, sources:tuple[dict, ...]) -> bool:
+        """Check whether a key which was missing while compiling is present now, the resolver has to be compiled again then.
+
+        Args:
+            sources (tuple[dict, ...]): Dicts containing the telemetry information, in the same order as while compiling
+
+        Returns:
+            bool: True if a preferred key or the key of a missing optional category showed up
+        """
+        for index, key in self.missing:
+            if index < len(sources) and key in sources[index]:
+                return True
+        return False
+    
+    def resolve(self, sources:tuple[dict, ...]) -> TelemetryData:
+        """Read the TelemetryData from the sources this resolver was compiled for.
+
+        Args:
+            sources (tuple[dict, ...]): Dicts containing the telemetry information, in the same order as while compiling
+
+        Raises:
+            KeyError: If a key is no longer present in its source, the resolver has to be compiled again.
+
+        Returns:
+            TelemetryData: The parsed telemetry
+        """
+        return TelemetryData(**{category: sources[index][key] for category, index, key in self.lookups})
+
 class WTUpdater(object):
-    def __init__(self, ip_addr, debug_mode=False):
+    def __init__(self, ip_addr, debug_mode=False, concurrent_fetch=False):
         """Create an Fetcher to get Information from the WT-API
             If Debug Mode is enabled, information are fetched from a local json file instead of the API.
         Args:
             ip_addr (str): IP of the WT-API
             debug_mode (bool, optional): Debug-Mode, Defaults to False.
+            concurrent_fetch (bool, optional): Query all endpoints of one update concurrently, Defaults to False.
         """
         
         self.ip_addr = ip_addr
         self.debug_mode = debug_mode
-        self.tel_interface = telemetry.TelemInterface(self.ip_addr)
+        self.concurrent_fetch = concurrent_fetch
+        self.tel_interface = self._create_interface()
         self.telemetry = None
+        self.frames = 0
+        self.__resolvers:dict[str, TelemetryResolver] = {}
+        self.__derived = DerivedTelemetryEngine()
         # self.map_info = mapinfo.MapInfo(self.ip_addr)
         
-    def fetch_data(self) -> None:
+    def _create_interface(self) -> telemetry.TelemInterface:
+        """Create the interface to the WT-API used by this Fetcher.
+
+        Returns:
+            telemetry.TelemInterface: Interface decoding the keys needed by this Fetcher
+        """
+        return telemetry.TelemInterface(self.ip_addr, concurrent=self.concurrent_fetch, keys=required_telemetry_keys())
+    
+    def close(self) -> None:
+        """Close the connections to the WT-API (and the threads of a concurrent client), the Fetcher must not be used afterwards.
+        """
+        self.tel_interface.close()
+    
+    def fetch_data(self, deadline:float|None = None) -> None:
+        """Fetch the current telemetry from the WT-API (or the debug file).
+
+        Args:
+            deadline (float|None, optional): time.monotonic() timestamp by which fetching has to be finished.
+                Endpoints which miss it are served from their last response. Defaults to None.
+        """
         if not self.debug_mode:
             try:
-                self.tel_interface.get_telemetry()
-                self.__update_telemetry()
+                self.tel_interface.get_telemetry(deadline=deadline)
+                if self.tel_interface.unchanged:
+                    # same responses as last time, self.telemetry is still up to date
+                    return
+                self._update_telemetry()
             except Exception as e:
                 print(f"Error while fetching: {e}")
                 
         else:
+            start = time.monotonic()
             with open(get_resource_path("debug-data.json"),"r") as file:
                 data = json.load(file)
+            received_at = time.monotonic()
                 
-            self.telemetry = self.__parse_telemetry(data)
+            self.__set_telemetry(self.__parse_telemetry(data), received_at, received_at - start, data)
                 
                 
             
    
-    def __update_telemetry(self) -> None:
+    def probe(self, deadline:float|None = None) -> int:
+        """Cheaply check the state of the game without fetching the full telemetry.
+
+        Args:
+            deadline (float|None, optional): time.monotonic() timestamp by which the probe has to be finished. Defaults to None.
+
+        Returns:
+            int: Status of the game, one of the status constants of Packages.WarThunder.telemetry
+        """
+        if self.debug_mode:
+            return telemetry.IN_FLIGHT
+        return self.tel_interface.probe(deadline)
+    
+    @property
+    def missed_deadlines(self) -> int:
+        """Number of endpoint requests which were skipped because they missed the deadline"""
+        return self.tel_interface.missed_deadlines
+    
+    @property
+    def unchanged(self) -> bool:
+        """True if the last fetch returned exactly the same responses as the one before (e.g. the game is paused)"""
+        if self.debug_mode:
+            return False
+        return self.tel_interface.unchanged
+    
+    @property
+    def changed_endpoints(self) -> set[str]:
+        """Endpoints of the WT-API whose response content changed with the last fetch"""
+        if self.debug_mode:
+            return set()
+        return self.tel_interface.changed_endpoints
+    
+    def set_telemetry_cadence(self, seconds:float) -> None:
+        """Set the minimal time between two queries of /state and /indicators.
+
+        Args:
+            seconds (float): Time in s, should not be above the intervall in which fetch_data is called
+        """
+        self.tel_interface.schedule.cadences["state"] = seconds
+        self.tel_interface.schedule.cadences["indicators"] = seconds
+    
+    @property
+    def unchanged_responses(self) -> int:
+        """Number of fetches which were skipped because the responses did not change"""
+        return self.tel_interface.unchanged_responses
+    
+    @property
+    def status(self) -> int:
+        """Status of the game found by the last fetch or probe, one of the status constants of Packages.WarThunder.telemetry"""
+        if self.debug_mode:
+            return telemetry.IN_FLIGHT
+        return self.tel_interface.status
+   
+    def _update_telemetry(self) -> None:
+        """Parse the telemetry of the last successful fetch of self.tel_interface.
+
+        Raises:
+            PlaneNotFoundException: If the fetch returned no telemetry of a plane.
+        """
         if not self.tel_interface.basic_telemetry and not self.tel_interface.full_telemetry:
+            self.telemetry = None
             raise PlaneNotFoundException("No Plane Found.")
         
         
-        self.telemetry = self.__parse_telemetry(self.tel_interface.basic_telemetry, self.tel_interface.full_telemetry)
+        self.__set_telemetry(self.__parse_telemetry(self.tel_interface.basic_telemetry, self.tel_interface.full_telemetry),
+                             self.tel_interface.received_at, self.tel_interface.rtt, self.tel_interface.full_telemetry)
+    
+    def __set_telemetry(self, telemetry:TelemetryData, received_at:float, rtt:float, source) -> None:
+        """Store a newly parsed frame, number and timestamp it, mark which fields changed since the previous one
+        and add the derived values computed from the raw telemetry (source)"""
+        self.frames += 1
+        telemetry.seq = self.frames
+        telemetry.received_at = received_at
+        telemetry.rtt = rtt
+        telemetry.changed = changed_fields(self.telemetry, telemetry)
+        if telemetry.changed & TelemetryField.PLANETYPE:
+            self.__derived.reset()
+        telemetry.derived = self.__derived.update(received_at, telemetry.ias, source)
+        self.telemetry = telemetry
     
     def __parse_telemetry(self, source:dict, optional_source:dict|None = None) -> TelemetryData:
         """Parse needet data from the Source, try optional source if given and not found in main source.
         Needet Arguments are defined in TELEMETRY_INFORMATION and OPTIONAL_TELEMETRY.
+        Which key is read from which source is compiled once per airframe (see TelemetryResolver).
         
         Args:
             source (dict): Dict containing the information to parse
             optional_source (dict,optional): Second dict for use if the First one doesn't contain needet data.
         
         Returns:
-            dict: A Dict containing the parsed information, with the keys defined in TELEMETRY_INFORMATION.
+            TelemetryData: The parsed information, with the fields defined in TELEMETRY_INFORMATION.
         """
-        result_dict = {}
+        sources = (source,) if optional_source is None else (source, optional_source)
+        airframe = source.get(TELEMETRY_INFORMATION["planetype"][0])
         
-        for category, keys in TELEMETRY_INFORMATION.items():
-            val = "--null--"
-            
-            for key in keys:
-                val = source.get(key,"--null--")
-                if val == "--null--" and optional_source:
-                    val = optional_source.get(key,"--null--")
-                
-                if val != "--null--":
-                    result_dict[category] = val
-                    break
-            
-            if val == "--null--" and category not in OPTIONAL_TELEMETRY:
-                raise TelemetryNotFoundException(f"Telemetry object {category} ({keys}) not found in Telemetry of the Plane.")
-            
-        return TelemetryData(**result_dict)
+        resolver = self.__resolvers.get(airframe)
+        if resolver is not None and not resolver.outdated(sources):
+            try:
+                return resolver.resolve(sources)
+            except KeyError:
+                # the available keys changed, search them again
+                pass
         
+        resolver = TelemetryResolver.compile(sources)
+        self.__resolvers[airframe] = resolver
+        return resolver.resolve(sources)
             
     
     def get_plane_telemetry(self) -> TelemetryData|None:
         return self.telemetry
+
+
+class AsyncWTUpdater(WTUpdater):
+    """WTUpdater for asyncio event loops. fetch_data and probe are coroutines which query the WT-API without blocking,
+    all endpoints of one update concurrently (see telemetry.AsyncTelemInterface). Parsing and the results are the same as
+    for WTUpdater.
+    """
+    def __init__(self, ip_addr, debug_mode=False, client=None):
+        """Create an asynchronous Fetcher to get Information from the WT-API
+
+        Args:
+            ip_addr (str): IP of the WT-API
+            debug_mode (bool, optional): Debug-Mode, Defaults to False.
+            client (AsyncWTClient|None, optional): Client to query the WT-API with, e.g. one shared with other Fetchers.
+                Defaults to None (a new client for ip_addr).
+        """
+        self.client = client
+        super().__init__(ip_addr, debug_mode, concurrent_fetch=True)
+    
+    def _create_interface(self) -> telemetry.AsyncTelemInterface:
+        return telemetry.AsyncTelemInterface(self.ip_addr, keys=required_telemetry_keys(), client=self.client)
+    
+    async def fetch_data(self, deadline:float|None = None) -> None:
+        """Fetch the current telemetry from the WT-API (or the debug file), see WTUpdater.fetch_data.
+
+        Args:
+            deadline (float|None, optional): time.monotonic() timestamp by which fetching has to be finished. Defaults to None.
+        """
+        if self.debug_mode:
+            super().fetch_data(deadline)
+            return
+        
+        try:
+            await self.tel_interface.get_telemetry(deadline=deadline)
+            if self.tel_interface.unchanged:
+                return
+            self._update_telemetry()
+        except Exception as e:
+            print(f"Error while fetching: {e}")
+    
+    async def probe(self, deadline:float|None = None) -> int:
+        """Cheaply check the state of the game without fetching the full telemetry, see WTUpdater.probe.
+
+        Args:
+            deadline (float|None, optional): time.monotonic() timestamp by which the probe has to be finished. Defaults to None.
+
+        Returns:
+            int: Status of the game, one of the status constants of Packages.WarThunder.telemetry
+        """
+        if self.debug_mode:
+            return telemetry.IN_FLIGHT
+        return await self.tel_interface.probe(deadline)
     
     
 if __name__ == '__main__':
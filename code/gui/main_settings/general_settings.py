@@ -1,6 +1,6 @@
 from .basics import SettingsTab
 from backend.settings import GeneralSettings
-from PySide6.QtWidgets import QLabel, QLineEdit, QComboBox, QFormLayout
+from PySide6.QtWidgets import QLabel, QLineEdit, QComboBox, QFormLayout, QCheckBox
 from Models import THEME_NAMES
 
 class GeneralSettingsTab(SettingsTab):
@@ -15,10 +15,36 @@ class GeneralSettingsTab(SettingsTab):
         self.inputs["intervall"] = QLineEdit()
         self.inputs["theme"] = QComboBox()
         self.inputs["theme"].addItems(list(THEME_NAMES.values()))
+        self.inputs["concurrent_fetch"] = QCheckBox()
+        self.inputs["auto_intervall"] = QCheckBox()
+        self.inputs["min_intervall"] = QLineEdit()
+        self.inputs["max_intervall"] = QLineEdit()
+        self.inputs["adaptive_intervall"] = QCheckBox()
+        self.inputs["async_fetch"] = QCheckBox()
+        self.inputs["relay_enabled"] = QCheckBox()
+        self.inputs["relay_port"] = QLineEdit()
+        self.inputs["relay_lan"] = QCheckBox()
+        self.inputs["shared_memory_export"] = QCheckBox()
+        self.inputs["tacview_stream"] = QCheckBox()
+        self.inputs["tacview_port"] = QLineEdit()
+        self.inputs["tacview_lan"] = QCheckBox()
         
         form_layout.addRow(QLabel("IP Adresse:"), self.inputs["ip"])
         form_layout.addRow(QLabel("Update Intervall (ms):"), self.inputs["intervall"])
         form_layout.addRow(QLabel("Theme:"), self.inputs["theme"])
+        form_layout.addRow(QLabel("Parallele Abfrage:"), self.inputs["concurrent_fetch"])
+        form_layout.addRow(QLabel("Intervall automatisch anpassen:"), self.inputs["auto_intervall"])
+        form_layout.addRow(QLabel("Min. Intervall (ms):"), self.inputs["min_intervall"])
+        form_layout.addRow(QLabel("Max. Intervall (ms):"), self.inputs["max_intervall"])
+        form_layout.addRow(QLabel("Langsamer abfragen fern von Limits:"), self.inputs["adaptive_intervall"])
+        form_layout.addRow(QLabel("Asynchrone Abfrage (asyncio):"), self.inputs["async_fetch"])
+        form_layout.addRow(QLabel("Telemetrie im Netzwerk teilen:"), self.inputs["relay_enabled"])
+        form_layout.addRow(QLabel("Port für geteilte Telemetrie:"), self.inputs["relay_port"])
+        form_layout.addRow(QLabel("Geteilte Telemetrie im LAN erreichbar:"), self.inputs["relay_lan"])
+        form_layout.addRow(QLabel("Telemetrie im Shared Memory bereitstellen:"), self.inputs["shared_memory_export"])
+        form_layout.addRow(QLabel("Live-Übertragung an Tacview:"), self.inputs["tacview_stream"])
+        form_layout.addRow(QLabel("Tacview Port:"), self.inputs["tacview_port"])
+        form_layout.addRow(QLabel("Tacview im LAN erreichbar:"), self.inputs["tacview_lan"])
         
         self.main_layout.addLayout(form_layout)
     
@@ -31,6 +57,19 @@ class GeneralSettingsTab(SettingsTab):
         self.inputs["ip"].setText(settings.ip)
         self.inputs["intervall"].setText(str(settings.intervall))
         self.inputs["theme"].setCurrentText(THEME_NAMES[settings.theme])
+        self.inputs["concurrent_fetch"].setChecked(settings.concurrent_fetch)
+        self.inputs["auto_intervall"].setChecked(settings.auto_intervall)
+        self.inputs["min_intervall"].setText(str(settings.min_intervall))
+        self.inputs["max_intervall"].setText(str(settings.max_intervall))
+        self.inputs["adaptive_intervall"].setChecked(settings.adaptive_intervall)
+        self.inputs["async_fetch"].setChecked(settings.async_fetch)
+        self.inputs["relay_enabled"].setChecked(settings.relay_enabled)
+        self.inputs["relay_port"].setText(str(settings.relay_port))
+        self.inputs["relay_lan"].setChecked(settings.relay_lan)
+        self.inputs["shared_memory_export"].setChecked(settings.shared_memory_export)
+        self.inputs["tacview_stream"].setChecked(settings.tacview_stream)
+        self.inputs["tacview_port"].setText(str(settings.tacview_port))
+        self.inputs["tacview_lan"].setChecked(settings.tacview_lan)
     
     def get_settings(self) -> GeneralSettings:
         """Sammelt die Einstellungen aus den UI-Elementen.
@@ -42,7 +81,20 @@ class GeneralSettingsTab(SettingsTab):
         general_settings = GeneralSettings(
             ip=self.inputs["ip"].text(),
             intervall=int(self.inputs["intervall"].text()),
-            theme=rev_theme_names[self.inputs["theme"].currentText()]
+            theme=rev_theme_names[self.inputs["theme"].currentText()],
+            concurrent_fetch=self.inputs["concurrent_fetch"].isChecked(),
+            auto_intervall=self.inputs["auto_intervall"].isChecked(),
+            min_intervall=int(self.inputs["min_intervall"].text()),
+            max_intervall=int(self.inputs["max_intervall"].text()),
+            adaptive_intervall=self.inputs["adaptive_intervall"].isChecked(),
+            async_fetch=self.inputs["async_fetch"].isChecked(),
+            relay_enabled=self.inputs["relay_enabled"].isChecked(),
+            relay_port=int(self.inputs["relay_port"].text()),
+            relay_lan=self.inputs["relay_lan"].isChecked(),
+            shared_memory_export=self.inputs["shared_memory_export"].isChecked(),
+            tacview_stream=self.inputs["tacview_stream"].isChecked(),
+            tacview_port=int(self.inputs["tacview_port"].text()),
+            tacview_lan=self.inputs["tacview_lan"].isChecked()
         )
         
         return general_settings
@@ -19,9 +19,12 @@ from gui.info_widget import InfoDockWidget
 from gui.main_settings import SettingsWindow
 
 from backend.wtFetcher import WTUpdater
-from backend.worker import dataFetcher
-from backend.warningEngine import PlaneSpeedWarningEngine
-from backend.SoundEngine import Sound, SoundBox
+from backend.worker import dataFetcher, asyncDataFetcher, telemetryRelayWorker
+from backend.warningEngine import PlaneSpeedWarningEngine, WARNING_FIELDS
+from backend.warningWorker import WarningEvaluationWorker
+from backend.sharedTelemetry import SharedTelemetryWriter
+from backend.SoundEngine import SoundBox
+from Packages.WarThunder.acmistream import ACMIStreamServer
 
 from settings import DEBUG_MODE
 
@@ -115,14 +118,27 @@ class MainWindow(QMainWindow):
             self.restoreState(saved_layout)
             
         # Setup backend Worker
-        self.init_worker(self.__global_settings.general.ip, DEBUG_MODE, self.update_interval, self.error_intervall)
+        self.init_worker(self.__global_settings.general.ip, DEBUG_MODE, self.update_interval, self.error_intervall, self.__global_settings.general.concurrent_fetch,
+                         self.__global_settings.general.auto_intervall, self.__global_settings.general.min_intervall, self.__global_settings.general.max_intervall,
+                         self.__global_settings.general.adaptive_intervall, self.__global_settings.general.async_fetch)
         # Setup warning module
         self.init_warning_modules()
+        # Setup relay sharing the telemetry with other devices and the export to local processes
+        self._relay_worker:telemetryRelayWorker|None = None
+        self._shared_memory_writer:SharedTelemetryWriter|None = None
+        self._tacview_stream:ACMIStreamServer|None = None
+        self.init_relay(self.__global_settings.general.relay_enabled, self.__global_settings.general.relay_port,
+                        self.__global_settings.general.relay_lan)
+        self.init_shared_memory_export(self.__global_settings.general.shared_memory_export)
+        self.init_tacview_stream(self.__global_settings.general.tacview_stream, self.__global_settings.general.tacview_port,
+                                 self.__global_settings.general.tacview_lan)
         
         self.connect_signals()
 
 
-    def init_worker(self, endpoint_ip:str, debug_mode:bool = False, std_intervall:int = 100, std_error_intervall:int = 5000) -> None:
+    def init_worker(self, endpoint_ip:str, debug_mode:bool = False, std_intervall:int = 100, std_error_intervall:int = 5000, concurrent_fetch:bool = False,
+                    auto_intervall:bool = False, min_intervall:int = 20, max_intervall:int = 200, adaptive_intervall:bool = False,
+                    async_fetch:bool = False) -> None:
         """Create an Backend Worker to Fetch Data from the local Game API in another Thread. 
             The worker running intervall is controlled by self.update_interval.
             
@@ -136,8 +152,27 @@ class MainWindow(QMainWindow):
             :type std_intervall: int, optional
             :param std_error_intervall: The intervall of running the worker in case of an error in ms, defaults to 5000
             :type std_error_intervall: int, optional
+            :param concurrent_fetch: If True, the worker queries all endpoints of one run concurrently, defaults to False
+            :type concurrent_fetch: bool, optional
+            :param auto_intervall: If True, the worker tunes its intervall to the update rate of the game instead of using std_intervall, defaults to False
+            :type auto_intervall: bool, optional
+            :param min_intervall: Lowest intervall in ms if auto_intervall is set, defaults to 20
+            :type min_intervall: int, optional
+            :param max_intervall: Highest intervall in ms if auto_intervall is set, defaults to 200
+            :type max_intervall: int, optional
+            :param adaptive_intervall: If True, the worker polls slower while the plane is far from its speed limits, defaults to False
+            :type adaptive_intervall: bool, optional
+            :param async_fetch: If True, an asyncio based worker (see asyncDataFetcher) is used, it always queries the endpoints concurrently, defaults to False
+            :type async_fetch: bool, optional
         """
-        self.fetcher_worker = dataFetcher(endpoint_ip, debug_mode, std_intervall, std_error_intervall)
+        if async_fetch:
+            self.fetcher_worker = asyncDataFetcher(endpoint_ip, debug_mode, std_intervall, std_error_intervall,
+                                                   auto_intervall=auto_intervall, min_intervall_ms=min_intervall, max_intervall_ms=max_intervall,
+                                                   adaptive_intervall=adaptive_intervall)
+        else:
+            self.fetcher_worker = dataFetcher(endpoint_ip, debug_mode, std_intervall, std_error_intervall, concurrent_fetch,
+                                              auto_intervall=auto_intervall, min_intervall_ms=min_intervall, max_intervall_ms=max_intervall,
+                                              adaptive_intervall=adaptive_intervall)
         self.fetcher_worker.new_plane_data.connect(self.__update_plane)
         self.periodic_workers.append(self.fetcher_worker)
         
@@ -152,14 +187,101 @@ class MainWindow(QMainWindow):
             mach_min_diff=self.__global_settings.warning.min_mach_diff,
             mach_max_diff=self.__global_settings.warning.max_mach_diff
         )
+        # the warning modules and their sounds run in their own Thread, only when telemetry they depend on changed
+        self._warning_worker = WarningEvaluationWorker(self._default_sound_box, self._priority_sound_box)
+        self._warning_worker.add_module(self._plane_speed_warning_e, WARNING_FIELDS)
+    
+    def init_relay(self, enabled:bool, port:int = 8112, lan:bool = False) -> None:
+        """(Re)start the relay re-publishing every fetched frame to other programs or devices (see TelemetryRelay).
+        The relay has no authentication, so it only listens on localhost unless lan is set.
+
+            :param enabled: If False, a running relay is stopped
+            :type enabled: bool
+            :param port: Port the relay listens on, defaults to 8112
+            :type port: int, optional
+            :param lan: If True, the relay is reachable from other devices of the LAN, defaults to False
+            :type lan: bool, optional
+        """
+        if self._relay_worker is not None:
+            if self._relay_worker.publish in self.fetcher_worker.frame_sinks:
+                self.fetcher_worker.frame_sinks.remove(self._relay_worker.publish)
+            self._relay_worker.stop()
+            self._relay_worker = None
+        if enabled:
+            try:
+                self._relay_worker = telemetryRelayWorker("0.0.0.0" if lan else "127.0.0.1", port)
+            except OSError as e:
+                logger.error(f"Telemetry relay could not be started on port {port}: {e}")
+                return
+            self.connect_frame_sinks()
+    
+    def init_shared_memory_export(self, enabled:bool) -> None:
+        """Start or stop writing every fetched frame to shared memory for local processes (see SharedTelemetryWriter)
+
+            :param enabled: If False, a running export is stopped
+            :type enabled: bool
+        """
+        if self._shared_memory_writer is not None:
+            if self._shared_memory_writer.publish in self.fetcher_worker.frame_sinks:
+                self.fetcher_worker.frame_sinks.remove(self._shared_memory_writer.publish)
+            self._shared_memory_writer.close()
+            self._shared_memory_writer = None
+        if enabled:
+            self._shared_memory_writer = SharedTelemetryWriter()
+            self.connect_frame_sinks()
+    
+    def init_tacview_stream(self, enabled:bool, port:int = 42674, lan:bool = False) -> None:
+        """(Re)start the server streaming the own plane and the objects of the map to Tacview (see ACMIStreamServer).
+        Tacview connects without a password, so the server only listens on localhost unless lan is set.
+
+            :param enabled: If False, a running server is stopped
+            :type enabled: bool
+            :param port: Port Tacview connects to, defaults to 42674
+            :type port: int, optional
+            :param lan: If True, Tacview on other devices of the LAN can connect, defaults to False
+            :type lan: bool, optional
+        """
+        if self._tacview_stream is not None:
+            if self._tacview_stream.push_interface in self.fetcher_worker.interface_sinks:
+                self.fetcher_worker.interface_sinks.remove(self._tacview_stream.push_interface)
+            self._tacview_stream.stop()
+            self._tacview_stream = None
+        if enabled:
+            self._tacview_stream = ACMIStreamServer("0.0.0.0" if lan else "127.0.0.1", port)
+            try:
+                self._tacview_stream.start()
+            except OSError as e:
+                logger.error(f"Tacview stream could not be started on port {port}: {e}")
+                self._tacview_stream = None
+                return
+            self.connect_frame_sinks()
+    
            
     def connect_signals(self):
         """Connect Signals and Slots between GUI and Backend Workers."""
+        self.connect_fetcher_signals()
+    
+    def connect_fetcher_signals(self):
+        """Connect the Signals of the current Backend Worker (has to be repeated whenever the Worker is recreated)."""
         self.fetcher_worker.new_plane_data.connect(self._plane_speed_warning_e.on_new_plane)
-        self.fetcher_worker.new_telemetry_data.connect(self._plane_speed_warning_e.on_new_telemetry)   
-        
-        self._plane_speed_warning_e.play_sound_signal.connect(self.play_sounds)
-        self._plane_speed_warning_e.stop_sound_signal.connect(self.stop_sounds)
+        self._warning_worker.attach(self.fetcher_worker)
+        self._plane_speed_warning_e.time_to_limit_signal.connect(self.fetcher_worker.on_time_to_limit)
+        self.connect_frame_sinks()
+    
+    def connect_frame_sinks(self):
+        """Hand the frames of the current Backend Worker to the enabled exports (relay, shared memory, Tacview). They are frame
+        sinks and not consumers of the telemetry channel, so they do not take frames from the warning modules.
+        Tacview gets the interface of the Worker after every run instead, so it also sees when the player is no longer in flight."""
+        sinks = []
+        if self._relay_worker is not None:
+            sinks.append(self._relay_worker.publish)
+        if self._shared_memory_writer is not None:
+            sinks.append(self._shared_memory_writer.publish)
+        for sink in sinks:
+            if sink not in self.fetcher_worker.frame_sinks:
+                self.fetcher_worker.frame_sinks.append(sink)
+        if self._tacview_stream is not None and self._tacview_stream.push_interface not in self.fetcher_worker.interface_sinks:
+            self.fetcher_worker.interface_sinks.append(self._tacview_stream.push_interface)
         
     def __update_plane(self, plane:WTPlane)-> None:
         """Update the Plane for Which informations are displayed
@@ -171,24 +293,6 @@ class MainWindow(QMainWindow):
         self.own_plane = plane
         self.reload_windows()
         
-    def play_sounds(self, sounds:list[Sound]|Sound) -> None:
-        if isinstance(sounds, Sound):
-            sounds = [sounds]
-        for sound in sounds:
-            if sound.priority_playback:
-                self._priority_sound_box.add_sound(sound)
-            else:
-                self._default_sound_box.add_sound(sound)
-    
-    def stop_sounds(self, sounds:list[Sound]|Sound) -> None:
-        if isinstance(sounds, Sound):
-            sounds = [sounds]
-        for sound in sounds:
-            if sound.priority_playback:
-                self._priority_sound_box.remove_sound(sound)
-            else:
-                self._default_sound_box.remove_sound(sound)
-        
     def reload_windows(self):
         for name, dock in self.modules.items():
             if hasattr(dock, 'init_window'):
@@ -229,6 +333,13 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         self.fetcher_worker.stop()
+        self._warning_worker.stop(wait=True)
+        if self._relay_worker is not None:
+            self._relay_worker.stop()
+        if self._shared_memory_writer is not None:
+            self._shared_memory_writer.close()
+        if self._tacview_stream is not None:
+            self._tacview_stream.stop()
         self._default_sound_box.stop(wait=True)
         self._priority_sound_box.stop(wait=True)
         self.__revoke_prevent_device_sleep()
@@ -277,17 +388,40 @@ class MainWindow(QMainWindow):
         
         :param new_settings: Die neuen allgemeinen Einstellungen
         """
-        if self.__global_settings.general.ip != new_settings.ip:
-            logger.info("IP-Adresse geändert, Worker wird neu gestartet.")
+        if self.__global_settings.general.ip != new_settings.ip or \
+            self.__global_settings.general.concurrent_fetch != new_settings.concurrent_fetch or \
+            self.__global_settings.general.auto_intervall != new_settings.auto_intervall or \
+            self.__global_settings.general.min_intervall != new_settings.min_intervall or \
+            self.__global_settings.general.max_intervall != new_settings.max_intervall or \
+            self.__global_settings.general.adaptive_intervall != new_settings.adaptive_intervall or \
+            self.__global_settings.general.async_fetch != new_settings.async_fetch:
+            logger.info("IP-Adresse oder Abfragemodus geändert, Worker wird neu gestartet.")
             self.periodic_workers.remove(self.fetcher_worker)
             self.fetcher_worker.stop()
-            self.init_worker(new_settings.ip, DEBUG_MODE, self.update_interval, self.error_intervall)
+            self.init_worker(new_settings.ip, DEBUG_MODE, self.update_interval, self.error_intervall, new_settings.concurrent_fetch,
+                             new_settings.auto_intervall, new_settings.min_intervall, new_settings.max_intervall,
+                             new_settings.adaptive_intervall, new_settings.async_fetch)
+            self.connect_fetcher_signals()
             
         if self.__global_settings.general.intervall != new_settings.intervall or \
             self.update_interval != new_settings.intervall:
                 logger.info("Update Intervall geändert, Worker Intervall wird angepasst.")
                 self.update_interval = new_settings.intervall
-                self.fetcher_worker.update_intervall(self.update_interval)
+                self.fetcher_worker.set_std_intervall(self.update_interval)
+        
+        if self.__global_settings.general.relay_enabled != new_settings.relay_enabled or \
+            self.__global_settings.general.relay_port != new_settings.relay_port or \
+            self.__global_settings.general.relay_lan != new_settings.relay_lan:
+            logger.info("Einstellungen des Telemetrie-Relays geändert, Relay wird neu gestartet.")
+            self.init_relay(new_settings.relay_enabled, new_settings.relay_port, new_settings.relay_lan)
+        
+        if self.__global_settings.general.shared_memory_export != new_settings.shared_memory_export:
+            self.init_shared_memory_export(new_settings.shared_memory_export)
+        
+        if self.__global_settings.general.tacview_stream != new_settings.tacview_stream or \
+            self.__global_settings.general.tacview_port != new_settings.tacview_port or \
+            self.__global_settings.general.tacview_lan != new_settings.tacview_lan:
+            self.init_tacview_stream(new_settings.tacview_stream, new_settings.tacview_port, new_settings.tacview_lan)
         
         if self.__current_theme != new_settings.theme:
             self.__set_theme(new_settings.theme)
@@ -1,3 +1,5 @@
+import time
+
 from PySide6.QtWidgets import QDockWidget, QWidget, QVBoxLayout, QLabel, QHBoxLayout, QGroupBox
 
 from PySide6.QtCore import Qt, QTimer
@@ -5,6 +7,13 @@ from PySide6.QtCore import Qt, QTimer
 from gui.base_elements import SelectableLabel, Lamp
 
 from Packages.Models.Plane import WTPlane, TelemetryData
+from backend.wtFetcher import TelemetryField, changed_fields
+from backend.telemetryInterpolator import TelemetryInterpolator
+from backend.warningEngine import STALE_TELEMETRY_S
+from settings import WINDOW_DISPLAY_INTERVALL
+
+# Telemetry fields shown by the AircraftStatusDock (the safe flap state depends on the speed)
+STATUS_FIELDS = TelemetryField.PLANETYPE | TelemetryField.IAS | TelemetryField.FLAPS | TelemetryField.GEAR | TelemetryField.AIRBRAKE
 
 class FlapValueException(ValueError):
     pass
@@ -83,6 +92,12 @@ class AircraftStatusDock(QDockWidget):
         # configure update Timer
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.__update_data)
+        self.__shown_telemetry:TelemetryData|None = None
+        
+        # configure display Timer, redraws interpolated values independent of the poll rate
+        self.display_timer = QTimer()
+        self.display_timer.timeout.connect(self.__update_display)
+        self.interpolator:TelemetryInterpolator|None = None
         
         self.init_window()
     
@@ -94,6 +109,8 @@ class AircraftStatusDock(QDockWidget):
             return
         else:
             self.reload_timer.stop()
+        # new widgets have to be filled with the current state
+        self.__shown_telemetry = None
             
         # Haupt-Widget im Dock
         main_widget = QWidget()
@@ -127,13 +144,25 @@ class AircraftStatusDock(QDockWidget):
         flaps_layout.addWidget(self.flaps_status)
         flap_box.setLayout(flaps_layout)
         
+        # Geschwindigkeit
+        speed_box = QGroupBox("Geschwindigkeit")
+        self.ias_label = QLabel("IAS: - km/h")
+        speed_layout = QVBoxLayout()
+        speed_layout.addWidget(self.ias_label)
+        speed_box.setLayout(speed_layout)
+        
         layout.addWidget(flap_box)
         layout.addWidget(landing_box)
+        layout.addWidget(speed_box)
         
         self.setWidget(main_widget)
         
+        # the last speed must not stay on screen once no frames arrive anymore (e.g. WT was closed)
+        self.interpolator = TelemetryInterpolator(self.mainWindow.own_plane.history, stale_s=STALE_TELEMETRY_S)
+        
         # start periodic updates
         self.update_timer.start(100)  # alle 0.1 Sekunden
+        self.display_timer.start(WINDOW_DISPLAY_INTERVALL)
 
     def update_status(self, landing_gear: bool, brake_flaps: bool, flaps_state: str):
         self.landing_gear.set_state(landing_gear) # TODO Add state blinking for moving parts
@@ -149,6 +178,13 @@ class AircraftStatusDock(QDockWidget):
             "flaps_status": self.flaps_status.current_state
         }
         
+    def __update_display(self):
+        """Redraw the values which are interpolated between the fetched frames"""
+        if self.interpolator is None:
+            return
+        ias = self.interpolator.value_at("ias", time.monotonic())
+        self.ias_label.setText("IAS: - km/h" if ias is None else f"IAS: {ias:.0f} km/h")
+        
     def __update_data(self):
         TRANS_DICT = {
             "combat": "Kampf",
@@ -158,6 +194,12 @@ class AircraftStatusDock(QDockWidget):
         }
         
         tel:TelemetryData = self.mainWindow.own_plane.telemetry
+        if tel is not None and tel != {}:
+            # frames may be skipped between two timer runs, so compare with the last shown one
+            if self.__shown_telemetry is not None and not (changed_fields(self.__shown_telemetry, tel) & STATUS_FIELDS):
+                return
+            self.__shown_telemetry = tel
+        
         safe_flap_state = self.mainWindow.own_plane.get_safe_flap_state()
         
         safe_flap_state = TRANS_DICT[safe_flap_state]
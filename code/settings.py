@@ -9,6 +9,7 @@ DB_PATH = os.path.join(PATH, 'settings.json')
 
 WINDOW_UPDATE_INTERVALL = 100 # UpdateIntervall in ms
 WINDOW_IDLE_UPDATE_INTERVALL = 1000 # Idle-UpdateIntervall in ms
+WINDOW_DISPLAY_INTERVALL = 33 # Intervall in ms of redrawing interpolated values (e.g. speeds)
 
 # Logging defaults
 # Use the project's paths module to determine the user/log directory